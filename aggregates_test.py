@@ -0,0 +1,197 @@
+"""
+Consistency test for the running task counts (TaskAggregates).
+
+A scripted run goes through every TodoApp mutator on each store: single
+and bulk add, update, mark and delete, a rejected batch, import, journal
+replay, and archiving (or undo/redo on the persistent store). After every
+step summary(today, verify=True) must pass and agree with a recount of
+every task, live and archived. The overdue count is cached for the day it
+was last read, so tasks are changed while it is cached and the day is then
+moved forward and back. A randomized run mixes the same mutators with a
+clock that advances by a few days at a time.
+
+Usage: python aggregates_test.py [--ops N]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+from archive import TaskArchive
+from columnar import ColumnarStore
+from dates import format_date, parse_date
+from journal import Journal
+from main import TodoApp
+from output import CollectingSink, NullSink
+from persistent import PersistentStore
+from storage import MemoryStore
+
+TODAY = parse_date("2025-06-15")
+STORES = (("memory", MemoryStore), ("columnar", ColumnarStore), ("persistent", PersistentStore))
+
+
+def day(offset):
+    """A due date offset days from TODAY."""
+    return format_date(TODAY + offset)
+
+
+def recount(app, today):
+    """The summary counts of every live and archived task, counted one by one."""
+    counts = dict.fromkeys(("total", "completed", "pending", "with_due_date", "overdue", "due_today"), 0)
+    for task in app._all_tasks():
+        counts["total"] += 1
+        counts["completed" if task.completed else "pending"] += 1
+        if task.due_ordinal is not None:
+            counts["with_due_date"] += 1
+            if not task.completed and task.due_ordinal < today:
+                counts["overdue"] += 1
+            elif not task.completed and task.due_ordinal == today:
+                counts["due_today"] += 1
+    return counts
+
+
+def check(app, sink, today, label, failures):
+    """Compare a verified summary with a recount; False on the first failure."""
+    sink.clear()
+    counts = app.summary(format_date(today), verify=True)
+    if counts is None:
+        failures.append(f"{label}: {sink.results[-1].message}")
+        return False
+    expected = recount(app, today)
+    if counts != expected:
+        failures.append(f"{label} on {format_date(today)}: summary {counts}, recount {expected}")
+        return False
+    return True
+
+
+def scripted(name, store_class, failures):
+    """Run every mutator once, checking the counts after each step."""
+    sink = CollectingSink()
+    directory = tempfile.mkdtemp()
+    persistent = store_class is PersistentStore
+    archive = None if persistent else TaskArchive(max_age_days=0)
+    app = TodoApp(Journal(directory), sink, store=store_class(), archive=archive)
+    source = TodoApp(sink=NullSink())
+    source.add_tasks([("imported overdue", day(-4)), "imported undated", ("imported today", day(0))])
+    source.mark_task_complete(2, True)
+    export_path = os.path.join(directory, "export.ndjson")
+    source.export_tasks(export_path)
+
+    # (label, change, day to check on); each change runs with today at the
+    # previous step's day, so a change lands while that day's overdue count
+    # is cached before the check moves on
+    steps = [
+        ("add", lambda: [app.add_task("a", day(-3)), app.add_task("b", day(0)), app.add_task("c"),
+                         app.add_task("d", day(5))], TODAY),
+        ("add_tasks", lambda: app.add_tasks([("e", day(-1)), "f", ("g", day(1)), ("h", day(0))]), TODAY),
+        ("update due date", lambda: app.update_task(1, None, day(2)), TODAY),
+        ("update description", lambda: app.update_task(2, "b2"), TODAY),
+        ("clear due date", lambda: app.update_task(4, None, ""), TODAY),
+        ("update_tasks", lambda: app.update_tasks([(3, None, day(-2)), (5, "e2", day(0))]), TODAY),
+        ("mark complete", lambda: app.mark_task_complete(2, True), TODAY),
+        ("mark_tasks", lambda: app.mark_tasks([3, 6, 7], True), TODAY),
+        ("mark_tasks incomplete", lambda: app.mark_tasks([6, 3], False), TODAY),
+        ("rejected batch", lambda: app.mark_tasks([1, 99], True), TODAY),
+        ("next day", lambda: None, TODAY + 1),
+        ("change on the new day", lambda: app.update_task(1, None, day(1)), TODAY + 1),
+        ("days later", lambda: None, TODAY + 3),
+        ("overdue tasks change", lambda: [app.mark_task_complete(1, True), app.update_task(7, None, day(9))],
+         TODAY + 3),
+        ("back to today", lambda: None, TODAY),
+        ("delete", lambda: app.delete_task(8), TODAY),
+        ("delete_tasks", lambda: app.delete_tasks([6, 7]), TODAY),
+        ("import", lambda: app.import_tasks(export_path), TODAY),
+    ]
+    for label, change, today in steps:
+        change()
+        if not check(app, sink, today, f"{name} {label}", failures):
+            return
+
+    app.close()
+    app = TodoApp(Journal(directory), sink, store=store_class(), archive=archive)
+    if not check(app, sink, TODAY, f"{name} journal replay", failures):
+        return
+
+    if persistent:
+        later = [
+            ("undo", app.undo),
+            ("undo again", app.undo),
+            ("redo", app.redo),
+            ("change after undo", lambda: app.add_task("i", day(-5))),
+        ]
+    else:
+        later = [
+            ("archive", lambda: app.archive_completed(0)),
+            ("reopen archived", lambda: app.mark_task_complete(2, False)),
+            ("delete archived", lambda: app.delete_task(next(iter(app.archive.values())).id)),
+        ]
+    # Undo needs changes made since the replay
+    app.add_task("after replay", day(-1))
+    app.mark_task_complete(5, True)
+    for label, change in later:
+        change()
+        if not check(app, sink, TODAY, f"{name} {label}", failures):
+            return
+    app.close()
+    shutil.rmtree(directory)
+
+
+def randomized(ops, failures):
+    """Random mutations on an app with an archive, while the clock advances."""
+    rng = random.Random(ops)
+    sink = CollectingSink()
+    app = TodoApp(sink=sink, archive=TaskArchive(max_age_days=0))
+    today = TODAY
+
+    def some_ids(count):
+        return [rng.randrange(1, app.next_id + 2) for _ in range(count)]
+
+    def due():
+        return None if rng.random() < 0.3 else day(today - TODAY + rng.randrange(-10, 11))
+
+    for number in range(ops):
+        roll = rng.random()
+        if roll < 0.25:
+            app.add_tasks([("task", due()) for _ in range(rng.randrange(1, 4))])
+        elif roll < 0.35:
+            app.update_task(rng.choice(some_ids(1)), None, due() or "")
+        elif roll < 0.45:
+            app.update_tasks([(task_id, None, due() or "") for task_id in some_ids(2)])
+        elif roll < 0.6:
+            app.mark_task_complete(rng.choice(some_ids(1)), rng.random() < 0.7)
+        elif roll < 0.7:
+            app.mark_tasks(some_ids(3), rng.random() < 0.5)
+        elif roll < 0.8:
+            app.delete_tasks(some_ids(2))
+        elif roll < 0.85:
+            app.archive_completed(0)
+        elif roll < 0.95:
+            today += rng.choice((0, 1, 1, 2, 7))
+        else:
+            app.delete_task(rng.choice(some_ids(1)))
+        if not check(app, sink, today, f"random op {number}", failures):
+            return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Running task counts consistency test")
+    parser.add_argument("--ops", type=int, default=2000, help="number of random operations")
+    args = parser.parse_args()
+
+    failures = []
+    for name, store_class in STORES:
+        errors = []
+        scripted(name, store_class, errors)
+        failures.extend(errors)
+        print(f"{name:<12} {errors[0] if errors else 'ok'}")
+    errors = []
+    randomized(args.ops, errors)
+    failures.extend(errors)
+    print(f"{'randomized':<12} {errors[0] if errors else 'ok'}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Reporting aggregates over the whole task set.
+
+The report command needs every task, not a page of them, so instead of
+walking Task objects once per aggregate the tasks are exported once into
+three flat columns (TaskColumns): completion flag, due-date ordinal and
+creation time. With NumPy installed the columns are wrapped as arrays
+without copying and every aggregate is a handful of vectorized operations;
+without it the same aggregates are computed in pure Python, with identical
+results.
+
+A report holds:
+
+- ``overdue_by_week``: pending tasks due before today, by the Monday of the
+  week they were due
+- ``completion_by_month``: completed and total tasks, by the month (local
+  time) they were created
+- ``due_by_month``: pending and completed tasks with a due date, by the
+  month they are due
+"""
+
+import time
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy
+except ImportError:  # Optional; the pure-Python path gives the same results
+    numpy = None
+
+# Day ordinal of 1970-01-01, the epoch of numpy.datetime64
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class TaskColumns:
+    """The fields reports need, one array per field and one row per task."""
+
+    def __init__(self):
+        self.completed = array("b")
+        # Day ordinal, 0 for no due date
+        self.due = array("i")
+        self.created = array("q")
+
+    def __len__(self) -> int:
+        return len(self.completed)
+
+    @classmethod
+    def from_tasks(cls, tasks: Iterable) -> "TaskColumns":
+        """Export tasks (anything with completed, due_ordinal and created_ts) in one pass."""
+        columns = cls()
+        completed, due, created = columns.completed, columns.due, columns.created
+        for task in tasks:
+            completed.append(task.completed)
+            due.append(task.due_ordinal or 0)
+            created.append(task.created_ts)
+        return columns
+
+    def extend(self, other: "TaskColumns"):
+        """Append the rows of another export, e.g. from another shard."""
+        self.completed.extend(other.completed)
+        self.due.extend(other.due)
+        self.created.extend(other.created)
+
+
+def _month_label(year: int, month: int) -> str:
+    return f"{year:04d}-{month:02d}"
+
+
+def _month_starts(first: int, last: int) -> Tuple[List[str], List[int]]:
+    """Labels and local-time epoch starts of every month from the one holding first to the one holding last."""
+    moment = time.localtime(first)
+    year, month = moment.tm_year, moment.tm_mon
+    labels, starts = [], []
+    while True:
+        start = int(time.mktime((year, month, 1, 0, 0, 0, 0, 0, -1)))
+        if start > last:
+            return labels, starts
+        labels.append(_month_label(year, month))
+        starts.append(start)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def report(columns: TaskColumns, today: int, vectorized: Optional[bool] = None) -> Dict[str, list]:
+    """
+    Compute every aggregate of a report.
+
+    Args:
+        columns: Exported tasks
+        today: Day ordinal tasks must be due before to count as overdue
+        vectorized: Use NumPy (True) or pure Python (False); defaults to
+            NumPy when it is installed
+
+    Returns:
+        Dictionary with overdue_by_week as (week start, count) pairs,
+        completion_by_month as (month, completed, total) triples and
+        due_by_month as (month, pending, completed) triples, each sorted by
+        date and without empty buckets
+    """
+    if vectorized is None:
+        vectorized = numpy is not None
+    elif vectorized and numpy is None:
+        raise RuntimeError("NumPy is not installed")
+    if not len(columns):
+        return {"overdue_by_week": [], "completion_by_month": [], "due_by_month": []}
+    return _report_numpy(columns, today) if vectorized else _report_python(columns, today)
+
+
+def _report_numpy(columns: TaskColumns, today: int) -> Dict[str, list]:
+    completed = numpy.frombuffer(columns.completed, dtype=numpy.int8).astype(bool)
+    due = numpy.frombuffer(columns.due, dtype=numpy.int32)
+    created = numpy.frombuffer(columns.created, dtype=numpy.int64)
+    pending = ~completed
+    has_due = due > 0
+
+    # Ordinal 1 (0001-01-01) was a Monday, so (ordinal - 1) % 7 is the weekday
+    overdue = due[pending & has_due & (due < today)]
+    weeks, counts = numpy.unique(overdue - (overdue - 1) % 7, return_counts=True)
+    overdue_by_week = [(date.fromordinal(week).isoformat(), count)
+                       for week, count in zip(weeks.tolist(), counts.tolist())]
+
+    labels, starts = _month_starts(int(created.min()), int(created.max()))
+    month = numpy.searchsorted(numpy.array(starts, dtype=numpy.int64), created, side="right") - 1
+    totals = numpy.bincount(month, minlength=len(labels))
+    done = numpy.bincount(month[completed], minlength=len(labels))
+    completion_by_month = [(label, finished, total)
+                           for label, finished, total in zip(labels, done.tolist(), totals.tolist()) if total]
+
+    months = (due[has_due] - _EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]").astype(numpy.int64)
+    due_by_month = []
+    if len(months):
+        first = int(months.min())
+        bins = months - first
+        waiting = numpy.bincount(bins[pending[has_due]], minlength=int(bins.max()) + 1)
+        finished = numpy.bincount(bins[completed[has_due]], minlength=len(waiting))
+        for offset, (open_count, done_count) in enumerate(zip(waiting.tolist(), finished.tolist())):
+            if open_count or done_count:
+                year, month_index = divmod(first + offset, 12)
+                due_by_month.append((_month_label(1970 + year, month_index + 1), open_count, done_count))
+
+    return {"overdue_by_week": overdue_by_week, "completion_by_month": completion_by_month,
+            "due_by_month": due_by_month}
+
+
+def _report_python(columns: TaskColumns, today: int) -> Dict[str, list]:
+    overdue: Counter = Counter()
+    # Due dates repeat a lot, so count per ordinal and convert each one once
+    due_pending: Counter = Counter()
+    due_completed: Counter = Counter()
+    labels, starts = _month_starts(min(columns.created), max(columns.created))
+    totals = [0] * len(labels)
+    done = [0] * len(labels)
+    for finished, due, created in zip(columns.completed, columns.due, columns.created):
+        month = bisect_right(starts, created) - 1
+        totals[month] += 1
+        if finished:
+            done[month] += 1
+            if due:
+                due_completed[due] += 1
+        elif due:
+            due_pending[due] += 1
+            if due < today:
+                overdue[due - (due - 1) % 7] += 1
+
+    overdue_by_week = [(date.fromordinal(week).isoformat(), count) for week, count in sorted(overdue.items())]
+    completion_by_month = [(label, finished, total)
+                           for label, finished, total in zip(labels, done, totals) if total]
+    by_month: Dict[Tuple[int, int], List[int]] = {}
+    for counter, position in ((due_pending, 0), (due_completed, 1)):
+        for ordinal, count in counter.items():
+            day = date.fromordinal(ordinal)
+            by_month.setdefault((day.year, day.month), [0, 0])[position] += count
+    due_by_month = [(_month_label(*key), open_count, done_count)
+                    for key, (open_count, done_count) in sorted(by_month.items())]
+    return {"overdue_by_week": overdue_by_week, "completion_by_month": completion_by_month,
+            "due_by_month": due_by_month}
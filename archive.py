@@ -0,0 +1,172 @@
+"""
+Cold tier for old completed tasks.
+
+TaskArchive keeps tasks out of the live store as zlib-compressed blocks of
+their ``to_dict`` records, one JSON line each, so an archived task costs a
+few dozen bytes instead of a Task object plus its index entries. A sorted
+id array with parallel arrays of block numbers and line numbers locates any
+id by binary search. Blocks are decompressed on demand and the lines of the
+most recently used ones are kept in a small LRU cache, so paging through
+archived tasks in id order decompresses each block once, and a lookup only
+decodes the one line it needs.
+
+Archived tasks are read-only: TodoApp moves a task back into the live store
+(rehydrates it) before changing or deleting it.
+"""
+
+import json
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Iterable, Iterator, List, Optional
+
+from task import Task
+
+_encode_json = json.JSONEncoder(separators=(",", ":")).encode
+_decode_json = json.JSONDecoder().decode
+
+
+class TaskArchive:
+    """Compressed, id-addressable store of archived tasks."""
+
+    # Records per compressed block: larger blocks compress better, smaller
+    # ones make a single lookup cheaper
+    BLOCK_SIZE = 256
+
+    def __init__(self, max_age_days: float = 30.0, cache_blocks: int = 8, level: int = 6):
+        """
+        Args:
+            max_age_days: Completed tasks created at least this many days ago
+                are archived by TodoApp.archive_completed by default
+            cache_blocks: Number of decompressed blocks to keep
+            level: zlib compression level
+        """
+        self.max_age_days = max_age_days
+        self.cache_blocks = cache_blocks
+        self.level = level
+        self.with_due_date = 0
+        self._ids = array("q")
+        self._block_of = array("l")
+        self._line_of = array("H")
+        self._blocks: List[bytes] = []
+        self._live: List[int] = []
+        self._cache: "OrderedDict[int, List[str]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, task_id) -> bool:
+        index = bisect_left(self._ids, task_id) if isinstance(task_id, int) else len(self._ids)
+        return index < len(self._ids) and self._ids[index] == task_id
+
+    @property
+    def compressed_bytes(self) -> int:
+        """Memory held by the compressed blocks and the id index."""
+        return sum(len(block) for block in self._blocks) + sum(
+            column.itemsize * len(column) for column in (self._ids, self._block_of, self._line_of))
+
+    def add(self, tasks: Iterable[Task]):
+        """Archive tasks that have just been taken out of the live store."""
+        tasks = sorted(tasks, key=lambda task: task.id)
+        if not tasks:
+            return
+        new_ids, new_blocks, new_lines = array("q"), array("l"), array("H")
+        for start in range(0, len(tasks), self.BLOCK_SIZE):
+            chunk = tasks[start:start + self.BLOCK_SIZE]
+            number = len(self._blocks)
+            text = "\n".join(_encode_json(task.to_dict()) for task in chunk)
+            self._blocks.append(zlib.compress(text.encode("utf-8"), self.level))
+            self._live.append(len(chunk))
+            new_ids.extend(task.id for task in chunk)
+            new_blocks.extend([number] * len(chunk))
+            new_lines.extend(range(len(chunk)))
+            self.with_due_date += sum(task.due_ordinal is not None for task in chunk)
+        if self._ids and self._ids[-1] > new_ids[0]:
+            self._merge(new_ids, new_blocks, new_lines)
+        else:
+            # The usual case: tasks are archived roughly in id order
+            self._ids.extend(new_ids)
+            self._block_of.extend(new_blocks)
+            self._line_of.extend(new_lines)
+
+    def _merge(self, new_ids: array, new_blocks: array, new_lines: array):
+        """Merge sorted new entries into the index in one pass."""
+        old = (self._ids, self._block_of, self._line_of)
+        new = (new_ids, new_blocks, new_lines)
+        merged = (array("q"), array("l"), array("H"))
+        i = j = 0
+        while i < len(old[0]) and j < len(new_ids):
+            if old[0][i] < new_ids[j]:
+                source, position = old, i
+                i += 1
+            else:
+                source, position = new, j
+                j += 1
+            for column, values in zip(merged, source):
+                column.append(values[position])
+        for column, values, new_values in zip(merged, old, new):
+            column.extend(values[i:])
+            column.extend(new_values[j:])
+        self._ids, self._block_of, self._line_of = merged
+
+    def _block(self, number: int) -> List[str]:
+        """Decompressed lines of a block, through the LRU cache."""
+        cache = self._cache
+        lines = cache.get(number)
+        if lines is not None:
+            cache.move_to_end(number)
+            return lines
+        lines = zlib.decompress(self._blocks[number]).decode("utf-8").split("\n")
+        cache[number] = lines
+        if len(cache) > self.cache_blocks:
+            cache.popitem(last=False)
+        return lines
+
+    def _task(self, index: int) -> Task:
+        """Decode the task at a position of the index."""
+        return Task.from_dict(_decode_json(self._block(self._block_of[index])[self._line_of[index]]))
+
+    def _index(self, task_id: int) -> Optional[int]:
+        index = bisect_left(self._ids, task_id)
+        if index == len(self._ids) or self._ids[index] != task_id:
+            return None
+        return index
+
+    def get(self, task_id: int) -> Optional[Task]:
+        """
+        A copy of an archived task, or None.
+
+        Changes to the copy are not kept; rehydrate the task to change it.
+        """
+        index = self._index(task_id)
+        return None if index is None else self._task(index)
+
+    def pop(self, task_id: int) -> Task:
+        """Take a task out of the archive, e.g. to rehydrate it; KeyError if absent."""
+        index = self._index(task_id)
+        if index is None:
+            raise KeyError(task_id)
+        task = self._task(index)
+        number = self._block_of[index]
+        for column in (self._ids, self._block_of, self._line_of):
+            del column[index]
+        if task.due_ordinal is not None:
+            self.with_due_date -= 1
+        self._live[number] -= 1
+        if not self._live[number]:
+            # Nothing in the block is reachable any more; drop its data
+            self._blocks[number] = b""
+            self._cache.pop(number, None)
+        return task
+
+    def iter_from(self, start: Optional[int] = None) -> Iterator[Task]:
+        """Stream archived tasks in id order, from the first id >= start."""
+        index = 0 if start is None else bisect_left(self._ids, start)
+        while index < len(self._ids):
+            yield self._task(index)
+            index += 1
+
+    def values(self) -> Iterator[Task]:
+        """Every archived task in id order."""
+        return self.iter_from()
@@ -0,0 +1,592 @@
+"""
+Throughput benchmarks for the Todo App.
+
+Usage: python benchmark.py [--tasks N] [--storage SIZES] [--shards COUNTS] [--daemon] [--archive]
+                           [--columnar] [--report] [--snapshots] [--changefeed]
+"""
+import argparse
+import copy
+import gc
+import io
+import json
+import multiprocessing
+import os
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+import analytics
+from archive import TaskArchive
+from changefeed import ChangeFeed, Subscription
+from columnar import ColumnarStore
+from dates import parse_date
+from journal import Journal
+from main import Task, TodoApp
+from metrics import Metrics
+from output import NullSink, TerminalSink
+from persistent import PersistentStore
+from profiling import Profiler
+from sharding import ShardedTodoApp
+from storage import MemoryStore, SQLiteStore
+
+
+def _timed(func, *args):
+    """Run func with console output discarded and return elapsed seconds."""
+    gc.collect()
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        start = time.perf_counter()
+        func(*args)
+        return time.perf_counter() - start
+
+
+def _report(name, count, loop_seconds, bulk_seconds):
+    print(f"{name:<10} {count / loop_seconds:>14,.0f} {count / bulk_seconds:>14,.0f} "
+          f"{loop_seconds / bulk_seconds:>8.1f}x")
+
+
+def bench_bulk_mutations(count):
+    """Compare the per-item mutators against their batch variants."""
+    items = [(f"Task number {i}", f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}") for i in range(count)]
+    ids = list(range(1, count + 1))
+    updates = [(task_id, f"Updated task {task_id}", None) for task_id in ids]
+
+    loop_app, bulk_app = TodoApp(sink=NullSink()), TodoApp(sink=NullSink())
+    print(f"{'operation':<10} {'loop ops/s':>14} {'bulk ops/s':>14} {'speedup':>9}")
+
+    def add_loop():
+        for description, due_date in items:
+            loop_app.add_task(description, due_date)
+    _report("add", count, _timed(add_loop), _timed(bulk_app.add_tasks, items))
+
+    def update_loop():
+        for task_id, description, due_date in updates:
+            loop_app.update_task(task_id, description, due_date)
+    _report("update", count, _timed(update_loop), _timed(bulk_app.update_tasks, updates))
+
+    def mark_loop():
+        for task_id in ids:
+            loop_app.mark_task_complete(task_id, True)
+    _report("complete", count, _timed(mark_loop), _timed(bulk_app.mark_tasks, ids, True))
+
+    def delete_loop():
+        for task_id in ids:
+            loop_app.delete_task(task_id)
+    _report("delete", count, _timed(delete_loop), _timed(bulk_app.delete_tasks, ids))
+
+
+def bench_batch_mode(count):
+    """Compare commands/sec of the interactive loop and --batch mode."""
+    lines = []
+    for i in range(count):
+        lines.append(f'add "Task number {i}" 2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}')
+        if i % 10 == 9:
+            lines.append(f"complete {i}")
+    script = "\n".join(lines) + "\n"
+
+    def interactive():
+        stdin = sys.stdin
+        sys.stdin = io.StringIO(script)
+        try:
+            TodoApp().run()
+        finally:
+            sys.stdin = stdin
+
+    def batch():
+        TodoApp().run_batch(io.StringIO(script))
+
+    interactive_seconds = _timed(interactive)
+    batch_seconds = _timed(batch)
+    print(f"\n{'mode':<12} {'commands/s':>14}")
+    print(f"{'interactive':<12} {len(lines) / interactive_seconds:>14,.0f}")
+    print(f"{'batch':<12} {len(lines) / batch_seconds:>14,.0f}")
+
+
+def bench_sinks(count):
+    """Compare add_task through the terminal renderer with the null sink."""
+    descriptions = [f"Task number {i}" for i in range(count)]
+
+    def add_all(app):
+        for description in descriptions:
+            app.add_task(description)
+
+    with open(os.devnull, "w") as devnull:
+        terminal_seconds = _timed(add_all, TodoApp(sink=TerminalSink(devnull)))
+    null_seconds = _timed(add_all, TodoApp(sink=NullSink()))
+    print(f"\n{'sink':<12} {'adds/s':>14}")
+    print(f"{'terminal':<12} {count / terminal_seconds:>14,.0f}")
+    print(f"{'null':<12} {count / null_seconds:>14,.0f}")
+
+
+def _command_mix(count):
+    """A --batch script of count adds with completions, page views and searches mixed in."""
+    lines = []
+    for i in range(count):
+        lines.append(f'add "Task number {i}" 2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}')
+        if i % 10 == 9:
+            lines.extend([f"complete {i}", f"view pending --limit 20 --after {i - 9}",
+                          f"search number {i}"])
+    return lines
+
+
+def bench_metrics(count):
+    """Measure what command metrics add to --batch mode."""
+    lines = _command_mix(count)
+
+    def batch(metrics):
+        TodoApp(metrics=metrics).run_batch(lines)
+
+    # Alternate the runs and keep the best of each, to cancel out drift
+    plain_seconds = metered_seconds = float("inf")
+    for _ in range(5):
+        plain_seconds = min(plain_seconds, _timed(batch, None))
+        metered_seconds = min(metered_seconds, _timed(batch, Metrics()))
+    print(f"\n{'metrics':<12} {'commands/s':>14}")
+    print(f"{'off':<12} {len(lines) / plain_seconds:>14,.0f}")
+    print(f"{'on':<12} {len(lines) / metered_seconds:>14,.0f}")
+    print(f"overhead: {(metered_seconds / plain_seconds - 1) * 100:.1f}%")
+
+
+def bench_profiler(count):
+    """Compare --batch throughput unprofiled and profiled at several sampling rates."""
+    lines = _command_mix(count)
+    print(f"\n{'profiling':<12} {'commands/s':>14} {'slowdown':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        plain_seconds = None
+        for sample_every in (None, 1, 10, 100):
+            profiler = Profiler(directory, sample_every) if sample_every else None
+            seconds = _timed(lambda: TodoApp(profiler=profiler).run_batch(lines))
+            plain_seconds = plain_seconds or seconds
+            label = f"1 in {sample_every}" if sample_every else "off"
+            print(f"{label:<12} {len(lines) / seconds:>14,.0f} {seconds / plain_seconds:>8.2f}x")
+
+
+def bench_view_pages(count):
+    """Compare a 20-row page with rendering the full list."""
+    app = TodoApp(sink=TerminalSink())
+    _timed(app.add_tasks, [(f"Task number {i}", f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}")
+                           for i in range(count)])
+    runs = 20
+    cases = [
+        ("full list", {}),
+        ("page by id", {"limit": 20}),
+        ("page by cursor", {"limit": 20, "after": count // 2}),
+        ("page by due", {"limit": 20, "sort": "due"}),
+    ]
+    print(f"\n{'view':<16} {'ms/call':>10}")
+    for name, options in cases:
+        seconds = _timed(lambda: [app.view_tasks("pending", **options) for _ in range(runs)])
+        print(f"{name:<16} {seconds / runs * 1000:>10.2f}")
+
+
+def bench_task_construction(count):
+    """Time building Task objects directly and from serialized dicts."""
+    dates = [f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}" for i in range(count)]
+    records = [Task(i, f"Task number {i}", i % 3 == 0, dates[i]).to_dict() for i in range(count)]
+
+    def construct():
+        for i in range(count):
+            Task(i, "Task", False, dates[i])
+
+    def load():
+        for data in records:
+            Task.from_dict(data)
+
+    print(f"\n{'tasks':<12} {'per second':>14}")
+    print(f"{'Task()':<12} {count / _timed(construct):>14,.0f}")
+    print(f"{'from_dict':<12} {count / _timed(load):>14,.0f}")
+    tasks = [Task.from_dict(data) for data in records]
+    print(f"{'to_dict':<12} {count / _timed(lambda: [task.to_dict() for task in tasks]):>14,.0f}")
+
+
+def bench_ndjson(count):
+    """Time streaming export and import of the whole task list."""
+    app = TodoApp(sink=NullSink())
+    app.add_tasks([(f"Task number {i}", f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}") for i in range(count)])
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "tasks.ndjson")
+        export_seconds = _timed(app.export_tasks, path)
+        import_seconds = _timed(TodoApp(sink=NullSink()).import_tasks, path)
+    print(f"\n{'ndjson':<12} {'records/s':>14}")
+    print(f"{'export':<12} {count / export_seconds:>14,.0f}")
+    print(f"{'import':<12} {count / import_seconds:>14,.0f}")
+
+
+def bench_storage(sizes):
+    """Compare the in-memory and SQLite stores on bulk loads, point writes and queries."""
+    runs = 20
+    print(f"\n{'store':<8} {'tasks':>9} {'bulk add/s':>12} {'add ms':>8} {'complete ms':>12} "
+          f"{'page ms':>8} {'due ms':>8} {'next ms':>8} {'search ms':>10}")
+    for count in sizes:
+        items = [(f"Task number {i}", f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}") for i in range(count)]
+        with tempfile.TemporaryDirectory() as directory:
+            for name, store in (("memory", MemoryStore()),
+                                ("sqlite", SQLiteStore(os.path.join(directory, "tasks.db")))):
+                app = TodoApp(sink=NullSink(), store=store)
+                bulk_seconds = _timed(app.add_tasks, items)
+                add_seconds = _timed(lambda: [app.add_task("One more task", "2025-06-01") for _ in range(runs)])
+                complete_seconds = _timed(lambda: [app.mark_task_complete(i * 7 + 1, True) for i in range(runs)])
+                timings = [
+                    _timed(lambda: [app.view_tasks("pending", limit=20, after=count // 2) for _ in range(runs)]),
+                    _timed(lambda: [app.view_tasks("due-before", "2025-02-01", limit=20) for _ in range(runs)]),
+                    _timed(lambda: [app.next_due_tasks(10, "2025-06-15") for _ in range(runs)]),
+                    _timed(lambda: [app.search("number 4242") for _ in range(runs)]),
+                ]
+                print(f"{name:<8} {count:>9,} {count / bulk_seconds:>12,.0f} "
+                      f"{add_seconds / runs * 1000:>8.3f} {complete_seconds / runs * 1000:>12.3f} "
+                      + " ".join(f"{seconds / runs * 1000:>{width}.3f}"
+                                 for seconds, width in zip(timings, (8, 8, 8, 10))))
+                app.close()
+
+
+def _aged_app(count):
+    """An app of count tasks, nine in ten completed and all created 90 days ago."""
+    app = TodoApp(sink=NullSink(), archive=TaskArchive(30))
+    app.add_tasks([(f"Task number {i}", f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}") for i in range(count)])
+    app.mark_tasks([i for i in range(1, count + 1) if i % 10], True)
+    old = int(time.time()) - 90 * 86400
+    for task in app.tasks.values():
+        task.created_ts = old
+    return app
+
+
+def bench_archive(count):
+    """Compare memory and latency with old completed tasks live and archived."""
+    # Memory is traced in a separate run, since tracemalloc slows everything down
+    tracemalloc.start()
+    app = _aged_app(count)
+    gc.collect()
+    memory = [tracemalloc.get_traced_memory()[0]]
+    app.archive_completed()
+    gc.collect()
+    memory.append(tracemalloc.get_traced_memory()[0])
+    del app
+    tracemalloc.stop()
+
+    runs = 200
+    app = _aged_app(count)
+    probe = [task_id for task_id in range(1, count + 1, max(1, count // runs)) if task_id % 10]
+
+    def measure():
+        return [
+            _timed(lambda: [app.view_tasks("pending", limit=20, after=count // 2) for _ in range(runs)]) / runs,
+            _timed(lambda: [app.view_tasks("completed", limit=20, after=count // 2, include_archived=True)
+                            for _ in range(runs)]) / runs,
+            _timed(lambda: [app.get_task(task_id) for task_id in probe]) / len(probe),
+            _timed(lambda: [app.summary("2025-06-15") for _ in range(runs)]) / runs,
+        ]
+
+    print(f"\n{'archive':<8} {'live':>9} {'archived':>9} {'MiB':>8} {'pending ms':>11} "
+          f"{'completed ms':>13} {'get us':>8} {'summary ms':>11}")
+    rows = [("off", measure())]
+    archive_seconds = _timed(app.archive_completed)
+    rows.append(("on", measure()))
+    for (name, (pending, completed, get, summary)), used in zip(rows, memory):
+        archived = len(app.archive) if name == "on" else 0
+        print(f"{name:<8} {count - archived:>9,} {archived:>9,} {used / (1 << 20):>8.1f} "
+              f"{pending * 1000:>11.3f} {completed * 1000:>13.3f} {get * 1e6:>8.1f} {summary * 1000:>11.3f}")
+    rehydrate_seconds = _timed(lambda: [app.mark_task_complete(task_id, False) for task_id in probe])
+    print(f"archive pass {archive_seconds:.2f}s, {app.archive.compressed_bytes / (1 << 20):.1f} MiB "
+          f"compressed; rehydrate {rehydrate_seconds / len(probe) * 1e6:.0f}us per task")
+
+
+def _profile_store(name, count, connection):
+    """Load count tasks into a fresh store and send back its memory use and query timings."""
+    before = Metrics.gauges()["memory"]
+    app = TodoApp(sink=NullSink(), store=ColumnarStore() if name == "columnar" else MemoryStore())
+    chunk = 10000
+    load_seconds = 0.0
+    # Built a chunk at a time, so the input lists do not inflate the peak
+    for first in range(0, count, chunk):
+        items = [(f"Task number {i}", f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}")
+                 for i in range(first, min(count, first + chunk))]
+        load_seconds += _timed(app.add_tasks, items)
+        app.mark_tasks(range(first + 1, first + len(items) + 1, 3), True)
+    gc.collect()
+    resident = Metrics.gauges()["memory"]
+    runs = 5
+    tasks = app.tasks
+    cutoff = parse_date("2025-03-01")
+    timings = [
+        _timed(lambda: [sum(1 for _ in tasks.iter_status(False)) for _ in range(runs)]) / runs,
+        _timed(lambda: [sum(1 for _ in tasks.iter_status(True)) for _ in range(runs)]) / runs,
+        _timed(lambda: [sum(1 for _ in tasks.iter_due(None, cutoff, False, True)) for _ in range(runs)]) / runs,
+        _timed(lambda: [app.view_tasks("pending", limit=20, after=count // 2) for _ in range(runs)]) / runs,
+        _timed(lambda: [tasks.get(task_id) for task_id in range(1, count + 1, max(1, count // 10000))])
+        / min(count, 10000),
+        _timed(lambda: [app.search("number 4242") for _ in range(runs)]) / runs,
+    ]
+    # ru_maxrss is in kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    connection.send((before, resident, peak, count / load_seconds, timings))
+    connection.close()
+
+
+def bench_columnar(count):
+    """Compare resident memory and scan speed of the dict-of-objects and columnar stores."""
+    # Each store is loaded in a fresh interpreter, so peak RSS belongs to it alone
+    context = multiprocessing.get_context("spawn")
+    print(f"\n{'store':<10} {'MiB':>8} {'peak MiB':>9} {'B/task':>7} {'add/s':>10} {'pending ms':>11} "
+          f"{'completed ms':>13} {'overdue ms':>11} {'page ms':>8} {'get us':>7} {'search ms':>10}")
+    for name in ("memory", "columnar"):
+        parent, child = context.Pipe()
+        process = context.Process(target=_profile_store, args=(name, count, child))
+        process.start()
+        child.close()
+        before, resident, peak, add_rate, timings = parent.recv()
+        process.join()
+        pending, completed, overdue, page, get, search = timings
+        print(f"{name:<10} {(resident - before) / (1 << 20):>8.1f} {peak / (1 << 20):>9.1f} "
+              f"{(resident - before) / count:>7.0f} {add_rate:>10,.0f} {pending * 1000:>11.1f} "
+              f"{completed * 1000:>13.1f} {overdue * 1000:>11.1f} {page * 1000:>8.3f} "
+              f"{get * 1e6:>7.2f} {search * 1000:>10.1f}")
+
+
+def bench_report(count):
+    """Time the report aggregates with NumPy and in pure Python, and the column export they share."""
+    app = TodoApp(sink=NullSink())
+    now = int(time.time())
+    app.add_tasks([(f"Task number {i}", f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}") for i in range(count)])
+    app.mark_tasks(range(1, count + 1, 3), True)
+    # Spread creation times over two years so there are months to group by
+    for task in app.tasks.values():
+        task.created_ts = now - task.id * 63072000 // count
+    today = parse_date("2025-06-15")
+    runs = 3
+    export_seconds = _timed(lambda: [app._report_columns() for _ in range(runs)]) / runs
+    columns = app._report_columns()
+    print(f"\n{'report':<12} {'ms':>10} {'speedup':>8}")
+    print(f"{'export':<12} {export_seconds * 1000:>10.1f}")
+    python_seconds = _timed(lambda: [analytics.report(columns, today, False) for _ in range(runs)]) / runs
+    print(f"{'python':<12} {python_seconds * 1000:>10.1f} {1:>7.1f}x")
+    if analytics.numpy is None:
+        print("numpy        not installed")
+        return
+    numpy_seconds = _timed(lambda: [analytics.report(columns, today, True) for _ in range(runs)]) / runs
+    print(f"{'numpy':<12} {numpy_seconds * 1000:>10.1f} {python_seconds / numpy_seconds:>7.1f}x")
+
+
+def bench_shards(count, worker_counts):
+    """Compare query throughput of one process with the sharded app at several worker counts."""
+    items = [(f"Task number {i}", f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}") for i in range(count)]
+    queries = [
+        ("page by due", lambda app: app.view_tasks("pending", limit=20, sort="due")),
+        ("page by created", lambda app: app.view_tasks("all", limit=20, offset=100, sort="created")),
+        ("due-between", lambda app: app.view_tasks("due-between", "2025-03-01", "2025-03-07", limit=20)),
+        ("search", lambda app: app.search("number 4*")),
+    ]
+    print(f"\n{'queries/s':<16} {'single':>10}" + "".join(f" {f'{n} shards':>10}" for n in worker_counts))
+    apps = [TodoApp(sink=NullSink())] + [ShardedTodoApp(n, sink=NullSink()) for n in worker_counts]
+    try:
+        for app in apps:
+            app.add_tasks(items)
+        runs = 10
+        for name, query in queries:
+            rates = [runs / _timed(lambda: [query(app) for _ in range(runs)]) for app in apps]
+            print(f"{name:<16}" + "".join(f" {rate:>10,.1f}" for rate in rates))
+    finally:
+        for app in apps:
+            app.close()
+
+
+def bench_daemon(count):
+    """Compare one-shot main.py runs with todo_client.py and a connection kept to the daemon."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    runs = 10
+    with tempfile.TemporaryDirectory() as directory:
+        journal_dir = os.path.join(directory, "journal")
+        app = TodoApp(Journal(journal_dir), sink=NullSink())
+        app.add_tasks([(f"Task number {i}", f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}") for i in range(count)])
+        app.close()
+        path = os.path.join(directory, "todo.sock")
+
+        def run(*args, stdin=None):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, *args], input=stdin, stdout=subprocess.DEVNULL,
+                           check=True, text=True, cwd=here)
+            return time.perf_counter() - start
+
+        cold = [run("main.py", "--journal", journal_dir, "--batch", "-", stdin="view next 1\n")
+                for _ in range(runs)]
+        daemon = subprocess.Popen([sys.executable, "main.py", "--journal", journal_dir, "--daemon", path],
+                                  stdout=subprocess.PIPE, text=True, cwd=here)
+        try:
+            daemon.stdout.readline()  # wait until it is listening
+            client = [run("todo_client.py", "--socket", path, "view", "next", "1") for _ in range(runs)]
+
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.connect(path)
+            replies = connection.makefile("rb")
+            request = json.dumps(["view", "next", "1"]).encode() + b"\n"
+            round_trips = []
+            for _ in range(runs * 100):
+                start = time.perf_counter()
+                connection.sendall(request)
+                replies.readline()
+                round_trips.append(time.perf_counter() - start)
+            pipelined = 1000
+            start = time.perf_counter()
+            connection.sendall(request * pipelined)
+            for _ in range(pipelined):
+                replies.readline()
+            pipelined_seconds = time.perf_counter() - start
+            connection.sendall(json.dumps(["shutdown"]).encode() + b"\n")
+            replies.readline()
+            connection.close()
+        finally:
+            daemon.wait()
+
+    print(f"\n{'one command, ' + format(count, ',') + ' tasks':<32} {'median ms':>10}")
+    print(f"{'main.py cold start':<32} {statistics.median(cold) * 1000:>10.2f}")
+    print(f"{'todo_client.py to daemon':<32} {statistics.median(client) * 1000:>10.2f}")
+    print(f"{'open connection round trip':<32} {statistics.median(round_trips) * 1000:>10.3f}")
+    print(f"{'pipelined, per command':<32} {pipelined_seconds / pipelined * 1000:>10.3f}")
+
+
+def bench_snapshots(count):
+    """Compare snapshots of the persistent store with deep copies of the default one."""
+    apps = {}
+    for name, store in (("memory", MemoryStore()), ("persistent", PersistentStore())):
+        app = TodoApp(sink=NullSink(), store=store)
+        app.add_tasks([(f"Task number {i}", f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}") for i in range(count)])
+        apps[name] = app
+    app = apps["persistent"]
+    app.save_snapshot()
+    edits = 1000
+    probe = range(1, count + 1, max(1, count // edits))
+    rates = {name: len(probe) / _timed(lambda: [each.mark_task_complete(task_id, True) for task_id in probe])
+             for name, each in apps.items()}
+    snapshot_seconds = _timed(lambda: [app.save_snapshot() for _ in range(edits)]) / edits
+    copies = 3
+    deepcopy_seconds = _timed(lambda: [copy.deepcopy(dict(apps["memory"].tasks)) for _ in range(copies)]) / copies
+    undo_seconds = _timed(lambda: [app.undo() for _ in range(app.UNDO_LIMIT)]) / app.UNDO_LIMIT
+    redo_seconds = _timed(lambda: [app.redo() for _ in range(app.UNDO_LIMIT)]) / app.UNDO_LIMIT
+    rollback_seconds = _timed(app.rollback, 1)
+
+    # Memory held per kept version: one edit then a snapshot, versus one deep copy
+    versions = 100
+    gc.collect()
+    tracemalloc.start()
+    for task_id in range(1, versions + 1):
+        app.update_task(task_id, f"Edited task {task_id}")
+        app.save_snapshot()
+    gc.collect()
+    version_bytes = tracemalloc.get_traced_memory()[0] / versions
+    tracemalloc.stop()
+    gc.collect()
+    tracemalloc.start()
+    kept = copy.deepcopy(dict(apps["memory"].tasks))
+    gc.collect()
+    deepcopy_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+
+    print(f"\n{'store':<12} {'complete/s':>11}")
+    for name, rate in rates.items():
+        print(f"{name:<12} {rate:>11,.0f}")
+    print(f"\n{'snapshot':<12} {'us':>12} {'KiB kept':>10}")
+    print(f"{'persistent':<12} {snapshot_seconds * 1e6:>12.2f} {version_bytes / 1024:>10.1f}")
+    print(f"{'deepcopy':<12} {deepcopy_seconds * 1e6:>12,.0f} {deepcopy_bytes / 1024:>10,.0f}")
+    print(f"undo {undo_seconds * 1e6:.0f}us, redo {redo_seconds * 1e6:.0f}us per change; "
+          f"rollback across {edits} changes {rollback_seconds * 1000:.1f}ms")
+
+
+def bench_changefeed(count):
+    """Measure what publishing to a change feed adds to each mutation, and how fast it drains."""
+    def mutations(app):
+        ids = range(1, count + 1)
+        return [
+            ("add", lambda: [app.add_task(f"Task number {i}", "2025-01-01") for i in ids]),
+            ("update", lambda: [app.update_task(i, f"Renamed task {i}") for i in ids]),
+            ("complete", lambda: [app.mark_task_complete(i, True) for i in ids]),
+            ("delete", lambda: [app.delete_task(i) for i in ids]),
+        ]
+
+    # Best of several runs, alternating the two so drift affects both alike
+    runs = 5
+    timings = {}
+    for _ in range(runs):
+        for name in ("off", "on"):
+            app = TodoApp(sink=NullSink(), feed=ChangeFeed() if name == "on" else None)
+            seconds = [_timed(run) for _, run in mutations(app)]
+            best = timings.get(name, seconds)
+            timings[name] = [min(pair) for pair in zip(best, seconds)]
+    print(f"\n{'mutation':<10} {'off ops/s':>12} {'on ops/s':>12} {'overhead ns':>12}")
+    for (operation, _), off, on in zip(mutations(None), timings["off"], timings["on"]):
+        print(f"{operation:<10} {count / off:>12,.0f} {count / on:>12,.0f} {(on - off) / count * 1e9:>12.0f}")
+
+    feed = ChangeFeed(count)
+    record = {'op': 'delete', 'id': 1}
+    publish_seconds = _timed(lambda: [feed.publish(record) for _ in range(count)])
+    subscription = Subscription(feed, batch_size=1000)
+    drain_seconds = _timed(lambda: [None for _ in iter(subscription.poll, [])])
+    print(f"publish alone {publish_seconds / count * 1e9:.0f}ns; "
+          f"polling in batches of 1000 drains {count / drain_seconds:,.0f} changes/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Todo App benchmarks")
+    parser.add_argument("--tasks", type=int, default=100000, help="number of tasks per benchmark")
+    parser.add_argument("--storage", metavar="SIZES",
+                        help="only compare the memory and SQLite stores at these comma-separated "
+                             "task counts, e.g. 10000,100000,1000000")
+    parser.add_argument("--shards", metavar="COUNTS",
+                        help="only compare query throughput of one process with the sharded app "
+                             "at these comma-separated worker counts, e.g. 1,2,4")
+    parser.add_argument("--daemon", action="store_true",
+                        help="only compare one-shot main.py runs with the daemon and its client")
+    parser.add_argument("--archive", action="store_true",
+                        help="only compare memory and latency before and after archiving old completed tasks")
+    parser.add_argument("--columnar", action="store_true",
+                        help="only compare memory and scan speed of the default and columnar stores")
+    parser.add_argument("--report", action="store_true",
+                        help="only compare the report aggregates with NumPy and in pure Python")
+    parser.add_argument("--snapshots", action="store_true",
+                        help="only compare persistent-store snapshots and undo with deep copies")
+    parser.add_argument("--changefeed", action="store_true",
+                        help="only measure the cost of publishing mutations to a change feed")
+    args = parser.parse_args()
+
+    if args.changefeed:
+        bench_changefeed(args.tasks)
+        return
+    if args.snapshots:
+        bench_snapshots(args.tasks)
+        return
+    if args.report:
+        bench_report(args.tasks)
+        return
+    if args.columnar:
+        bench_columnar(args.tasks)
+        return
+    if args.archive:
+        bench_archive(args.tasks)
+        return
+    if args.daemon:
+        bench_daemon(args.tasks)
+        return
+    if args.shards:
+        bench_shards(args.tasks, [int(count) for count in args.shards.split(",")])
+        return
+    if args.storage:
+        bench_storage([int(size) for size in args.storage.split(",")])
+        return
+
+    print(f"Python {sys.version.split()[0]}, {args.tasks:,} tasks\n")
+    bench_bulk_mutations(args.tasks)
+    bench_task_construction(args.tasks)
+    bench_batch_mode(args.tasks)
+    bench_sinks(args.tasks)
+    bench_metrics(args.tasks)
+    bench_profiler(args.tasks)
+    bench_view_pages(args.tasks)
+    bench_ndjson(args.tasks)
+
+
+if __name__ == "__main__":
+    main()
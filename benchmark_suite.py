@@ -0,0 +1,243 @@
+"""
+Benchmark suite timing every TodoApp operation at several task-list sizes.
+
+Each operation is timed with console output suppressed and reported as
+operations per second, together with the peak memory it allocated (measured
+in a separate, traced pass so tracing does not slow the timed one). Results
+can be saved as a JSON baseline, and a later run compared against it fails
+when any operation regressed by more than a threshold.
+
+Usage:
+    python benchmark_suite.py [--sizes 1000,10000,100000,1000000]
+                              [--save-baseline FILE] [--baseline FILE]
+                              [--threshold 0.25]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from typing import Callable, Dict, List, Tuple
+
+from main import Task, TodoApp
+from output import NullSink
+
+# Fastest of this many timed runs is reported, to ride out scheduler noise
+REPEAT = 3
+
+# Views are called repeatedly until a run takes at least this long
+MIN_RUN_SECONDS = 0.05
+
+
+def _items(count: int, start: int = 0) -> List[Tuple[str, str]]:
+    return [(f"Task number {i}", f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}")
+            for i in range(start, start + count)]
+
+
+def _time_runs(run: Callable[[], int]) -> float:
+    """Best operations/sec over REPEAT calls of run, which returns its operation count."""
+    best = 0.0
+    for _ in range(REPEAT):
+        gc.collect()
+        start = time.perf_counter()
+        count = run()
+        elapsed = time.perf_counter() - start
+        best = max(best, count / elapsed if elapsed > 0 else float("inf"))
+    return best
+
+
+def _peak_bytes(run: Callable[[], int]) -> int:
+    """Peak memory allocated by one call of run, above what was allocated before it."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        run()
+        return max(0, tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+
+def _repeated(call: Callable[[], object]) -> Callable[[], int]:
+    """Turn a single call into a run that repeats it for at least MIN_RUN_SECONDS."""
+    def run() -> int:
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            call()
+            calls += 1
+            if time.perf_counter() - start >= MIN_RUN_SECONDS:
+                return calls
+    return run
+
+
+def _operations(app: TodoApp, size: int, ops: int) -> List[Tuple[str, Callable[[], int], Callable[[], int]]]:
+    """
+    The operations to benchmark against an app preloaded with size tasks.
+
+    Returns:
+        (name, timed run, traced run) triples in the order they must run;
+        each run performs a batch of operations and returns how many
+    """
+    # Every run of a mutator works on ids no earlier run touched
+    next_ids = iter(range(1, size + 1))
+
+    def id_batch(count: int) -> List[int]:
+        return [next(next_ids) for _ in range(count)]
+
+    def adds(count: int) -> Callable[[], int]:
+        def run():
+            for description, due_date in _items(count):
+                app.add_task(description, due_date)
+            return count
+        return run
+
+    def updates(count: int) -> Callable[[], int]:
+        def run():
+            for task_id in id_batch(count):
+                app.update_task(task_id, f"Updated task {task_id}", "2025-07-01")
+            return count
+        return run
+
+    def marks(count: int) -> Callable[[], int]:
+        def run():
+            for task_id in id_batch(count):
+                app.mark_task_complete(task_id, True)
+            return count
+        return run
+
+    def deletes(count: int) -> Callable[[], int]:
+        def run():
+            for task_id in id_batch(count):
+                app.delete_task(task_id)
+            return count
+        return run
+
+    def view(*args, **options) -> Callable[[], int]:
+        return _repeated(lambda: app.view_tasks(*args, **options))
+
+    sample = [Task(i, f"Task number {i}", i % 3 == 0, f"2025-{i % 12 + 1:02d}-15") for i in range(ops)]
+    records = [task.to_dict() for task in sample]
+
+    def to_dict() -> int:
+        for task in sample:
+            task.to_dict()
+        return len(sample)
+
+    def from_dict() -> int:
+        for data in records:
+            Task.from_dict(data)
+        return len(records)
+
+    traced = max(1, min(ops, 1000))
+    views = [
+        ("view all", view()),
+        ("view completed", view("completed")),
+        ("view pending", view("pending")),
+        ("view overdue", view("overdue")),
+        ("view due-before", view("due-before", "2025-04-01")),
+        ("view due-between", view("due-between", "2025-03-01", "2025-03-31")),
+        ("view next", view("next", "20")),
+        ("view page", view("pending", limit=20, after=size // 2)),
+        ("view page by due", view("pending", limit=20, sort="due")),
+        ("summary", _repeated(app.summary)),
+    ]
+    return [
+        ("add_task", adds(ops), adds(traced)),
+        ("update_task", updates(ops), updates(traced)),
+        ("mark_task_complete", marks(ops), marks(traced)),
+        *[(name, run, run) for name, run in views],
+        ("Task.to_dict", to_dict, to_dict),
+        ("Task.from_dict", from_dict, from_dict),
+        ("delete_task", deletes(ops), deletes(traced)),
+    ]
+
+
+def run_size(size: int) -> Dict[str, Dict[str, float]]:
+    """Benchmark every operation at one task-list size."""
+    app = TodoApp(sink=NullSink())
+    app.add_tasks(_items(size))
+    # Mutators get a batch that is large enough to time reliably but leaves
+    # enough untouched ids for the timed and traced runs of all three
+    # id-based mutators
+    ops = max(1, min(10000, size // (3 * (REPEAT + 1))))
+    results = {}
+    for name, timed, traced in _operations(app, size, ops):
+        rate = _time_runs(timed)
+        results[name] = {"ops_per_sec": rate, "peak_bytes": _peak_bytes(traced)}
+        print(f"{size:>9,} {name:<20} {rate:>14,.0f} {results[name]['peak_bytes'] / 1024:>12,.1f}",
+              file=sys.stderr)
+    app.close()
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """
+    List the operations that regressed against a baseline.
+
+    An operation regresses when its throughput fell, or its peak memory
+    grew, by more than threshold (a fraction). Memory below 64 KiB is
+    ignored, since allocator noise dominates there.
+    """
+    regressions = []
+    for size, operations in current["results"].items():
+        for name, result in operations.items():
+            before = baseline.get("results", {}).get(size, {}).get(name)
+            if before is None:
+                continue
+            if result["ops_per_sec"] < before["ops_per_sec"] * (1 - threshold):
+                regressions.append(f"{name} @ {size}: {result['ops_per_sec']:,.0f} ops/s, "
+                                   f"was {before['ops_per_sec']:,.0f}")
+            if (result["peak_bytes"] > 64 * 1024
+                    and result["peak_bytes"] > before["peak_bytes"] * (1 + threshold)):
+                regressions.append(f"{name} @ {size}: peak {result['peak_bytes'] / 1024:,.0f} KiB, "
+                                   f"was {before['peak_bytes'] / 1024:,.0f} KiB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Todo App benchmark suite")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000",
+                        help="comma-separated task-list sizes")
+    parser.add_argument("--save-baseline", metavar="FILE", help="write the results as a JSON baseline")
+    parser.add_argument("--baseline", metavar="FILE", help="compare against a saved JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown or memory growth as a fraction (default 0.25)")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    print(f"Python {sys.version.split()[0]} on {platform.platform()}", file=sys.stderr)
+    print(f"{'tasks':>9} {'operation':<20} {'ops/s':>14} {'peak KiB':>12}", file=sys.stderr)
+    current = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": {},
+    }
+    # Console output from the app is suppressed while timing; the table
+    # goes to stderr so it stays visible
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        for size in sizes:
+            current["results"][str(size)] = run_size(size)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as stream:
+            json.dump(current, stream, indent=2)
+        print(f"Baseline written to {args.save_baseline}", file=sys.stderr)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as stream:
+            baseline = json.load(stream)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.baseline}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
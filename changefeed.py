@@ -0,0 +1,219 @@
+"""
+In-process feed of task changes.
+
+A TodoApp given a ChangeFeed publishes every mutation record it journals
+(``add``, ``update``, ``delete`` and ``complete``, in the journal's format;
+batches are split into their records) under consecutive sequence numbers
+starting at 1. The feed keeps the most recent ``capacity`` changes in a ring
+buffer, so publishing is a few stores into preallocated lists and never
+blocks on subscribers. A subscriber that falls further behind than the
+buffer gets a FeedOverflow naming the oldest change still buffered, and has
+to resync from the task list itself before resuming from there.
+
+Subscribers read in batches: by polling (Subscription.poll), by blocking in
+a thread (Subscription.get_batch), or by awaiting from an asyncio event loop
+(Subscription.next_batch, or ``async for batch in subscription``). Waiters
+are woken when changes are published from any thread. A Subscription is
+only a position, so resuming is creating one with the last sequence number
+handled. Sequence numbers start again at 1 when the app restarts.
+
+The records are shared with the journal and every subscriber and must not
+be modified.
+"""
+
+import asyncio
+import threading
+from typing import Callable, List, Optional, Tuple
+
+# A published change: its sequence number and mutation record
+Change = Tuple[int, dict]
+
+
+class FeedOverflow(Exception):
+    """The changes a subscriber asked for have already been overwritten."""
+
+    def __init__(self, after: int, oldest: int):
+        super().__init__(f"changes after {after} are no longer buffered; the oldest is {oldest}")
+        self.after = after
+        self.oldest = oldest
+
+
+class ChangeFeed:
+    """Bounded, sequence-numbered buffer of mutation records."""
+
+    def __init__(self, capacity: int = 65536):
+        """
+        Args:
+            capacity: Changes kept for subscribers that fall behind, rounded
+                up to a power of two
+        """
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self.capacity = size
+        self.last_seq = 0
+        self._mask = size - 1
+        # Parallel slots rather than (seq, record) tuples, so publishing
+        # allocates nothing the garbage collector has to track. A slot's
+        # number is cleared while its record is replaced, and readers check
+        # it on both sides of reading the record (see read)
+        self._seqs = [0] * size
+        self._records: List[Optional[dict]] = [None] * size
+        self._waiters: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def oldest_seq(self) -> int:
+        """Sequence number of the oldest change still buffered."""
+        return max(1, self.last_seq - self.capacity + 1)
+
+    def publish(self, record: dict):
+        """Append a mutation record (or each record of a batch) and wake any waiters."""
+        if record['op'] == 'batch':
+            self._publish_batch(record['records'])
+            return
+        seq = self.last_seq + 1
+        index = seq & self._mask
+        seqs = self._seqs
+        seqs[index] = 0
+        self._records[index] = record
+        seqs[index] = seq
+        self.last_seq = seq
+        if self._waiters:
+            self._wake()
+
+    def _publish_batch(self, records: List[dict]):
+        seqs, slots, mask = self._seqs, self._records, self._mask
+        seq = self.last_seq
+        for record in records:
+            seq += 1
+            index = seq & mask
+            seqs[index] = 0
+            slots[index] = record
+            seqs[index] = seq
+        self.last_seq = seq
+        if self._waiters:
+            self._wake()
+
+    def read(self, after: int, limit: int = 1000) -> List[Change]:
+        """
+        The changes following a sequence number, oldest first.
+
+        Args:
+            after: Last sequence number already handled (0 for the start)
+            limit: Maximum number of changes to return
+
+        Returns:
+            Up to limit changes, empty if there are none yet
+
+        Raises:
+            FeedOverflow: The change after ``after`` has been overwritten
+        """
+        if after > self.last_seq:
+            raise ValueError(f"sequence number {after} has not been published yet")
+        seqs, slots, mask = self._seqs, self._records, self._mask
+        changes = []
+        for seq in range(after + 1, min(self.last_seq, after + limit) + 1):
+            index = seq & mask
+            # A publisher in another thread may be overwriting the slot: the
+            # record is only the one numbered seq if the number was there
+            # both before and after reading it
+            if seqs[index] != seq:
+                raise FeedOverflow(after, self.oldest_seq)
+            record = slots[index]
+            if seqs[index] != seq:
+                raise FeedOverflow(after, self.oldest_seq)
+            changes.append((seq, record))
+        return changes
+
+    def wait(self, after: int, timeout: Optional[float] = None) -> bool:
+        """Block until a change after ``after`` is published; False on timeout."""
+        event = threading.Event()
+        self._add_waiter(after, event.set)
+        return event.wait(timeout)
+
+    async def wait_async(self, after: int):
+        """Wait in an asyncio event loop until a change after ``after`` is published."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve():
+            if not future.done():
+                future.set_result(None)
+
+        def wake():
+            try:
+                loop.call_soon_threadsafe(resolve)
+            except RuntimeError:  # the loop has been closed
+                pass
+
+        self._add_waiter(after, wake)
+        await future
+
+    def _add_waiter(self, after: int, wake: Callable[[], None]):
+        with self._lock:
+            self._waiters.append(wake)
+        # Checked after registering: publish bumps last_seq before it looks
+        # for waiters, so one of the two always sees the other
+        if self.last_seq > after:
+            wake()
+
+    def _wake(self):
+        with self._lock:
+            waiters, self._waiters = self._waiters, []
+        for wake in waiters:
+            wake()
+
+
+class Subscription:
+    """A consumer's position in a ChangeFeed."""
+
+    def __init__(self, feed: ChangeFeed, after: int = 0, batch_size: int = 1000):
+        """
+        Args:
+            feed: Feed to read
+            after: Last sequence number already handled; 0 reads from the
+                first change, feed.last_seq only sees changes from now on
+            batch_size: Maximum changes handed out at once
+        """
+        self.feed = feed
+        self.position = after
+        self.batch_size = batch_size
+
+    @property
+    def lag(self) -> int:
+        """Changes published but not yet read."""
+        return self.feed.last_seq - self.position
+
+    def poll(self) -> List[Change]:
+        """The next batch of changes, without waiting; empty if there are none."""
+        changes = self.feed.read(self.position, self.batch_size)
+        if changes:
+            self.position = changes[-1][0]
+        return changes
+
+    def get_batch(self, timeout: Optional[float] = None) -> List[Change]:
+        """The next batch, blocking up to timeout seconds for one; empty on timeout."""
+        if self.feed.last_seq <= self.position:
+            self.feed.wait(self.position, timeout)
+        return self.poll()
+
+    async def next_batch(self, linger: float = 0.0) -> List[Change]:
+        """
+        Wait for the next batch in an asyncio event loop.
+
+        Args:
+            linger: Seconds to wait after the first change arrives for more
+                to fill the batch, trading latency for fewer, larger batches
+        """
+        while self.feed.last_seq <= self.position:
+            await self.feed.wait_async(self.position)
+        if linger and self.lag < self.batch_size:
+            await asyncio.sleep(linger)
+        return self.poll()
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> List[Change]:
+        return await self.next_batch()
@@ -0,0 +1,413 @@
+"""
+Columnar in-memory task store for very large task lists.
+
+MemoryStore keeps a full Task object per task (an instance dict holding five
+attributes) plus Python ints and sets in its indexes, which adds up to
+several hundred bytes a task. ColumnarStore keeps the same data in parallel
+columns instead, one row per task in id order:
+
+- ids and creation timestamps in ``array("q")``, due-date ordinals in
+  ``array("i")`` (0 for no due date), and status bits in a ``bytearray``
+- descriptions in a StringArena: each distinct description is stored once
+  as UTF-8 in a single bytearray, and rows hold its slot number
+
+Tasks come out as TaskView objects, small ``__slots__`` records built from a
+row on demand, so only the tasks a query returns are ever materialized; a
+view is a copy, so it does not see later changes to its row. Status filters
+find their rows with a regex search over the status column, and the
+due-date index packs its keys into arrays.
+
+There is no full-text index: a search first finds candidate descriptions
+with byte searches over the arena, then verifies them and scans the
+description column for their rows. That is far slower than MemoryStore's
+inverted index, the price of storing nothing per word.
+"""
+
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from typing import Iterator, List, Optional, Set
+
+from indexes import DueDateIndex, matches_query, parse_query, tokenize
+from storage import TaskStore
+from task import Task
+
+# Status column values; deleted rows stay behind as tombstones until compacted
+_COMPLETED = 1
+_DELETED = 2
+
+_PENDING_ROW = re.compile(b"\x00")
+_COMPLETED_ROW = re.compile(b"\x01")
+_LIVE_ROW = re.compile(b"[\x00\x01]")
+
+
+class TaskView:
+    """
+    A task read out of a ColumnarStore.
+
+    Has the attributes, properties and ``to_dict`` of a Task, but no instance
+    dict. Change it only through the store, like any other stored task.
+    """
+
+    __slots__ = ("id", "description", "completed", "due_ordinal", "created_ts")
+
+    due_date = Task.due_date
+    created_at = Task.created_at
+    to_dict = Task.to_dict
+
+    def __init__(self, task_id: int, description: str, completed: bool,
+                 due_ordinal: Optional[int], created_ts: int):
+        self.id = task_id
+        self.description = description
+        self.completed = completed
+        self.due_ordinal = due_ordinal
+        self.created_ts = created_ts
+
+
+class StringArena:
+    """
+    Interned strings stored back to back as UTF-8 in one bytearray.
+
+    Slot i spans ``offsets[i]:offsets[i + 1]``. An open-addressing hash table
+    of slot numbers finds an existing copy of a string, and a reference count
+    per slot tracks how many rows use it. Unused strings stay behind as
+    garbage until ``compact()`` rewrites the arena.
+    """
+
+    def __init__(self):
+        self._data = bytearray()
+        self._offsets = array("q", [0])
+        self._refs = array("i")
+        self._table = array("i", [-1]) * 8
+        self.garbage = 0
+
+    @property
+    def wasteful(self) -> bool:
+        """Whether unused strings take up enough of the arena to be worth compacting."""
+        return self.garbage > max(1 << 20, len(self._data) // 2)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the strings, the offsets, the counts and the hash table."""
+        return len(self._data) + sum(column.itemsize * len(column)
+                                     for column in (self._offsets, self._refs, self._table))
+
+    def _bytes(self, slot: int) -> bytes:
+        return bytes(self._data[self._offsets[slot]:self._offsets[slot + 1]])
+
+    def __getitem__(self, slot: int) -> str:
+        return self._data[self._offsets[slot]:self._offsets[slot + 1]].decode("utf-8")
+
+    def intern(self, text: str) -> int:
+        """Take a reference to a string, storing it if it is new, and return its slot."""
+        encoded = text.encode("utf-8")
+        table = self._table
+        mask = len(table) - 1
+        position = hash(encoded) & mask
+        while True:
+            slot = table[position]
+            if slot < 0:
+                break
+            if self._data[self._offsets[slot]:self._offsets[slot + 1]] == encoded:
+                if not self._refs[slot]:
+                    self.garbage -= len(encoded)
+                self._refs[slot] += 1
+                return slot
+            position = (position + 1) & mask
+        slot = len(self._refs)
+        self._data += encoded
+        self._offsets.append(len(self._data))
+        self._refs.append(1)
+        table[position] = slot
+        if 2 * len(self._refs) > len(table):
+            self._rehash(2 * len(table))
+        return slot
+
+    def release(self, slot: int):
+        """Drop a reference taken by intern."""
+        self._refs[slot] -= 1
+        if not self._refs[slot]:
+            self.garbage += self._offsets[slot + 1] - self._offsets[slot]
+
+    def _rehash(self, size: int):
+        table = array("i", [-1]) * size
+        mask = size - 1
+        for slot in range(len(self._refs)):
+            position = hash(self._bytes(slot)) & mask
+            while table[position] >= 0:
+                position = (position + 1) & mask
+            table[position] = slot
+        self._table = table
+
+    def compact(self) -> array:
+        """
+        Rewrite the arena without its unused strings.
+
+        Returns:
+            New slot number of every old slot (-1 for dropped ones)
+        """
+        data, offsets = bytearray(), array("q", [0])
+        refs, moved = array("i"), array("i", [-1]) * len(self._refs)
+        for slot, count in enumerate(self._refs):
+            if count:
+                moved[slot] = len(refs)
+                data += self._data[self._offsets[slot]:self._offsets[slot + 1]]
+                offsets.append(len(data))
+                refs.append(count)
+        self._data, self._offsets, self._refs = data, offsets, refs
+        self.garbage = 0
+        size = 8
+        while size < 2 * len(refs):
+            size *= 2
+        self._rehash(size)
+        return moved
+
+    def find(self, terms: List[str], prefixes: List[str]) -> Set[int]:
+        """
+        Slots of the live strings matching every exact and prefix term.
+
+        Terms are lowercase, as produced by parse_query.
+        """
+        candidates: Optional[Set[int]] = None
+        words = terms + prefixes
+        if all(word.isascii() for word in words) and self._data.isascii():
+            # ASCII lowercasing keeps every offset, so a byte search over a
+            # lowered copy finds each string containing a word
+            lowered = self._data.lower()
+            offsets = self._offsets
+            # Walk the hits of the rarest word (counting is a fast C loop)
+            # and only check those for the others
+            needles = sorted((word.encode("ascii") for word in words), key=lowered.count)
+            candidates = set()
+            position = lowered.find(needles[0])
+            while position >= 0:
+                slot = bisect_right(offsets, position) - 1
+                end = offsets[slot + 1]
+                text = lowered[offsets[slot]:end]
+                if all(needle in text for needle in needles[1:]):
+                    candidates.add(slot)
+                position = lowered.find(needles[0], end)
+        if candidates is None:
+            candidates = set(range(len(self._refs)))
+        matches = set()
+        for slot in candidates:
+            if self._refs[slot] and matches_query(tokenize(self[slot]), terms, prefixes):
+                matches.add(slot)
+        return matches
+
+
+class ColumnarStore(TaskStore):
+    """Tasks in parallel array columns, with interned descriptions and a packed due-date index."""
+
+    # Tombstones are dropped once there are more of them than this and than live rows
+    COMPACT_AFTER = 4096
+
+    def __init__(self):
+        self._ids = array("q")
+        self._status = bytearray()
+        self._due = array("i")
+        self._created = array("q")
+        self._descriptions = array("i")
+        self._arena = StringArena()
+        self._due_index = DueDateIndex(packed=True)
+        self._count = 0
+        self._completed = 0
+        self._deleted = 0
+        self._max_id = 0
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns and the arena, excluding the due-date index."""
+        return len(self._status) + self._arena.nbytes + sum(
+            column.itemsize * len(column)
+            for column in (self._ids, self._due, self._created, self._descriptions))
+
+    def _row(self, task_id) -> Optional[int]:
+        """Row of a live task, or None."""
+        ids = self._ids
+        row = bisect_left(ids, task_id) if isinstance(task_id, int) else len(ids)
+        if row < len(ids) and ids[row] == task_id and not self._status[row] & _DELETED:
+            return row
+        return None
+
+    def _view(self, row: int) -> TaskView:
+        return TaskView(self._ids[row], self._arena[self._descriptions[row]],
+                        bool(self._status[row] & _COMPLETED), self._due[row] or None, self._created[row])
+
+    def _views(self, rows: List[int]) -> List[TaskView]:
+        """Materialize several rows at once, with the columns looked up only once."""
+        ids, status, due, created = self._ids, self._status, self._due, self._created
+        descriptions, arena = self._descriptions, self._arena
+        return [TaskView(ids[row], arena[descriptions[row]], status[row] & _COMPLETED == _COMPLETED,
+                         due[row] or None, created[row]) for row in rows]
+
+    def _row_runs(self, pattern, start: Optional[int] = None) -> Iterator[List[int]]:
+        """
+        Rows whose status byte matches pattern, in id order from the first id
+        >= start, in runs that start small (for a page) and double up to 1024
+        (for a scan).
+        """
+        ids = self._ids
+        row = 0 if start is None else bisect_left(ids, start)
+        size = 16
+        while True:
+            rows = [match.start() for match in islice(pattern.finditer(self._status, row), size)]
+            if not rows:
+                return
+            task_id = ids[rows[-1]]
+            yield rows
+            # The columns may have grown or been compacted in the meantime
+            row = rows[-1] + 1
+            if row > len(ids) or ids[row - 1] != task_id:
+                row = bisect_right(ids, task_id)
+            size = min(2 * size, 1024)
+
+    def __getitem__(self, task_id: int) -> TaskView:
+        row = self._row(task_id)
+        if row is None:
+            raise KeyError(task_id)
+        return self._view(row)
+
+    def __contains__(self, task_id) -> bool:
+        return self._row(task_id) is not None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[int]:
+        for rows in self._row_runs(_LIVE_ROW):
+            ids = self._ids
+            yield from [ids[row] for row in rows]
+
+    def get(self, task_id: int, default=None):
+        row = self._row(task_id)
+        return default if row is None else self._view(row)
+
+    def values(self) -> Iterator[TaskView]:
+        return self.iter_status(None)
+
+    def insert(self, task: Task):
+        if task.created_ts is None:
+            raise ValueError(f"Task {task.id} has no creation time")
+        # Convert every field the way its column would before touching any
+        # column, so a bad value raises without leaving a partial row behind
+        task_id, created = array("q", (task.id, task.created_ts))
+        due = array("i", (task.due_ordinal or 0,))[0]
+        status = _COMPLETED if task.completed else 0
+        ids = self._ids
+        description = self._arena.intern(task.description)
+        if not ids or task_id > ids[-1]:
+            ids.append(task_id)
+            self._status.append(status)
+            self._due.append(due)
+            self._created.append(created)
+            self._descriptions.append(description)
+        else:
+            row = bisect_left(ids, task_id)
+            if ids[row] == task_id:
+                if not self._status[row] & _DELETED:
+                    self._arena.release(description)
+                    raise ValueError(f"Task {task_id} is already stored")
+                # Reuse the tombstone of a deleted task with the same id
+                self._deleted -= 1
+                self._status[row] = status
+                self._due[row] = due
+                self._created[row] = created
+                self._descriptions[row] = description
+            else:
+                ids.insert(row, task_id)
+                self._status.insert(row, status)
+                self._due.insert(row, due)
+                self._created.insert(row, created)
+                self._descriptions.insert(row, description)
+        self._count += 1
+        self._completed += status
+        if due:
+            self._due_index.add(due, task_id)
+        if task_id > self._max_id:
+            self._max_id = task_id
+
+    def remove(self, task_id: int) -> TaskView:
+        row = self._row(task_id)
+        if row is None:
+            raise KeyError(task_id)
+        task = self._view(row)
+        self._status[row] |= _DELETED
+        self._arena.release(self._descriptions[row])
+        if task.due_ordinal is not None:
+            self._due_index.discard(task.due_ordinal, task_id)
+        self._count -= 1
+        self._completed -= task.completed
+        self._deleted += 1
+        if self._deleted > self.COMPACT_AFTER and self._deleted > self._count:
+            self._compact()
+        return task
+
+    def _compact(self):
+        """Drop the tombstones of deleted rows and the strings no row uses."""
+        keep = [row for row, status in enumerate(self._status) if not status & _DELETED]
+        moved = self._arena.compact()
+        descriptions = self._descriptions
+        self._descriptions = array("i", [moved[descriptions[row]] for row in keep])
+        for name in ("_ids", "_due", "_created"):
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, [column[row] for row in keep]))
+        self._status = bytearray(self._status[row] for row in keep)
+        self._deleted = 0
+
+    def set_completed(self, task: Task, completed: bool):
+        row = self._row(task.id)
+        if bool(self._status[row] & _COMPLETED) != completed:
+            self._status[row] ^= _COMPLETED
+            self._completed += 1 if completed else -1
+        task.completed = completed
+
+    def set_description(self, task: Task, description: str):
+        row = self._row(task.id)
+        self._arena.release(self._descriptions[row])
+        self._descriptions[row] = self._arena.intern(description)
+        if self._arena.wasteful:
+            self._compact()
+        task.description = description
+
+    def set_due_date(self, task: Task, due_ordinal: Optional[int]):
+        row = self._row(task.id)
+        old_ordinal = self._due[row]
+        if old_ordinal:
+            self._due_index.discard(old_ordinal, task.id)
+        if due_ordinal is not None:
+            self._due_index.add(due_ordinal, task.id)
+        self._due[row] = due_ordinal or 0
+        task.due_ordinal = due_ordinal
+
+    def iter_status(self, completed: Optional[bool], start: Optional[int] = None) -> Iterator[TaskView]:
+        pattern = _LIVE_ROW if completed is None else _COMPLETED_ROW if completed else _PENDING_ROW
+        for rows in self._row_runs(pattern, start):
+            yield from self._views(rows)
+
+    def iter_due(self, start: Optional[int], end: Optional[int], inclusive: bool = True,
+                 pending_only: bool = False) -> Iterator[TaskView]:
+        for task_id in self._due_index.ids(start, end, inclusive):
+            row = self._row(task_id)
+            if not (pending_only and self._status[row] & _COMPLETED):
+                yield self._view(row)
+
+    def search(self, query: str) -> List[TaskView]:
+        terms, prefixes = parse_query(query)
+        if not terms and not prefixes:
+            return []
+        slots = self._arena.find(terms, prefixes)
+        if not slots:
+            return []
+        status = self._status
+        return [self._view(row) for row, slot in enumerate(self._descriptions)
+                if slot in slots and not status[row] & _DELETED]
+
+    def count(self, completed: Optional[bool] = None) -> int:
+        if completed is None:
+            return self._count
+        return self._completed if completed else self._count - self._completed
+
+    def max_id(self) -> int:
+        return self._max_id
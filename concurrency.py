@@ -0,0 +1,262 @@
+"""
+Thread-safe TodoApp for embedding in threaded servers.
+
+Writers are serialized by a single lock, which also makes id allocation
+atomic. After every write the new state is published as an immutable
+snapshot, and all read operations run against the latest snapshot without
+taking the lock, so a long view or search never holds up writers and never
+sees a half-applied change.
+
+Publishing is copy-on-write: task rows live in pages of 1024 ids and only the
+pages holding changed rows are copied, while the id, due-date and text
+indexes share their buckets with the live indexes until those buckets are
+written.
+"""
+
+import threading
+from collections.abc import Mapping
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from changefeed import ChangeFeed
+from journal import Journal
+from main import TodoApp
+from storage import MemoryStore
+from task import Task
+
+PAGE_BITS = 10
+
+
+class PagedRows(Mapping):
+    """Immutable id -> Task mapping stored as pages of 2 ** PAGE_BITS ids."""
+
+    def __init__(self, pages: Dict[int, Dict[int, Task]], length: int):
+        self._pages = pages
+        self._len = length
+
+    def __getitem__(self, task_id: int) -> Task:
+        page = self._pages.get(task_id >> PAGE_BITS)
+        if page is None:
+            raise KeyError(task_id)
+        return page[task_id]
+
+    def __contains__(self, task_id) -> bool:
+        page = self._pages.get(task_id >> PAGE_BITS) if isinstance(task_id, int) else None
+        return page is not None and task_id in page
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[int]:
+        for number in sorted(self._pages):
+            yield from sorted(self._pages[number])
+
+    def updated(self, tasks: Dict[int, Task], changed_ids: Iterable[int]) -> "PagedRows":
+        """
+        Build the next version, copying only the pages that hold changed ids.
+
+        Args:
+            tasks: Live task dictionary to take the changed rows from
+            changed_ids: Ids added, changed or removed since this version
+        """
+        touched: Dict[int, List[int]] = {}
+        for task_id in changed_ids:
+            touched.setdefault(task_id >> PAGE_BITS, []).append(task_id)
+        pages = dict(self._pages)
+        for number, ids in touched.items():
+            page = dict(pages.get(number, ()))
+            for task_id in ids:
+                task = tasks.get(task_id)
+                if task is None:
+                    page.pop(task_id, None)
+                else:
+                    page[task_id] = task.copy()
+            if page:
+                pages[number] = page
+            else:
+                pages.pop(number, None)
+        return PagedRows(pages, len(tasks))
+
+
+class TaskSnapshot(TodoApp):
+    """
+    Read-only TodoApp over one published version of the task set.
+
+    Every TodoApp read operation (view_tasks, search, the due-date queries,
+    export) works on it unchanged; its mutators must not be called.
+    """
+
+    def __init__(self, owner: TodoApp, version: int, next_id: int, store: MemoryStore):
+        self._owner = owner
+        self.version = version
+        self.next_id = next_id
+        self.tasks = store
+        self.journal = None
+        self.metrics = None
+        self.profiler = None
+        self.archive = None
+        self.feed = None
+        self.scheduler = None
+        self._history = None
+
+    @property
+    def sink(self):
+        """Results go wherever the owning app currently sends them."""
+        return self._owner.sink
+
+
+class ConcurrentTodoApp(TodoApp):
+    """TodoApp that may be shared between threads."""
+
+    def __init__(self, journal: Optional[Journal] = None, sink=None, feed: Optional[ChangeFeed] = None):
+        """
+        Args:
+            journal: Optional journal to replay on startup and append to
+            sink: Receives the Result/Error of every operation; must itself
+                tolerate calls from several threads
+            feed: Optional ChangeFeed that every change is published to;
+                subscribers may read it from any thread
+        """
+        self._write_lock = threading.RLock()
+        self._dirty = set()
+        self._version = 0
+        self._snapshot: Optional[TaskSnapshot] = None
+        self._rows: Optional[PagedRows] = None
+        super().__init__(journal, sink, feed=feed)
+        with self._write_lock:
+            self._publish()
+
+    def snapshot(self) -> TaskSnapshot:
+        """
+        Latest published version of the task set.
+
+        Use it to run several reads against one consistent state; it never
+        changes, however many writes happen meanwhile.
+        """
+        return self._snapshot
+
+    @contextmanager
+    def _writing(self):
+        """Hold the write lock and publish whatever the body changed."""
+        with self._write_lock:
+            try:
+                yield
+            finally:
+                if self._dirty:
+                    self._publish()
+
+    def _publish(self):
+        """Make the current state visible to readers as a new snapshot."""
+        rows = self._rows if self._rows is not None else PagedRows({}, 0)
+        if self._dirty:
+            rows = rows.updated(self.tasks, self._dirty)
+            self._dirty = set()
+        self._rows = rows
+        self._version += 1
+        self._snapshot = TaskSnapshot(self, self._version, self.next_id, self.tasks.frozen(rows))
+
+    # Writers: serialized, each publishing a snapshot when done
+
+    def add_task(self, description: str, due_date: Optional[str] = None) -> Optional[Task]:
+        with self._writing():
+            return super().add_task(description, due_date)
+
+    def update_task(self, task_id: int, new_description: Optional[str] = None,
+                    new_due_date: Optional[str] = None) -> bool:
+        with self._writing():
+            return super().update_task(task_id, new_description, new_due_date)
+
+    def delete_task(self, task_id: int) -> bool:
+        with self._writing():
+            return super().delete_task(task_id)
+
+    def mark_task_complete(self, task_id: int, completed: bool) -> bool:
+        with self._writing():
+            return super().mark_task_complete(task_id, completed)
+
+    def add_tasks(self, items):
+        with self._writing():
+            return super().add_tasks(items)
+
+    def update_tasks(self, updates):
+        with self._writing():
+            return super().update_tasks(updates)
+
+    def delete_tasks(self, task_ids):
+        with self._writing():
+            return super().delete_tasks(task_ids)
+
+    def mark_tasks(self, task_ids, completed: bool):
+        with self._writing():
+            return super().mark_tasks(task_ids, completed)
+
+    def import_tasks(self, path: str) -> Optional[int]:
+        with self._writing():
+            return super().import_tasks(path)
+
+    def close(self):
+        with self._write_lock:
+            super().close()
+
+    def summary(self, today: Optional[str] = None, verify: bool = False) -> Optional[Dict[str, int]]:
+        # The running counts are not part of the snapshot; reading them under
+        # the lock is still O(1)
+        with self._write_lock:
+            return super().summary(today, verify)
+
+    # Readers: run on the latest snapshot without the lock
+
+    def view_tasks(self, filter_status: Optional[str] = None, *filter_args: str,
+                   **options) -> Optional[List[Task]]:
+        return self._snapshot.view_tasks(filter_status, *filter_args, **options)
+
+    def search(self, query: str) -> Optional[List[Task]]:
+        return self._snapshot.search(query)
+
+    def report(self, today: Optional[str] = None) -> Optional[Dict[str, list]]:
+        return self._snapshot.report(today)
+
+    def overdue_tasks(self, today: Optional[str] = None) -> List[Task]:
+        return self._snapshot.overdue_tasks(today)
+
+    def tasks_due_before(self, before: str) -> List[Task]:
+        return self._snapshot.tasks_due_before(before)
+
+    def tasks_due_between(self, start: str, end: str) -> List[Task]:
+        return self._snapshot.tasks_due_between(start, end)
+
+    def next_due_tasks(self, count: int, today: Optional[str] = None) -> List[Task]:
+        return self._snapshot.next_due_tasks(count, today)
+
+    def export_tasks(self, path: str) -> Optional[int]:
+        return self._snapshot.export_tasks(path)
+
+    def iter_ndjson(self) -> Iterator[str]:
+        return self._snapshot.iter_ndjson()
+
+    # Primitives: remember which rows the next snapshot must copy
+
+    def _insert_task(self, task: Task):
+        super()._insert_task(task)
+        self._dirty.add(task.id)
+
+    def _insert_tasks(self, tasks: List[Task]):
+        super()._insert_tasks(tasks)
+        self._dirty.update(task.id for task in tasks)
+
+    def _remove_task(self, task_id: int) -> Task:
+        task = super()._remove_task(task_id)
+        self._dirty.add(task_id)
+        return task
+
+    def _set_completed(self, task: Task, completed: bool):
+        super()._set_completed(task, completed)
+        self._dirty.add(task.id)
+
+    def _set_description(self, task: Task, description: str):
+        super()._set_description(task, description)
+        self._dirty.add(task.id)
+
+    def _set_due_date(self, task: Task, due_ordinal: Optional[int]):
+        super()._set_due_date(task, due_ordinal)
+        self._dirty.add(task.id)
@@ -0,0 +1,213 @@
+"""
+Unix socket daemon for the Todo App.
+
+A long-lived process keeps one TodoApp loaded and answers commands over a
+Unix domain socket, so scripts that run many one-off commands skip
+interpreter startup and state rebuilding on every call (see todo_client.py).
+
+The protocol is JSON lines. Each request is one line holding either a JSON
+array of command words (``["add", "buy milk", "2025-01-01"]``) or a JSON
+string with a command line for the daemon to parse (``"add 'buy milk'"``).
+Each response is one line ``[ok, "output"]``: whether the command succeeded
+and the text the console would have shown for it. Responses come back in
+request order, so a client may pipeline any number of requests before
+reading the replies; the daemon answers everything that has arrived with
+a single write. The request ``["shutdown"]`` stops the daemon.
+
+Like the HTTP server, a single event loop runs every command to completion
+without awaiting, so the app needs no locking.
+"""
+
+import asyncio
+import json
+import os
+import socket
+from typing import List, Optional, Tuple, Union
+
+from output import CollectingSink, TerminalSink
+from scheduler import check_periodically
+
+MAX_LINE = 1 << 20
+
+_encode_json = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+_decode_json = json.JSONDecoder().decode
+
+
+class TodoDaemon:
+    """Serves a TodoApp's commands over a Unix domain socket."""
+
+    def __init__(self, app, path: str):
+        """
+        Args:
+            app: TodoApp to run the commands on
+            path: Filesystem path of the socket
+        """
+        self.app = app
+        self.path = path
+        self.sink = CollectingSink()
+        self.renderer = TerminalSink()
+        app.sink = self.sink
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._stopped: Optional[asyncio.Event] = None
+
+    async def start(self):
+        """Create the socket and start listening; returns once it is bound."""
+        self._remove_stale_socket()
+        self._stopped = asyncio.Event()
+        # Only the owner may talk to the daemon: it runs any command it is sent
+        old_umask = os.umask(0o177)
+        try:
+            self._server = await asyncio.start_unix_server(self._handle_connection, self.path,
+                                                           backlog=1024)
+        finally:
+            os.umask(old_umask)
+
+    async def serve_until_shutdown(self):
+        """Start listening if needed and serve until a shutdown request or cancellation."""
+        if self._server is None:
+            await self.start()
+        try:
+            await self._stopped.wait()
+        finally:
+            await self.close()
+
+    async def close(self):
+        """Stop accepting connections and remove the socket."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _remove_stale_socket(self):
+        """Delete a socket left behind by a daemon that died, but never steal a live one."""
+        if not os.path.exists(self.path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(self.path)
+            return
+        finally:
+            probe.close()
+        raise OSError("another daemon is already listening on it")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        pending = b""
+        try:
+            while True:
+                try:
+                    chunk = await reader.read(1 << 16)
+                except ConnectionError:
+                    break
+                if not chunk:
+                    break
+                lines = (pending + chunk).split(b"\n")
+                pending = lines.pop()
+                if len(pending) > MAX_LINE:
+                    writer.write(self._response(False, "Request line too long\n"))
+                    break
+                replies, shutdown = self.handle_lines(lines)
+                writer.write(b"".join(replies))
+                await writer.drain()
+                if shutdown:
+                    self._stopped.set()
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def handle_lines(self, lines: List[bytes]) -> Tuple[List[bytes], bool]:
+        """
+        Answer a run of request lines.
+
+        Returns:
+            One response line per non-blank request, and whether a shutdown
+            request was among them (requests after it are not answered)
+        """
+        replies = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = _decode_json(line.decode("utf-8"))
+            except ValueError:
+                replies.append(self._response(False, "Request must be one line of JSON\n"))
+                continue
+            if request == ["shutdown"]:
+                replies.append(self._response(True, "Daemon stopping\n"))
+                return replies, True
+            replies.append(self._response(*self.run_command(request)))
+        return replies, False
+
+    def run_command(self, request: Union[str, List[str]]) -> Tuple[bool, str]:
+        """
+        Execute one request and report its outcome.
+
+        Args:
+            request: Command words, or a command line to parse
+
+        Returns:
+            Whether the command succeeded, and its console output
+        """
+        self.sink.clear()
+        if isinstance(request, str):
+            command = self.app.parse_command(request)
+        elif isinstance(request, list) and all(isinstance(word, str) for word in request):
+            command = request
+        else:
+            return False, "Request must be a JSON string or an array of strings\n"
+        if not command:
+            # parse_command already reported malformed lines; blank ones are a no-op
+            return not self.sink.results, self._render()
+        if command[0].lower() == "quit":
+            return True, ""
+        try:
+            ok = self.app.execute(command)
+        except Exception as exc:  # keep serving other requests
+            return False, f"Internal error: {exc}\n"
+        return ok, self._render()
+
+    def _render(self) -> str:
+        return "".join(self.renderer.render(result) for result in self.sink.results)
+
+    @staticmethod
+    def _response(ok: bool, output: str) -> bytes:
+        return _encode_json([ok, output]).encode("utf-8") + b"\n"
+
+
+def run_daemon(app, path: str) -> bool:
+    """
+    Serve a TodoApp on a Unix socket until shut down or interrupted.
+
+    Args:
+        app: TodoApp to expose
+        path: Filesystem path of the socket
+
+    Returns:
+        False if the socket could not be created
+    """
+    daemon = TodoDaemon(app, path)
+
+    async def run():
+        await daemon.start()
+        print(f"Todo App daemon listening on {path}")
+        if app.scheduler is not None:
+            # Kept referenced: the event loop only holds tasks weakly
+            reminders = asyncio.create_task(check_periodically(app))
+        await daemon.serve_until_shutdown()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("\nGoodbye!")
+    except OSError as exc:
+        print(f"Error: Cannot listen on {path}: {exc}")
+        return False
+    return True
@@ -0,0 +1,89 @@
+"""
+Date handling for the Todo App.
+
+Tasks keep due dates as integer day ordinals and creation times as integer
+epoch seconds; strings are only produced when a task is rendered or
+serialized. Parsing avoids ``datetime.strptime`` for well-formed input and
+memoizes results, since task lists tend to reuse a small set of dates.
+"""
+
+import time
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Optional
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+@lru_cache(maxsize=4096)
+def parse_date(value: str) -> int:
+    """
+    Convert a YYYY-MM-DD string to a proleptic Gregorian day ordinal.
+
+    Raises:
+        ValueError: If the string is not a valid date
+    """
+    if (len(value) == 10 and value[4] == "-" and value[7] == "-"
+            and value[:4].isdigit() and value[5:7].isdigit() and value[8:].isdigit()):
+        return date(int(value[:4]), int(value[5:7]), int(value[8:])).toordinal()
+    # Unpadded forms such as 2025-1-5 were always accepted; keep them working
+    return datetime.strptime(value, "%Y-%m-%d").toordinal()
+
+
+@lru_cache(maxsize=4096)
+def format_date(ordinal: int) -> str:
+    """Convert a day ordinal back to a YYYY-MM-DD string."""
+    return date.fromordinal(ordinal).isoformat()
+
+
+def today_ordinal() -> int:
+    """Day ordinal of the current local date."""
+    return date.today().toordinal()
+
+
+@lru_cache(maxsize=4096)
+def parse_timestamp(value: str) -> Optional[int]:
+    """
+    Convert a "YYYY-MM-DD HH:MM:SS" local time string to epoch seconds.
+
+    Returns:
+        Epoch seconds, or None for an empty string
+
+    Raises:
+        ValueError: If the string is not a valid timestamp
+    """
+    if not value:
+        return None
+    if (len(value) == 19 and value[10] == " " and value[13] == ":" and value[16] == ":"
+            and value[11:13].isdigit() and value[14:16].isdigit() and value[17:].isdigit()):
+        midnight = _local_midnight(value[:10])
+        if midnight is not None:
+            return midnight + int(value[11:13]) * 3600 + int(value[14:16]) * 60 + int(value[17:])
+    return int(time.mktime(time.strptime(value, TIMESTAMP_FORMAT)))
+
+
+@lru_cache(maxsize=4096)
+def _local_midnight(day: str) -> Optional[int]:
+    """
+    Epoch seconds of local midnight on a YYYY-MM-DD day.
+
+    Returns None for days that are not exactly 24 hours long (DST changes),
+    where the time of day cannot simply be added to midnight.
+    """
+    try:
+        ordinal = parse_date(day)
+    except ValueError:
+        return None
+    start = date.fromordinal(ordinal)
+    end = date.fromordinal(ordinal + 1)
+    midnight = int(time.mktime((start.year, start.month, start.day, 0, 0, 0, 0, 0, -1)))
+    next_midnight = int(time.mktime((end.year, end.month, end.day, 0, 0, 0, 0, 0, -1)))
+    return midnight if next_midnight - midnight == 86400 else None
+
+
+@lru_cache(maxsize=4096)
+def format_timestamp(timestamp: Optional[int]) -> str:
+    """Convert epoch seconds to a "YYYY-MM-DD HH:MM:SS" local time string."""
+    if timestamp is None:
+        return ""
+    return time.strftime(TIMESTAMP_FORMAT, time.localtime(timestamp))
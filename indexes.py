@@ -0,0 +1,604 @@
+"""
+In-memory secondary indexes for the Todo App.
+
+The task dictionary only supports lookups by id; everything else used to be
+a full scan. The structures here keep derived orderings up to date
+incrementally as tasks are added, changed and removed.
+"""
+
+import heapq
+import re
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> Set[str]:
+    """Split text into its distinct lowercase word tokens."""
+    return set(_TOKEN_RE.findall(text.lower()))
+
+
+def parse_query(query: str) -> Tuple[List[str], List[str]]:
+    """
+    Split a search query into exact tokens and prefix tokens.
+
+    A whitespace-separated term ending in ``*`` contributes its last word as
+    a prefix; every other word must match a token exactly.
+    """
+    exact: List[str] = []
+    prefixes: List[str] = []
+    for raw in query.split():
+        tokens = _TOKEN_RE.findall(raw.lower())
+        if not tokens:
+            continue
+        if raw.endswith("*"):
+            prefixes.append(tokens.pop())
+        exact.extend(tokens)
+    return exact, prefixes
+
+
+def matches_query(words: Set[str], terms: Iterable[str], prefixes: Iterable[str]) -> bool:
+    """
+    Check a text's tokens against a parsed query, for searches that scan.
+
+    Args:
+        words: The text's tokens, as returned by tokenize
+        terms: Exact tokens from parse_query, all of which must be present
+        prefixes: Prefix tokens from parse_query, each matching some token
+    """
+    return words.issuperset(terms) and all(any(word.startswith(prefix) for word in words)
+                                           for prefix in prefixes)
+
+
+class SortedList:
+    """
+    Sorted sequence of comparable values split into bounded buckets.
+
+    Each bucket is a plain sorted list and ``_maxes`` holds the last value of
+    every bucket, so locating a value is two bisects and inserting or removing
+    one only shifts a single small bucket. Appending a value larger than every
+    stored value (the common case for freshly allocated task ids) is O(1).
+
+    ``snapshot()`` hands out a frozen copy that shares the buckets; once one
+    has been taken, a bucket is copied before its first write, so readers of
+    a snapshot never see later changes.
+    """
+
+    LOAD = 512
+
+    def __init__(self, values: Iterable[Any] = ()):
+        self._lists: List[list] = []
+        self._maxes: List[Any] = []
+        self._len = 0
+        # ids of the buckets written since the last snapshot; None if no
+        # snapshot was ever taken and every bucket is private
+        self._owned: Optional[Set[int]] = None
+        ordered = sorted(values)
+        for start in range(0, len(ordered), self.LOAD):
+            bucket = self._new_bucket(ordered[start:start + self.LOAD])
+            self._lists.append(bucket)
+            self._maxes.append(bucket[-1])
+        self._len = len(ordered)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[Any]:
+        return chain.from_iterable(self._lists)
+
+    def __contains__(self, value: Any) -> bool:
+        i = bisect_left(self._maxes, value)
+        if i == len(self._maxes):
+            return False
+        bucket = self._lists[i]
+        j = bisect_left(bucket, value)
+        return j < len(bucket) and bucket[j] == value
+
+    @classmethod
+    def _from_sorted(cls, values: list) -> "SortedList":
+        """Build a list from at most LOAD values already in ascending order, without sorting."""
+        created = cls.__new__(cls)
+        created._lists = [cls._new_bucket(values)]
+        created._maxes = [values[-1]]
+        created._len = len(values)
+        created._owned = None
+        return created
+
+    def snapshot(self) -> "SortedList":
+        """
+        Return a read-only copy sharing this list's buckets.
+
+        Costs O(n / LOAD); the buckets themselves are copied lazily, one at a
+        time, as this list is written to afterwards.
+        """
+        copy = type(self).__new__(type(self))
+        copy._lists = list(self._lists)
+        copy._maxes = list(self._maxes)
+        copy._len = self._len
+        copy._owned = None
+        self._owned = set()
+        return copy
+
+    def fork(self) -> "SortedList":
+        """Return a writable copy sharing this list's buckets; both copy a bucket before writing it."""
+        copy = self.snapshot()
+        copy._owned = set()
+        return copy
+
+    # Builds a bucket holding the given values
+    _new_bucket = list
+
+    def _bucket(self, i: int) -> list:
+        """Bucket i, copied first if a snapshot may still share it."""
+        bucket = self._lists[i]
+        owned = self._owned
+        if owned is not None and id(bucket) not in owned:
+            bucket = self._lists[i] = self._new_bucket(bucket)
+            owned.add(id(bucket))
+        return bucket
+
+    def add(self, value: Any):
+        """Insert a value, keeping the sequence sorted."""
+        maxes = self._maxes
+        if not maxes:
+            self._lists.append(self._new_bucket((value,)))
+            maxes.append(value)
+            self._len = 1
+            if self._owned is not None:
+                self._owned.add(id(self._lists[0]))
+            return
+
+        if value >= maxes[-1]:
+            i = len(maxes) - 1
+            bucket = self._bucket(i)
+            bucket.append(value)
+            maxes[i] = value
+        else:
+            i = bisect_right(maxes, value)
+            bucket = self._bucket(i)
+            insort(bucket, value)
+        self._len += 1
+
+        if len(bucket) > 2 * self.LOAD:
+            half = bucket[self.LOAD:]
+            del bucket[self.LOAD:]
+            self._lists.insert(i + 1, half)
+            maxes[i] = bucket[-1]
+            maxes.insert(i + 1, half[-1])
+            if self._owned is not None:
+                self._owned.add(id(half))
+
+    def update(self, values: Iterable[Any]):
+        """
+        Insert many values at once.
+
+        Values beyond the current maximum are appended as whole buckets;
+        otherwise a batch that is large next to the list is merged in with
+        one pass that rebuilds the buckets, and a small one is added value
+        by value.
+        """
+        values = sorted(values)
+        if not values:
+            return
+        if self._maxes and values[0] < self._maxes[-1]:
+            if len(values) * 8 < self._len:
+                for value in values:
+                    self.add(value)
+                return
+            values = list(heapq.merge(self, values))
+            self._lists, self._maxes, self._len = [], [], 0
+        owned = self._owned
+        for start in range(0, len(values), self.LOAD):
+            bucket = self._new_bucket(values[start:start + self.LOAD])
+            self._lists.append(bucket)
+            self._maxes.append(bucket[-1])
+            if owned is not None:
+                owned.add(id(bucket))
+        self._len += len(values)
+
+    def discard(self, value: Any) -> bool:
+        """
+        Remove a value if present.
+
+        Returns:
+            True if the value was found and removed, False otherwise
+        """
+        maxes = self._maxes
+        i = bisect_left(maxes, value)
+        if i == len(maxes):
+            return False
+        bucket = self._lists[i]
+        j = bisect_left(bucket, value)
+        if j == len(bucket) or bucket[j] != value:
+            return False
+        bucket = self._bucket(i)
+        del bucket[j]
+        self._len -= 1
+        if bucket:
+            maxes[i] = bucket[-1]
+        else:
+            del self._lists[i]
+            del maxes[i]
+        return True
+
+    def irange(self, minimum: Any = None, maximum: Any = None,
+               inclusive: bool = True) -> Iterator[Any]:
+        """
+        Iterate values between two bounds in sorted order.
+
+        Args:
+            minimum: Lower bound, always inclusive (None for unbounded)
+            maximum: Upper bound (None for unbounded)
+            inclusive: Whether the upper bound itself is included
+
+        Returns:
+            Iterator over the matching values; costs O(log n + k)
+        """
+        maxes = self._maxes
+        lists = self._lists
+        if minimum is None:
+            i, j = 0, 0
+        else:
+            i = bisect_left(maxes, minimum)
+            if i == len(maxes):
+                return
+            j = bisect_left(lists[i], minimum)
+
+        cut = bisect_right if inclusive else bisect_left
+        while i < len(lists):
+            bucket = lists[i]
+            if maximum is not None and not (maxes[i] < maximum or (inclusive and maxes[i] == maximum)):
+                yield from bucket[j:cut(bucket, maximum)]
+                return
+            yield from bucket[j:] if j else bucket
+            i += 1
+            j = 0
+
+    def first(self) -> Optional[Any]:
+        """Return the smallest value, or None when empty."""
+        return self._lists[0][0] if self._lists else None
+
+
+class PackedSortedList(SortedList):
+    """
+    SortedList of 64-bit signed ints whose buckets are ``array("q")``.
+
+    Each value costs 8 bytes instead of a pointer plus an int object (about
+    36 bytes), at the price of boxing values again as they are read.
+    """
+
+    @staticmethod
+    def _new_bucket(values: Iterable[int]) -> array:
+        return array("q", values)
+
+
+class DueDateIndex:
+    """
+    Tasks ordered by (due date ordinal, id).
+
+    Each entry is packed into a single int, ``ordinal << ID_BITS | task_id``,
+    so the underlying sorted list compares plain ints instead of tuples and
+    ties on the same day come out in id order.
+    """
+
+    ID_BITS = 40
+    ID_MASK = (1 << ID_BITS) - 1
+
+    def __init__(self, packed: bool = False):
+        """
+        Args:
+            packed: Keep the keys in a PackedSortedList, for compact stores
+        """
+        self._keys = PackedSortedList() if packed else SortedList()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def snapshot(self) -> "DueDateIndex":
+        """Return a read-only copy that shares storage until this index changes."""
+        copy = DueDateIndex.__new__(DueDateIndex)
+        copy._keys = self._keys.snapshot()
+        return copy
+
+    def add(self, ordinal: int, task_id: int):
+        """Register a task as due on the given day ordinal."""
+        self._keys.add(ordinal << self.ID_BITS | task_id)
+
+    def add_many(self, entries: Iterable[Tuple[int, int]]):
+        """Register many (day ordinal, task id) pairs at once."""
+        bits = self.ID_BITS
+        self._keys.update(ordinal << bits | task_id for ordinal, task_id in entries)
+
+    def discard(self, ordinal: int, task_id: int):
+        """Forget a task previously registered for the given day ordinal."""
+        self._keys.discard(ordinal << self.ID_BITS | task_id)
+
+    def ids(self, start: Optional[int] = None, end: Optional[int] = None,
+            inclusive: bool = True) -> Iterator[int]:
+        """
+        Iterate task ids due within a range of day ordinals.
+
+        Args:
+            start: First day ordinal, inclusive (None for unbounded)
+            end: Last day ordinal (None for unbounded)
+            inclusive: Whether tasks due on ``end`` itself are included
+
+        Returns:
+            Task ids ordered by due date, then id
+        """
+        minimum = None if start is None else start << self.ID_BITS
+        if end is None:
+            maximum = None
+        elif inclusive:
+            maximum = (end << self.ID_BITS) | self.ID_MASK
+        else:
+            maximum = end << self.ID_BITS
+        mask = self.ID_MASK
+        for key in self._keys.irange(minimum, maximum, inclusive=inclusive):
+            yield key & mask
+
+
+class InvertedIndex:
+    """
+    Token-based full-text index over task descriptions.
+
+    Each token maps to the sorted list of ids whose description contains it,
+    and the vocabulary is kept sorted so prefix terms resolve to a contiguous
+    token range. A query is the AND of its terms; a term ending in ``*``
+    matches any token starting with it.
+
+    The posting lists are spread over SHARDS dictionaries by token hash, so
+    ``snapshot()`` only copies the list of shards. Once one has been taken,
+    a shard dictionary or posting list is copied before its first write,
+    and a posting list's copy shares its buckets with the original.
+    """
+
+    SHARDS = 256
+
+    def __init__(self):
+        self._shards: List[Dict[str, SortedList]] = [{} for _ in range(self.SHARDS)]
+        self._vocabulary = SortedList()
+        # ids of the shards and posting lists written since the last
+        # snapshot; None if no snapshot was ever taken and all are private
+        self._owned: Optional[Set[int]] = None
+
+    def snapshot(self) -> "InvertedIndex":
+        """Return a read-only copy that shares storage until this index changes."""
+        copy = InvertedIndex.__new__(InvertedIndex)
+        copy._shards = list(self._shards)
+        copy._vocabulary = self._vocabulary.snapshot()
+        copy._owned = None
+        self._owned = set()
+        return copy
+
+    def _postings(self, token: str) -> Optional[SortedList]:
+        return self._shards[hash(token) % self.SHARDS].get(token)
+
+    def _writable_shard(self, token: str) -> Dict[str, SortedList]:
+        """The shard holding a token, copied first if a snapshot may still share it."""
+        number = hash(token) % self.SHARDS
+        shard = self._shards[number]
+        owned = self._owned
+        if owned is not None and id(shard) not in owned:
+            shard = self._shards[number] = dict(shard)
+            owned.add(id(shard))
+        return shard
+
+    def add(self, task_id: int, text: str):
+        """Index every token of a task's text."""
+        owned = self._owned
+        for token in tokenize(text):
+            shard = self._writable_shard(token)
+            ids = shard.get(token)
+            if ids is None:
+                ids = shard[token] = SortedList((task_id,))
+                self._vocabulary.add(token)
+            else:
+                if owned is not None and id(ids) not in owned:
+                    ids = shard[token] = ids.fork()
+                ids.add(task_id)
+            if owned is not None:
+                owned.add(id(ids))
+
+    def add_many(self, items: Iterable[Tuple[int, str]]):
+        """Index many (task id, text) pairs, touching each token's posting list once."""
+        grouped: Dict[str, List[int]] = {}
+        for task_id, text in items:
+            for token in tokenize(text):
+                ids = grouped.get(token)
+                if ids is None:
+                    grouped[token] = [task_id]
+                else:
+                    ids.append(task_id)
+        owned = self._owned
+        new_tokens = []
+        for token, task_ids in grouped.items():
+            shard = self._writable_shard(token)
+            ids = shard.get(token)
+            if ids is None:
+                if len(task_ids) <= SortedList.LOAD:
+                    task_ids.sort()
+                    ids = shard[token] = SortedList._from_sorted(task_ids)
+                else:
+                    ids = shard[token] = SortedList(task_ids)
+                new_tokens.append(token)
+            else:
+                if owned is not None and id(ids) not in owned:
+                    ids = shard[token] = ids.fork()
+                ids.update(task_ids)
+            if owned is not None:
+                owned.add(id(ids))
+        self._vocabulary.update(new_tokens)
+
+    def discard(self, task_id: int, text: str):
+        """Remove a task previously indexed with the given text."""
+        owned = self._owned
+        for token in tokenize(text):
+            ids = self._postings(token)
+            if ids is None or task_id not in ids:
+                continue
+            shard = self._writable_shard(token)
+            if len(ids) == 1:
+                del shard[token]
+                self._vocabulary.discard(token)
+                continue
+            if owned is not None and id(ids) not in owned:
+                ids = shard[token] = ids.fork()
+                owned.add(id(ids))
+            ids.discard(task_id)
+
+    def search(self, query: str) -> List[int]:
+        """
+        Find the ids of tasks matching every term of a query.
+
+        Args:
+            query: Whitespace-separated terms; a trailing ``*`` makes a term
+                a prefix match
+
+        Returns:
+            Matching task ids in ascending order
+        """
+        terms, prefixes = parse_query(query)
+        if not terms and not prefixes:
+            return []
+        exact: List[SortedList] = []
+        for token in terms:
+            ids = self._postings(token)
+            if ids is None:
+                return []
+            exact.append(ids)
+
+        # Intersect from the rarest term up so the working set only shrinks;
+        # membership in the longer lists is a bisect
+        exact.sort(key=len)
+        result: Optional[Set[int]] = set(exact[0]) if exact else None
+        for ids in exact[1:]:
+            result = {task_id for task_id in result if task_id in ids}
+            if not result:
+                return []
+        for prefix in prefixes:
+            matches: Set[int] = set()
+            for token in self._vocabulary.irange(prefix, prefix + "\U0010ffff", inclusive=False):
+                ids = self._postings(token)
+                if result is None:
+                    matches.update(ids)
+                elif len(result) < len(ids):
+                    matches.update(task_id for task_id in result if task_id in ids)
+                else:
+                    matches.update(result.intersection(ids))
+            result = matches
+            if not result:
+                return []
+        return sorted(result)
+
+
+class TaskAggregates:
+    """
+    Running task counts, kept in step with every change so reading them is O(1).
+
+    Besides the totals it keeps one bucket per due day holding the number of
+    pending tasks due that day. The overdue count is the sum of the buckets
+    before today; it is summed once per day and then adjusted as tasks change.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.completed = 0
+        self.with_due_date = 0
+        self.pending_due: Dict[int, int] = {}
+        self._overdue_day: Optional[int] = None
+        self._overdue = 0
+
+    @classmethod
+    def scan(cls, tasks: Iterable[Any]) -> "TaskAggregates":
+        """Count a task collection from scratch."""
+        aggregates = cls()
+        for task in tasks:
+            aggregates.added(task)
+        return aggregates
+
+    @property
+    def pending(self) -> int:
+        return self.total - self.completed
+
+    def _move_pending(self, ordinal: int, delta: int):
+        count = self.pending_due.get(ordinal, 0) + delta
+        if count:
+            self.pending_due[ordinal] = count
+        else:
+            del self.pending_due[ordinal]
+        if self._overdue_day is not None and ordinal < self._overdue_day:
+            self._overdue += delta
+
+    def added(self, task):
+        """Count a task that was just stored."""
+        self.total += 1
+        if task.completed:
+            self.completed += 1
+        if task.due_ordinal is not None:
+            self.with_due_date += 1
+            if not task.completed:
+                self._move_pending(task.due_ordinal, 1)
+
+    def removed(self, task):
+        """Stop counting a task that was just removed."""
+        self.total -= 1
+        if task.completed:
+            self.completed -= 1
+        if task.due_ordinal is not None:
+            self.with_due_date -= 1
+            if not task.completed:
+                self._move_pending(task.due_ordinal, -1)
+
+    def completion_changed(self, task, was_completed: bool):
+        """Account for a task whose status was just changed from was_completed."""
+        if task.completed == was_completed:
+            return
+        self.completed += 1 if task.completed else -1
+        if task.due_ordinal is not None:
+            self._move_pending(task.due_ordinal, -1 if task.completed else 1)
+
+    def due_date_changed(self, task, old_ordinal: Optional[int]):
+        """Account for a task whose due date was just changed from old_ordinal."""
+        new_ordinal = task.due_ordinal
+        if new_ordinal == old_ordinal:
+            return
+        self.with_due_date += (new_ordinal is not None) - (old_ordinal is not None)
+        if not task.completed:
+            if old_ordinal is not None:
+                self._move_pending(old_ordinal, -1)
+            if new_ordinal is not None:
+                self._move_pending(new_ordinal, 1)
+
+    def due_on(self, ordinal: int) -> int:
+        """Number of pending tasks due on a day."""
+        return self.pending_due.get(ordinal, 0)
+
+    def overdue(self, today: int) -> int:
+        """Number of pending tasks due before today; O(1) except on the first call of a day."""
+        if today != self._overdue_day:
+            self._overdue = sum(count for ordinal, count in self.pending_due.items() if ordinal < today)
+            self._overdue_day = today
+        return self._overdue
+
+    def summary(self, today: int) -> Dict[str, int]:
+        """All the counts, with overdue and due_today relative to the given day ordinal."""
+        return {
+            "total": self.total,
+            "completed": self.completed,
+            "pending": self.pending,
+            "with_due_date": self.with_due_date,
+            "overdue": self.overdue(today),
+            "due_today": self.due_on(today),
+        }
+
+    def mismatches(self, other: "TaskAggregates", today: int) -> List[str]:
+        """Names of the counts that differ from another set of aggregates."""
+        ours, theirs = self.summary(today), other.summary(today)
+        names = [name for name in ours if ours[name] != theirs[name]]
+        if self.pending_due != other.pending_due:
+            names.append("due_date_buckets")
+        return names
@@ -0,0 +1,199 @@
+"""
+Durable append-only journal for the Todo App.
+
+Every successful mutation is appended to ``journal.log`` as one compact JSON
+line carrying a monotonically increasing sequence number. Writes go through
+a buffered file object and are flushed and fsync'ed in groups (every
+``sync_every`` records or ``sync_interval`` seconds, whichever comes first),
+so a mutation costs one buffered append instead of a full-file rewrite. A
+timer commits the tail of a burst when no further append comes along, so
+no record waits longer than ``sync_interval`` for its fsync.
+
+Every ``snapshot_every`` records the full state is compacted into
+``snapshot.ndjson`` (a header line followed by one task per line) and the log
+is truncated. On startup the snapshot is restored and only the log tail after
+it is replayed.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+
+class Journal:
+    """Write-ahead journal with group-commit fsync and snapshot compaction."""
+
+    LOG_NAME = "journal.log"
+    SNAPSHOT_NAME = "snapshot.ndjson"
+
+    def __init__(self, directory: str, sync_every: int = 64, sync_interval: float = 1.0,
+                 snapshot_every: int = 10000):
+        """
+        Create a journal rooted at a directory.
+
+        Args:
+            directory: Directory holding the log and snapshot files
+            sync_every: Number of appended records per group commit
+            sync_interval: Maximum seconds between group commits
+            snapshot_every: Number of records after which a snapshot is due
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.log_path = os.path.join(directory, self.LOG_NAME)
+        self.snapshot_path = os.path.join(directory, self.SNAPSHOT_NAME)
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.snapshot_every = snapshot_every
+        self.seq = 0
+        self._log = None
+        self._pending = 0
+        self._since_snapshot = 0
+        self._last_sync = time.monotonic()
+        # Serializes the timer thread's commits with appends and log swaps
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+
+    def open(self, restore: Callable[[int, Iterable[dict]], None], apply: Callable[[dict], None]):
+        """
+        Replay the snapshot and log tail, then open the log for appending.
+
+        Args:
+            restore: Called with (next_id, task dicts) when a snapshot exists
+            apply: Called with each log record newer than the snapshot
+        """
+        base_seq = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                base_seq = header["seq"]
+                restore(header["next_id"], (json.loads(line) for line in f))
+        self.seq = base_seq
+
+        good_offset = 0
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "rb") as f:
+                for line in f:
+                    # A torn or corrupt trailing line means the writer crashed
+                    # mid-append; everything from there on is discarded.
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    good_offset += len(line)
+                    if record["seq"] <= base_seq:
+                        continue
+                    apply(record)
+                    self.seq = record["seq"]
+                    self._since_snapshot += 1
+            with open(self.log_path, "r+b") as f:
+                f.truncate(good_offset)
+
+        self._log = open(self.log_path, "a", encoding="utf-8")
+
+    def append(self, record: dict) -> bool:
+        """
+        Append one mutation record to the log.
+
+        Args:
+            record: JSON-serializable mutation record; it is written with its
+                sequence number but not modified, since the change feed
+                shares it
+
+        Returns:
+            True if enough records have accumulated that a snapshot is due
+        """
+        with self._lock:
+            self.seq += 1
+            self._log.write(json.dumps({**record, "seq": self.seq}, separators=(",", ":")) + "\n")
+            self._pending += 1
+            self._since_snapshot += 1
+            if self._pending >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_interval:
+                self.sync()
+            elif self._timer is None:
+                # At most one timer per interval: a commit in between does
+                # not cancel it, it just finds less (or nothing) to do
+                self._timer = threading.Timer(self.sync_interval, self._sync_idle)
+                self._timer.daemon = True
+                self._timer.start()
+            return self._since_snapshot >= self.snapshot_every
+
+    def _sync_idle(self):
+        """Timer callback: commit whatever is still pending."""
+        with self._lock:
+            self._timer = None
+            if self._pending:
+                self.sync()
+
+    def sync(self):
+        """Flush buffered records and fsync them to disk (one group commit)."""
+        with self._lock:
+            if self._log is None:
+                return
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._pending = 0
+            self._last_sync = time.monotonic()
+
+    def compact(self, next_id: int, tasks: Iterable[dict]):
+        """
+        Write a snapshot of the full state and truncate the log.
+
+        The snapshot is written to a temporary file and atomically renamed, so
+        a crash at any point leaves either the old or the new snapshot in
+        place. Log records already covered by the snapshot are skipped on
+        replay, so a crash before truncation is harmless too.
+
+        Args:
+            next_id: Next task id to hand out
+            tasks: Task dicts making up the current state
+        """
+        self.sync()
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"seq": self.seq, "next_id": next_id}) + "\n")
+            chunk = []
+            for data in tasks:
+                chunk.append(json.dumps(data, separators=(",", ":")))
+                if len(chunk) >= 1000:
+                    f.write("\n".join(chunk) + "\n")
+                    chunk = []
+            if chunk:
+                f.write("\n".join(chunk) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        self._fsync_directory()
+
+        with self._lock:
+            self._log.close()
+            self._log = open(self.log_path, "w", encoding="utf-8")
+            self._since_snapshot = 0
+
+    def close(self):
+        """Commit any pending records and close the log."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._log is None:
+                return
+            self.sync()
+            self._log.close()
+            self._log = None
+
+    def _fsync_directory(self):
+        """Make the snapshot rename durable on filesystems that need it."""
+        try:
+            fd = os.open(self.directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
@@ -0,0 +1,123 @@
+"""
+Load generator for the Todo App HTTP server.
+
+Opens a number of keep-alive connections to a running server and drives a
+mix of adds, page views and completions through them, then reports request
+throughput and latency percentiles.
+
+Usage: python loadgen.py [--url HOST:PORT] [--connections N] [--requests N]
+                         [--spawn]
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Tuple
+
+from main import TodoApp
+from output import NullSink
+from server import TodoServer
+
+
+def _request(method: str, path: str, payload=None) -> bytes:
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    head = (f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def _client(host: str, port: int, count: int, latencies: list, failures: list):
+    """Issue mostly adds and page views, completing this client's own latest task now and then."""
+    reader, writer = await asyncio.open_connection(host, port)
+    last_id = None
+    try:
+        for i in range(count):
+            step = i % 10
+            if step < 5:
+                request = _request("POST", "/tasks", {"description": f"Task number {i}",
+                                                      "due_date": f"2025-{i % 12 + 1:02d}-15"})
+            elif step < 9 or last_id is None:
+                request = _request("GET", "/tasks?filter=pending&limit=20")
+            else:
+                request = _request("POST", f"/tasks/{last_id}/complete")
+            start = time.perf_counter()
+            writer.write(request)
+            status, body = await _read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                failures.append(status)
+            elif step < 5:
+                last_id = json.loads(body)["task"]["id"]
+    finally:
+        writer.close()
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run_load(host: str, port: int, connections: int, total: int):
+    """
+    Drive the server and print throughput and latency percentiles.
+
+    Args:
+        host: Server host
+        port: Server port
+        connections: Number of concurrent keep-alive connections
+        total: Total number of requests across all connections
+    """
+    per_client = max(1, total // connections)
+    latencies, failures = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, per_client, latencies, failures)
+                           for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{len(latencies):,} requests over {connections} connections in {elapsed:.2f}s")
+    print(f"{'requests/s':<12} {len(latencies) / elapsed:>12,.0f}")
+    print(f"{'p50':<12} {_percentile(latencies, 0.50) * 1000:>10.2f}ms")
+    print(f"{'p99':<12} {_percentile(latencies, 0.99) * 1000:>10.2f}ms")
+    print(f"{'errors':<12} {len(failures):>12,}")
+
+
+async def _run_spawned(connections: int, total: int):
+    server = TodoServer(TodoApp(sink=NullSink()), "127.0.0.1", 0)
+    await server.start()
+    try:
+        await run_load(server.host, server.port, connections, total)
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Todo App HTTP load generator")
+    parser.add_argument("--url", default="127.0.0.1:8080", metavar="HOST:PORT",
+                        help="server to load (default 127.0.0.1:8080)")
+    parser.add_argument("--connections", type=int, default=100, help="concurrent connections")
+    parser.add_argument("--requests", type=int, default=20000, help="total requests")
+    parser.add_argument("--spawn", action="store_true",
+                        help="start an in-process server on a free port instead of using --url")
+    args = parser.parse_args()
+
+    if args.spawn:
+        asyncio.run(_run_spawned(args.connections, args.requests))
+    else:
+        host, _, port = args.url.rpartition(":")
+        asyncio.run(run_load(host or "127.0.0.1", int(port), args.connections, args.requests))
+
+
+if __name__ == "__main__":
+    main()
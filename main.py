@@ -11,50 +11,137 @@ It implements a simple in-memory CLI Todo application with the following feature
 - Mark Task as Complete
 """
 
+import argparse
+import gc
+import heapq
 import json
-from datetime import datetime
-from typing import Dict, List, Optional
+import shlex
+import sys
+import tempfile
+import time
+from contextlib import contextmanager, redirect_stdout
+from itertools import islice
+from operator import attrgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
+from analytics import TaskColumns, report
+from archive import TaskArchive
+from changefeed import ChangeFeed
+from columnar import ColumnarStore
+from daemon import run_daemon
+from dates import parse_date, today_ordinal
+from indexes import DueDateIndex, TaskAggregates
+from journal import Journal
+from metrics import Metrics
+from output import BatchResult, Error, Result, TerminalSink
+from persistent import PersistentStore, StoreVersion
+from profiling import Profiler
+from scheduler import ReminderScheduler
+from server import serve
+from storage import MemoryStore, SQLiteStore, TaskStore
+from task import Task
 
-class Task:
-    """Represents a single task in the todo list."""
-    
-    def __init__(self, task_id: int, description: str, completed: bool = False, due_date: Optional[str] = None):
-        self.id = task_id
-        self.description = description
-        self.completed = completed
-        self.due_date = due_date
-        self.created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    def to_dict(self):
-        """Convert task to dictionary for serialization."""
-        return {
-            'id': self.id,
-            'description': self.description,
-            'completed': self.completed,
-            'due_date': self.due_date,
-            'created_at': self.created_at
-        }
-    
-    @classmethod
-    def from_dict(cls, data: dict):
-        """Create a Task instance from a dictionary."""
-        task = cls(
-            task_id=data['id'],
-            description=data['description'],
-            completed=data.get('completed', False),
-            due_date=data.get('due_date')
-        )
-        task.created_at = data.get('created_at', '')
-        return task
+
+_decode_json = json.JSONDecoder().decode
+
+
+@contextmanager
+def _gc_paused():
+    """
+    Hold off the cyclic garbage collector during a bulk load.
+
+    Every object a batch creates stays alive, so the collections its
+    allocations would trigger only rescan the growing task list.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
 
 
 class TodoApp:
     """Main Todo application class."""
     
-    def __init__(self):
-        self.tasks: Dict[int, Task] = {}
-        self.next_id = 1
+    # Filters that select and order tasks by due date
+    DUE_FILTERS = ("overdue", "due-before", "due-between", "next")
+    
+    # Orders view_tasks can sort a page by
+    VIEW_SORTS = ("id", "due", "created")
+    
+    # Options accepted by the view command
+    VIEW_OPTIONS = ("--limit", "--offset", "--after", "--sort")
+    
+    # Options of the view command that take no value
+    VIEW_FLAGS = ("--include-archived",)
+    
+    # Commands execute understands; anything else is counted as "unknown"
+    COMMANDS = ("add", "view", "update", "search", "delete", "complete", "incomplete",
+                "export", "import", "summary", "report", "archive", "snapshot", "undo", "redo",
+                "rollback", "stats", "profile", "quit")
+    
+    # Changes undo can step back through, with a PersistentStore
+    UNDO_LIMIT = 100
+    
+    # View filters mapped to the arguments they take
+    VIEW_FILTERS = {
+        "all": "",
+        "completed": "",
+        "pending": "",
+        "overdue": "",
+        "due-before": "<date>",
+        "due-between": "<start> <end>",
+        "next": "<count>",
+    }
+    
+    def __init__(self, journal: Optional[Journal] = None, sink=None,
+                 store: Optional[TaskStore] = None, metrics: Optional[Metrics] = None,
+                 profiler: Optional[Profiler] = None, archive: Optional[TaskArchive] = None,
+                 feed: Optional[ChangeFeed] = None, scheduler: Optional[ReminderScheduler] = None):
+        """
+        Args:
+            journal: Optional journal to replay on startup and append to
+            sink: Receives the Result/Error of every operation; defaults to
+                a TerminalSink that prints them
+            store: Where tasks are kept; defaults to an in-memory MemoryStore
+            metrics: Optional Metrics that every executed command is counted
+                and timed in
+            profiler: Optional Profiler that executed commands run under;
+                it writes its reports when the app is closed
+            archive: Optional cold tier that archive_completed moves old
+                completed tasks into
+            feed: Optional ChangeFeed that every change is published to
+                (changes replayed from the journal are not)
+            scheduler: Optional ReminderScheduler that check_reminders
+                fires for tasks as they become due
+        """
+        self.sink = sink if sink is not None else TerminalSink()
+        self.metrics = metrics
+        self.profiler = profiler
+        self.tasks: TaskStore = store if store is not None else MemoryStore()
+        self.next_id = self.tasks.max_id() + 1
+        # Counted once here for stores that open with tasks in them; the
+        # primitives keep the counts current from then on
+        self.aggregates = TaskAggregates.scan(self.tasks.values())
+        self.scheduler = scheduler
+        if scheduler is not None:
+            for task in self.tasks.iter_due(None, None, pending_only=True):
+                scheduler.track(task)
+        self.archive = archive
+        self.feed = feed
+        self.journal = journal
+        if journal is not None:
+            journal.open(self._restore_snapshot, self._apply_record)
+        # A PersistentStore keeps every version of the task set for the
+        # price of the nodes a change copies, so undo and snapshots only
+        # hold on to versions; other stores have no history
+        self._history: Optional[List[StoreVersion]] = None
+        self._position = 0
+        self._snapshots: List[StoreVersion] = []
+        if isinstance(self.tasks, PersistentStore):
+            self._history = [self.tasks.version]
     
     def add_task(self, description: str, due_date: Optional[str] = None) -> Optional[Task]:
         """
@@ -69,64 +156,292 @@ class TodoApp:
         """
         # Validate input
         if not description or description.strip() == "":
-            print("Error: Task description cannot be empty or whitespace only")
+            self.sink.emit(Error("empty_description"))
             return None
         
         if len(description) > 500:
-            print("Error: Task description must be less than 500 characters")
+            self.sink.emit(Error("description_too_long"))
             return None
         
         # Validate date format if provided
         if due_date:
             try:
-                datetime.strptime(due_date, "%Y-%m-%d")
+                parse_date(due_date)
             except ValueError:
-                print("Error: Invalid date format. Please use YYYY-MM-DD format")
+                self.sink.emit(Error("invalid_date"))
                 return None
         
         # Create new task
         task = Task(self.next_id, description.strip(), False, due_date)
-        self.tasks[self.next_id] = task
+        self._insert_task(task)
         self.next_id += 1
+        self._log({'op': 'add', 'task': task.to_dict()})
         
-        print(f"Task added successfully: ID {task.id} - {task.description}")
+        self.sink.emit(Result("added", task))
         return task
     
-    def view_tasks(self, filter_status: Optional[str] = None) -> List[Task]:
+    def view_tasks(self, filter_status: Optional[str] = None, *filter_args: str,
+                   limit: Optional[int] = None, offset: int = 0, after: Optional[int] = None,
+                   sort: Optional[str] = None, include_archived: bool = False) -> Optional[List[Task]]:
         """
-        View all tasks in the todo list.
+        View tasks in the todo list, one page at a time.
+        
+        Tasks are streamed from the indexes rather than collected up front:
+        a page in the filter's natural order only walks the rows it shows,
+        and any other order keeps just the best offset + limit rows in a heap.
         
         Args:
-            filter_status: Optional filter ("all", "completed", "pending")
+            filter_status: Optional filter (one of VIEW_FILTERS)
+            filter_args: Date arguments for "due-before" and "due-between",
+                or the number of tasks to show for "next"
+            limit: Maximum number of tasks to show (None for no limit)
+            offset: Number of matching tasks to skip
+            after: Cursor; only show tasks ordered after the task with this ID
+            sort: One of VIEW_SORTS; defaults to the filter's natural order
+                (ID for status filters, due date for due-date filters)
+            include_archived: Also show archived tasks ("all" and
+                "completed" filters only)
             
         Returns:
-            List of tasks matching the filter
+            List of tasks shown on this page, or None if the request was invalid
         """
-        if not self.tasks:
-            print("No tasks found")
+        archive = self.archive if include_archived else None
+        if not self.tasks and not archive:
+            self.sink.emit(Result("no_tasks"))
             return []
+        if archive is not None and filter_status not in (None, "all", "completed"):
+            self.sink.emit(Error("usage", text="--include-archived only applies to the all and "
+                                               "completed filters"))
+            return None
+        
+        natural = "due" if filter_status in self.DUE_FILTERS else "id"
+        sort = sort or natural
+        if sort not in self.VIEW_SORTS:
+            self.sink.emit(Error("usage", text="Sort must be one of: " + ", ".join(self.VIEW_SORTS)))
+            return None
+        cursor_task = None
+        if after is not None:
+            cursor_task = self.tasks.get(after) or (archive.get(after) if archive is not None else None)
+            if cursor_task is None:
+                self.sink.emit(Error("not_found", task_id=after))
+                return None
         
-        # Apply filter if specified
-        if filter_status == "completed":
-            filtered_tasks = [task for task in self.tasks.values() if task.completed]
-        elif filter_status == "pending":
-            filtered_tasks = [task for task in self.tasks.values() if not task.completed]
+        # Status filters can start an id-ordered walk right at the cursor;
+        # any other ordering filters candidates by their sort key instead
+        id_cursor = after if sort == natural == "id" else None
+        try:
+            candidates = self._iter_filter(filter_status, filter_args, id_cursor, include_archived)
+        except ValueError:
+            self.sink.emit(Error("invalid_date"))
+            return None
+        if candidates is None:
+            self.sink.emit(Error("invalid_count"))
+            return None
+        
+        key = self._sort_key(sort)
+        if after is not None and id_cursor is None:
+            last_key = key(cursor_task)
+            candidates = (task for task in candidates if key(task) > last_key)
+        
+        # Fetch one extra row to learn whether another page follows
+        wanted = None if limit is None else offset + limit + 1
+        if sort == natural:
+            page = list(islice(candidates, offset, wanted))
+        elif wanted is None:
+            page = sorted(candidates, key=key)[offset:]
         else:
-            filtered_tasks = list(self.tasks.values())
+            page = heapq.nsmallest(wanted, candidates, key=key)[offset:]
+        
+        has_more = limit is not None and len(page) > limit
+        if has_more:
+            del page[limit:]
+        
+        if not page:
+            self.sink.emit(Result("no_match"))
+            return []
+        
+        self.sink.emit(Result("tasks", tasks=page, detail=page[-1].id if has_more else None))
+        return page
+    
+    def search(self, query: str) -> Optional[List[Task]]:
+        """
+        Search task descriptions.
         
-        if not filtered_tasks:
-            print("No tasks found with the specified filter")
+        Args:
+            query: Terms that must all appear in the description; a term
+                ending in "*" matches any word starting with it
+            
+        Returns:
+            List of matching tasks in ID order, or None if the query is empty
+        """
+        if not query or query.strip() == "":
+            self.sink.emit(Error("empty_query"))
+            return None
+        
+        found = self.tasks.search(query)
+        if not found:
+            self.sink.emit(Result("no_results", detail=query))
             return []
         
-        # Display tasks
-        print("\n--- Todo List ---")
-        for task in sorted(filtered_tasks, key=lambda t: t.id):
-            status = "✓" if task.completed else "○"
-            due_info = f", Due: {task.due_date}" if task.due_date else ""
-            print(f"{task.id}. [{status}] {task.description}{due_info}")
-        print("-----------------\n")
+        self.sink.emit(Result("tasks", tasks=found))
+        return found
+    
+    def overdue_tasks(self, today: Optional[str] = None) -> List[Task]:
+        """
+        Get pending tasks whose due date has passed, earliest first.
+        
+        Args:
+            today: Reference date in YYYY-MM-DD format (defaults to the current date)
+            
+        Returns:
+            List of overdue tasks ordered by due date
+        """
+        end = today_ordinal() if today is None else parse_date(today)
+        return list(self._iter_due(None, end, inclusive=False, pending_only=True))
+    
+    def tasks_due_before(self, before: str) -> List[Task]:
+        """
+        Get tasks due strictly before a date, earliest first.
+        
+        Args:
+            before: Exclusive upper bound in YYYY-MM-DD format
+            
+        Returns:
+            List of tasks ordered by due date
+        """
+        return list(self._iter_due(None, parse_date(before), inclusive=False))
+    
+    def tasks_due_between(self, start: str, end: str) -> List[Task]:
+        """
+        Get tasks due within a date range, earliest first.
+        
+        Args:
+            start: First date in YYYY-MM-DD format (inclusive)
+            end: Last date in YYYY-MM-DD format (inclusive)
+            
+        Returns:
+            List of tasks ordered by due date
+        """
+        return list(self._iter_due(parse_date(start), parse_date(end)))
+    
+    def next_due_tasks(self, count: int, today: Optional[str] = None) -> List[Task]:
+        """
+        Get the next pending tasks coming due, starting today.
+        
+        Args:
+            count: Maximum number of tasks to return
+            today: Reference date in YYYY-MM-DD format (defaults to the current date)
+            
+        Returns:
+            List of at most count tasks ordered by due date
+        """
+        start = today_ordinal() if today is None else parse_date(today)
+        return list(islice(self._iter_due(start, None, pending_only=True), count))
+    
+    def summary(self, today: Optional[str] = None, verify: bool = False) -> Optional[Dict[str, int]]:
+        """
+        Count tasks by status and due date without scanning them.
         
-        return filtered_tasks
+        Args:
+            today: Reference date for "overdue" and "due_today" in YYYY-MM-DD
+                format (defaults to the current date)
+            verify: Also count every task from scratch and report an error
+                if the running counts disagree
+            
+        Returns:
+            Dictionary with total, completed, pending, with_due_date, overdue
+            and due_today counts; None if the date is invalid or
+            verification failed
+        """
+        try:
+            start = today_ordinal() if today is None else parse_date(today)
+        except ValueError:
+            self.sink.emit(Error("invalid_date"))
+            return None
+        counts = self.aggregates.summary(start)
+        if self.archive:
+            counts["total"] += len(self.archive)
+            counts["completed"] += len(self.archive)
+            counts["with_due_date"] += self.archive.with_due_date
+        if verify:
+            mismatched = self.aggregates.mismatches(TaskAggregates.scan(self.tasks.values()), start)
+            if mismatched:
+                self.sink.emit(Error("summary_mismatch", fields=", ".join(mismatched)))
+                return None
+        self.sink.emit(Result("summary", detail=counts))
+        return counts
+    
+    def report(self, today: Optional[str] = None) -> Optional[Dict[str, list]]:
+        """
+        Aggregate every task, archived ones included, for reporting.
+        
+        The tasks are exported to columns once and the aggregates computed
+        with NumPy when it is installed (see analytics.py).
+        
+        Args:
+            today: Reference date for overdue tasks in YYYY-MM-DD format
+                (defaults to the current date)
+            
+        Returns:
+            Dictionary with overdue_by_week, completion_by_month and
+            due_by_month; None if the date is invalid
+        """
+        try:
+            start = today_ordinal() if today is None else parse_date(today)
+        except ValueError:
+            self.sink.emit(Error("invalid_date"))
+            return None
+        result = report(self._report_columns(), start)
+        self.sink.emit(Result("report", detail=result))
+        return result
+    
+    def _report_columns(self) -> TaskColumns:
+        """Every task, archived ones included, exported for report."""
+        return TaskColumns.from_tasks(self._all_tasks())
+    
+    def _iter_due(self, start: Optional[int], end: Optional[int], inclusive: bool = True,
+                  pending_only: bool = False) -> Iterator[Task]:
+        """Stream tasks due within a range of day ordinals, earliest first."""
+        return self.tasks.iter_due(start, end, inclusive, pending_only)
+    
+    def _iter_filter(self, filter_status: Optional[str], filter_args: Tuple[str, ...],
+                     after: Optional[int] = None, include_archived: bool = False) -> Optional[Iterator[Task]]:
+        """
+        Stream the tasks matching a view filter in its natural order.
+        
+        Raises ValueError for malformed dates; returns None when the count
+        given to "next" is not a positive number.
+        """
+        if filter_status == "overdue":
+            return self._iter_due(None, today_ordinal(), inclusive=False, pending_only=True)
+        if filter_status == "due-before":
+            return self._iter_due(None, parse_date(filter_args[0]), inclusive=False)
+        if filter_status == "due-between":
+            return self._iter_due(parse_date(filter_args[0]), parse_date(filter_args[1]))
+        if filter_status == "next":
+            count = int(filter_args[0]) if filter_args and filter_args[0].isdigit() else 0
+            if count < 1:
+                return None
+            return islice(self._iter_due(today_ordinal(), None, pending_only=True), count)
+        
+        start = None if after is None else after + 1
+        if filter_status == "pending":
+            return self.tasks.iter_status(False, start)
+        live = self.tasks.iter_status(True if filter_status == "completed" else None, start)
+        if include_archived and self.archive:
+            # Archived tasks are all completed and never also live
+            return heapq.merge(live, self.archive.iter_from(start), key=attrgetter('id'))
+        return live
+    
+    @staticmethod
+    def _sort_key(sort: str):
+        """Key function ordering tasks for one of VIEW_SORTS, ties broken by ID."""
+        if sort == "due":
+            # Undated tasks sort last
+            return lambda task: (task.due_ordinal is None, task.due_ordinal or 0, task.id)
+        if sort == "created":
+            return lambda task: (task.created_ts or 0, task.id)
+        return attrgetter('id')
     
     def update_task(self, task_id: int, new_description: Optional[str] = None, new_due_date: Optional[str] = None) -> bool:
         """
@@ -140,38 +455,46 @@ class TodoApp:
         Returns:
             True if update was successful, False otherwise
         """
-        if task_id not in self.tasks:
-            print(f"Error: Task with ID {task_id} does not exist")
+        if not self._exists(task_id):
+            self.sink.emit(Error("not_found", task_id=task_id))
             return False
         
-        task = self.tasks[task_id]
-        
         # If both parameters are None, nothing to update
         if new_description is None and new_due_date is None:
-            print("Error: No fields to update provided")
+            self.sink.emit(Error("no_fields"))
             return False
         
-        # Update description if provided
+        # Validate everything before touching the task so a failed update
+        # leaves it (and the journal) unchanged
         if new_description is not None:
             if not new_description or new_description.strip() == "":
-                print("Error: Task description cannot be empty or whitespace only")
+                self.sink.emit(Error("empty_description"))
                 return False
-            task.description = new_description.strip()
         
-        # Update due date if provided
-        if new_due_date is not None:
-            if new_due_date.strip() == "":
-                # Empty string means clear the due date
-                task.due_date = None
-            else:
-                try:
-                    datetime.strptime(new_due_date, "%Y-%m-%d")
-                    task.due_date = new_due_date
-                except ValueError:
-                    print("Error: Invalid date format. Please use YYYY-MM-DD format")
-                    return False
+        due_ordinal = None
+        if new_due_date is not None and new_due_date.strip() != "":
+            try:
+                due_ordinal = parse_date(new_due_date)
+            except ValueError:
+                self.sink.emit(Error("invalid_date"))
+                return False
+        
+        self._rehydrate(task_id)
+        task = self.tasks[task_id]
+        record = {'op': 'update', 'id': task_id}
+        with self.tasks.transaction():
+            # Update description if provided
+            if new_description is not None:
+                self._set_description(task, new_description.strip())
+                record['description'] = task.description
+            
+            # Update due date if provided; an empty string clears it
+            if new_due_date is not None:
+                self._set_due_date(task, due_ordinal)
+                record['due_date'] = task.due_date
         
-        print(f"Task updated successfully: ID {task.id} - {task.description}")
+        self._log(record)
+        self.sink.emit(Result("updated", task))
         return True
     
     def delete_task(self, task_id: int) -> bool:
@@ -184,13 +507,14 @@ class TodoApp:
         Returns:
             True if deletion was successful, False otherwise
         """
-        if task_id not in self.tasks:
-            print(f"Error: Task with ID {task_id} does not exist")
+        if not self._exists(task_id):
+            self.sink.emit(Error("not_found", task_id=task_id))
             return False
         
-        task = self.tasks[task_id]
-        del self.tasks[task_id]
-        print(f"Task deleted successfully: ID {task.id} - {task.description}")
+        self._rehydrate(task_id)
+        task = self._remove_task(task_id)
+        self._log({'op': 'delete', 'id': task_id})
+        self.sink.emit(Result("deleted", task))
         return True
     
     def mark_task_complete(self, task_id: int, completed: bool) -> bool:
@@ -204,106 +528,994 @@ class TodoApp:
         Returns:
             True if update was successful, False otherwise
         """
-        if task_id not in self.tasks:
-            print(f"Error: Task with ID {task_id} does not exist")
+        if not self._exists(task_id):
+            self.sink.emit(Error("not_found", task_id=task_id))
             return False
         
+        self._rehydrate(task_id)
         task = self.tasks[task_id]
-        task.completed = completed
+        self._set_completed(task, completed)
+        self._log({'op': 'complete', 'id': task_id, 'completed': completed})
+        self.sink.emit(Result("marked", task, detail="completed" if completed else "incomplete"))
+        return True
+    
+    def add_tasks(self, items: Iterable[Union[str, Tuple[str, Optional[str]]]]) -> BatchResult:
+        """
+        Add many tasks at once.
+        
+        The whole batch is validated before anything is stored: either every
+        task is added, with consecutive IDs starting at next_id, or none is.
+        
+        Args:
+            items: Descriptions, or (description, due_date) pairs
+            
+        Returns:
+            BatchResult with the new IDs, or the validation errors
+        """
+        parsed, errors = self._parse_new_tasks(items)
+        if errors:
+            return self._reject_batch('add', errors)
+        
+        first_id = self.next_id
+        created_ts = int(time.time())
+        with _gc_paused():
+            tasks = [Task(first_id + offset, description, False, due_date, created_ts)
+                     for offset, (description, due_date) in enumerate(parsed)]
+            with self.tasks.transaction():
+                self._insert_tasks(tasks)
+        self.next_id = first_id + len(parsed)
+        ids = list(range(first_id, self.next_id))
+        
+        if ids:
+            self._log({'op': 'batch', 'records': self._add_records(tasks)})
+        return self._finish_batch(BatchResult('add', ids))
+    
+    def _parse_new_tasks(self, items: Iterable[Union[str, Tuple[str, Optional[str]]]]
+                         ) -> Tuple[List[Tuple[str, Optional[str]]], List[Tuple[int, Error]]]:
+        """Validate the items of an add_tasks batch, returning (description, due_date) pairs and errors."""
+        parsed: List[Tuple[str, Optional[str]]] = []
+        errors: List[Tuple[int, Error]] = []
+        for position, item in enumerate(items):
+            description, due_date = (item, None) if isinstance(item, str) else item
+            if not description or description.strip() == "":
+                errors.append((position, Error("empty_description")))
+                continue
+            if len(description) > 500:
+                errors.append((position, Error("description_too_long")))
+                continue
+            if due_date and self._checked_ordinal(due_date) is None:
+                errors.append((position, Error("invalid_date")))
+                continue
+            parsed.append((description.strip(), due_date or None))
+        return parsed, errors
+    
+    def update_tasks(self, updates: Iterable[Tuple[int, Optional[str], Optional[str]]]) -> BatchResult:
+        """
+        Update many tasks at once, all or nothing.
+        
+        Args:
+            updates: (task_id, new_description, new_due_date) triples with the
+                same meaning as the update_task arguments
+            
+        Returns:
+            BatchResult with the updated IDs, or the validation errors
+        """
+        parsed = []
+        errors: List[Tuple[int, Error]] = []
+        for position, (task_id, new_description, new_due_date) in enumerate(updates):
+            if not self._exists(task_id):
+                errors.append((position, Error("not_found", task_id=task_id)))
+            elif new_description is None and new_due_date is None:
+                errors.append((position, Error("no_fields")))
+            elif new_description is not None and new_description.strip() == "":
+                errors.append((position, Error("empty_description")))
+            elif new_due_date and new_due_date.strip() != "" and self._checked_ordinal(new_due_date) is None:
+                errors.append((position, Error("invalid_date")))
+            else:
+                parsed.append((task_id, new_description, new_due_date))
+        if errors:
+            return self._reject_batch('update', errors)
+        
+        records = []
+        with self.tasks.transaction():
+            for task_id, new_description, new_due_date in parsed:
+                self._rehydrate(task_id)
+                task = self.tasks[task_id]
+                record = {'op': 'update', 'id': task_id}
+                if new_description is not None:
+                    self._set_description(task, new_description.strip())
+                    record['description'] = task.description
+                if new_due_date is not None:
+                    self._set_due_date(task, parse_date(new_due_date) if new_due_date.strip() != "" else None)
+                    record['due_date'] = task.due_date
+                records.append(record)
+        
+        ids = [task_id for task_id, _, _ in parsed]
+        if ids:
+            self._log({'op': 'batch', 'records': records})
+        return self._finish_batch(BatchResult('update', ids))
+    
+    def delete_tasks(self, task_ids: Iterable[int]) -> BatchResult:
+        """
+        Delete many tasks at once, all or nothing.
+        
+        Args:
+            task_ids: IDs of the tasks to delete
+            
+        Returns:
+            BatchResult with the deleted IDs, or the validation errors
+        """
+        ids, errors = self._validate_ids(task_ids)
+        if errors:
+            return self._reject_batch('delete', errors)
+        
+        with self.tasks.transaction():
+            for task_id in ids:
+                self._rehydrate(task_id)
+                self._remove_task(task_id)
+        if ids:
+            self._log({'op': 'batch', 'records': [{'op': 'delete', 'id': task_id} for task_id in ids]})
+        return self._finish_batch(BatchResult('delete', ids))
+    
+    def mark_tasks(self, task_ids: Iterable[int], completed: bool) -> BatchResult:
+        """
+        Mark many tasks as complete or incomplete at once, all or nothing.
+        
+        Args:
+            task_ids: IDs of the tasks to update
+            completed: True to mark as complete, False to mark as incomplete
+            
+        Returns:
+            BatchResult with the updated IDs, or the validation errors
+        """
+        ids, errors = self._validate_ids(task_ids)
+        if errors:
+            return self._reject_batch('mark', errors)
+        
+        tasks = self.tasks
+        with tasks.transaction():
+            for task_id in ids:
+                self._rehydrate(task_id)
+                self._set_completed(tasks[task_id], completed)
+        if ids:
+            self._log({'op': 'batch', 'records': [
+                {'op': 'complete', 'id': task_id, 'completed': completed} for task_id in ids
+            ]})
         status_text = "completed" if completed else "incomplete"
-        print(f"Task marked as {status_text}: ID {task.id} - {task.description}")
+        return self._finish_batch(BatchResult('mark', ids, detail=status_text))
+    
+    def export_tasks(self, path: str) -> Optional[int]:
+        """
+        Export every task to a newline-delimited JSON file.
+        
+        Tasks are streamed in ID order and written in chunks, so memory use
+        does not grow with the size of the task list.
+        
+        Args:
+            path: File to write, one JSON task per line
+            
+        Returns:
+            Number of tasks exported, or None if the file could not be written
+        """
+        started = time.perf_counter()
+        count = 0
+        try:
+            with open(path, "w", encoding="utf-8") as stream:
+                for chunk in self._chunks(self.iter_ndjson()):
+                    stream.write("\n".join(chunk) + "\n")
+                    count += len(chunk)
+        except OSError as exc:
+            self.sink.emit(Error("file_error", path=path, reason=exc.strerror or str(exc)))
+            return None
+        
+        self.sink.emit(Result("exported", detail=self._transfer_stats(path, count, started)))
+        return count
+    
+    def iter_ndjson(self) -> Iterator[str]:
+        """Stream every task, archived ones included, as a compact JSON line (without newline), in ID order."""
+        dumps = json.JSONEncoder(separators=(",", ":")).encode
+        for task in self._all_tasks():
+            yield dumps(task.to_dict())
+    
+    def _all_tasks(self) -> Iterator[Task]:
+        """Every live and archived task in ID order."""
+        if not self.archive:
+            return iter(self.tasks.values())
+        return heapq.merge(self.tasks.values(), self.archive.values(), key=attrgetter('id'))
+    
+    def import_tasks(self, path: str) -> Optional[int]:
+        """
+        Import tasks from a newline-delimited JSON file.
+        
+        Lines are parsed incrementally and applied in fixed-size chunks, so
+        memory use stays flat however large the file is. Tasks keep their IDs
+        where those are free. Tasks whose ID is already taken are spilled to a
+        temporary file and imported last with fresh IDs from next_id, once it
+        has moved past every ID in the file, so renumbering can never collide
+        with a later line; so are repeats of an ID earlier in the file.
+        Malformed lines (including a non-boolean "completed" or an ID too
+        large for the due-date index) are skipped and counted.
+        
+        Args:
+            path: File to read, one JSON task per line
+            
+        Returns:
+            Number of tasks imported, renumbered ones included, or None if
+            the file could not be read
+        """
+        started = time.perf_counter()
+        skipped = 0
+        try:
+            with open(path, "r", encoding="utf-8") as stream, \
+                    tempfile.TemporaryFile("w+", encoding="utf-8") as collisions:
+                imported = 0
+                for chunk in self._chunks(stream):
+                    tasks = []
+                    # Earlier chunks are in the store by now; this catches
+                    # repeats within the chunk
+                    chunk_ids = set()
+                    for line in chunk:
+                        task = self._parse_import_line(line)
+                        if task is None:
+                            skipped += bool(line.strip())
+                        elif (task.id in chunk_ids or task.id in self.tasks
+                              or (self.archive is not None and task.id in self.archive)):
+                            collisions.write(line if line.endswith("\n") else line + "\n")
+                        else:
+                            chunk_ids.add(task.id)
+                            tasks.append(task)
+                    imported += self._import_chunk(tasks, renumber=False)
+                
+                collisions.seek(0)
+                renumbered = 0
+                for chunk in self._chunks(collisions):
+                    renumbered += self._import_chunk([self._parse_import_line(line) for line in chunk],
+                                                     renumber=True)
+        except OSError as exc:
+            self.sink.emit(Error("file_error", path=path, reason=exc.strerror or str(exc)))
+            return None
+        
+        stats = self._transfer_stats(path, imported + renumbered, started)
+        stats.update(renumbered=renumbered, skipped=skipped)
+        self.sink.emit(Result("imported", detail=stats))
+        return imported + renumbered
+    
+    def _import_chunk(self, tasks: List[Task], renumber: bool) -> int:
+        """Store one chunk of imported tasks and journal it as a single batch."""
+        if renumber:
+            for offset, task in enumerate(tasks):
+                task.id = self.next_id + offset
+        with _gc_paused(), self.tasks.transaction():
+            self._insert_tasks(tasks)
+        if tasks:
+            self.next_id = max(self.next_id, max(task.id for task in tasks) + 1)
+        if tasks:
+            self._log({'op': 'batch', 'records': self._add_records(tasks)})
+        return len(tasks)
+    
+    @staticmethod
+    def _parse_import_line(line: str) -> Optional[Task]:
+        """Build a task from one NDJSON line, or None if the line is not a valid task."""
+        try:
+            task = Task.from_dict(_decode_json(line))
+        except (ValueError, TypeError, KeyError, AttributeError):
+            return None
+        description = task.description
+        # Due-date index keys pack the ID into its low ID_BITS bits
+        if (not isinstance(task.id, int) or not 1 <= task.id < 1 << DueDateIndex.ID_BITS
+                or not isinstance(task.completed, bool) or not isinstance(description, str)
+                or description.strip() == "" or len(description) > 500):
+            return None
+        return task
+    
+    @staticmethod
+    def _chunks(items: Iterable, size: int = 10000) -> Iterator[list]:
+        """Group an iterable into lists of at most size items."""
+        iterator = iter(items)
+        while True:
+            chunk = list(islice(iterator, size))
+            if not chunk:
+                return
+            yield chunk
+    
+    @staticmethod
+    def _transfer_stats(path: str, count: int, started: float) -> dict:
+        """Summarize an import or export for reporting."""
+        seconds = time.perf_counter() - started
+        return {'path': path, 'count': count, 'seconds': seconds,
+                'rate': count / seconds if seconds > 0 else 0.0}
+    
+    def _validate_ids(self, task_ids: Iterable[int]) -> Tuple[List[int], List[Tuple[int, Error]]]:
+        """Check that every ID in a batch exists and appears only once."""
+        ids: List[int] = []
+        errors: List[Tuple[int, Error]] = []
+        seen = set()
+        for position, task_id in enumerate(task_ids):
+            if not self._exists(task_id):
+                errors.append((position, Error("not_found", task_id=task_id)))
+            elif task_id in seen:
+                errors.append((position, Error("duplicate_id", task_id=task_id)))
+            else:
+                seen.add(task_id)
+                ids.append(task_id)
+        return ids, errors
+    
+    @staticmethod
+    def _checked_ordinal(value: str) -> Optional[int]:
+        """Parse a date, returning None instead of raising when it is invalid."""
+        try:
+            return parse_date(value)
+        except ValueError:
+            return None
+    
+    def _reject_batch(self, operation: str, errors: List[Tuple[int, Error]]) -> BatchResult:
+        """Report a rejected batch once, with all of its errors."""
+        return self._finish_batch(BatchResult(operation, errors=errors))
+    
+    def _finish_batch(self, batch: BatchResult) -> BatchResult:
+        """Emit a batch summary and hand it back to the caller."""
+        self.sink.emit(batch)
+        return batch
+    
+    def get_task(self, task_id: int) -> Optional[Task]:
+        """A task by ID, live or archived (as a read-only copy), or None."""
+        task = self.tasks.get(task_id)
+        if task is None and self.archive is not None:
+            task = self.archive.get(task_id)
+        return task
+    
+    def archive_completed(self, max_age_days: Optional[float] = None) -> Optional[int]:
+        """
+        Move old completed tasks out of the live store into the archive.
+        
+        Archived tasks stay visible to get_task, summary, export and
+        "view completed --include-archived"; changing one moves it back.
+        Archiving is not journaled: the journal still holds every task, so
+        after a restart they are live until the next archive pass.
+        
+        Args:
+            max_age_days: Archive completed tasks created at least this many
+                days ago (defaults to the archive's max_age_days)
+            
+        Returns:
+            Number of tasks archived, or None if there is no archive
+        """
+        if self.archive is None:
+            self.sink.emit(Error("usage", text="Archiving is not enabled; start with --archive-after DAYS"))
+            return None
+        if self._history is not None:
+            self.sink.emit(Error("usage", text="Archiving cannot be combined with undo history"))
+            return None
+        age = self.archive.max_age_days if max_age_days is None else max_age_days
+        cutoff = time.time() - age * 86400
+        old = [task for task in self.tasks.iter_status(True) if task.created_ts <= cutoff]
+        with self.tasks.transaction():
+            for task in old:
+                self._remove_task(task.id)
+        self.archive.add(old)
+        self.sink.emit(Result("archived", detail=len(old)))
+        return len(old)
+    
+    def save_snapshot(self) -> Optional[int]:
+        """
+        Remember the current task set so it can be rolled back to later.
+        
+        Taking a snapshot is O(1): it keeps a reference to the store's
+        current version, which later changes never modify.
+        
+        Returns:
+            Number of the snapshot, for rollback; None without undo history
+        """
+        if not self._check_history():
+            return None
+        self._snapshots.append(self.tasks.version)
+        number = len(self._snapshots)
+        self.sink.emit(Result("snapshot", detail=number))
+        return number
+    
+    def undo(self) -> bool:
+        """
+        Revert the last change (a command, or an import chunk).
+        
+        Returns:
+            True if there was a change to undo
+        """
+        if not self._check_history():
+            return False
+        if self._position == 0:
+            self.sink.emit(Error("nothing_to_undo"))
+            return False
+        self._position -= 1
+        changed = self._switch_to(self._history[self._position])
+        self.sink.emit(Result("undone", detail=changed))
+        return True
+    
+    def redo(self) -> bool:
+        """
+        Reapply the last undone change; any other change since clears redo.
+        
+        Returns:
+            True if there was a change to redo
+        """
+        if not self._check_history():
+            return False
+        if self._position == len(self._history) - 1:
+            self.sink.emit(Error("nothing_to_redo"))
+            return False
+        self._position += 1
+        changed = self._switch_to(self._history[self._position])
+        self.sink.emit(Result("redone", detail=changed))
         return True
     
+    def rollback(self, number: int) -> bool:
+        """
+        Return the task set to a snapshot; the rollback itself can be undone.
+        
+        Args:
+            number: Snapshot number returned by save_snapshot
+            
+        Returns:
+            True if the snapshot exists
+        """
+        if not self._check_history():
+            return False
+        if not 1 <= number <= len(self._snapshots):
+            self.sink.emit(Error("unknown_snapshot", snapshot=number))
+            return False
+        changed = self._switch_to(self._snapshots[number - 1])
+        self._track_version()
+        self.sink.emit(Result("rolled_back", detail={"snapshot": number, "changed": changed}))
+        return True
+    
+    def _check_history(self) -> bool:
+        if self._history is None:
+            self.sink.emit(Error("usage", text="Undo and snapshots need the persistent store; start with --persistent"))
+            return False
+        return True
+    
+    def _switch_to(self, version: StoreVersion) -> int:
+        """
+        Make a version of the store current, bringing the running counts
+        and the journal along.
+        
+        Only the tasks that differ are visited: subtrees the two versions
+        share are skipped without being walked.
+        
+        Returns:
+            Number of tasks added, removed or changed
+        """
+        store = self.tasks
+        current = store.version
+        records = []
+        changed = 0
+        for task_id in store.changed_ids(current, version):
+            changed += 1
+            old, new = store.task_in(current, task_id), store.task_in(version, task_id)
+            if old is not None:
+                self.aggregates.removed(old)
+                records.append({'op': 'delete', 'id': task_id})
+            if new is not None:
+                self.aggregates.added(new)
+                records.append({'op': 'add', 'task': new.to_dict()})
+            if self.scheduler is not None:
+                if new is None:
+                    self.scheduler.cancel(task_id)
+                else:
+                    self.scheduler.track(new)
+        store.restore(version)
+        if records:
+            self._write_record({'op': 'batch', 'records': records})
+        return changed
+    
+    def _track_version(self):
+        """Make the store's current version the newest undo step, dropping any redo steps."""
+        history = self._history
+        if history is None:
+            return
+        del history[self._position + 1:]
+        history.append(self.tasks.version)
+        if len(history) > self.UNDO_LIMIT + 1:
+            del history[0]
+        self._position = len(history) - 1
+    
+    def check_reminders(self) -> List[Task]:
+        """
+        Fire the reminders of tasks that have become due since the last check.
+        
+        Every scheduler callback is called with each task, earliest due
+        first. Only the scheduler's timing wheel is consulted, not the tasks.
+        
+        Returns:
+            Tasks reminded, empty if there is no scheduler
+        """
+        if self.scheduler is None:
+            return []
+        tasks = [self.tasks[task_id] for task_id in self.scheduler.due()]
+        for task in tasks:
+            for callback in self.scheduler.callbacks:
+                callback(task)
+        return tasks
+    
+    def _exists(self, task_id: int) -> bool:
+        """Whether a task is live or archived, without moving it back."""
+        return task_id in self.tasks or bool(self.archive) and task_id in self.archive
+    
+    def _rehydrate(self, task_id: int):
+        """Move a task back from the archive into the live store, if it is archived."""
+        if self.archive and task_id in self.archive:
+            self._insert_task(self.archive.pop(task_id))
+    
+    def _insert_task(self, task: Task):
+        """Store a task and register it with every index."""
+        self.tasks.insert(task)
+        self.aggregates.added(task)
+        if self.scheduler is not None:
+            self.scheduler.track(task)
+    
+    def _add_records(self, tasks: List[Task]) -> List[dict]:
+        """Journal records for newly stored tasks; none if neither the journal nor the feed takes them."""
+        if self.journal is None and self.feed is None:
+            return []
+        return [{'op': 'add', 'task': task.to_dict()} for task in tasks]
+    
+    def _insert_tasks(self, tasks: List[Task]):
+        """Store a batch of new tasks, updating the store's indexes in bulk."""
+        self.tasks.insert_many(tasks)
+        for task in tasks:
+            self.aggregates.added(task)
+        if self.scheduler is not None:
+            for task in tasks:
+                self.scheduler.track(task)
+    
+    def _remove_task(self, task_id: int) -> Task:
+        """Drop a task from the store and every index."""
+        task = self.tasks.remove(task_id)
+        self.aggregates.removed(task)
+        if self.scheduler is not None:
+            self.scheduler.cancel(task_id)
+        return task
+    
+    def _set_completed(self, task: Task, completed: bool):
+        """Change a task's completion status, moving it between status indexes."""
+        was_completed = task.completed
+        self.tasks.set_completed(task, completed)
+        self.aggregates.completion_changed(task, was_completed)
+        if self.scheduler is not None:
+            self.scheduler.track(task)
+    
+    def _set_description(self, task: Task, description: str):
+        """Change a task's description, re-indexing its words."""
+        self.tasks.set_description(task, description)
+    
+    def _set_due_date(self, task: Task, due_ordinal: Optional[int]):
+        """Change a task's due date, re-keying it in the due-date index."""
+        old_ordinal = task.due_ordinal
+        self.tasks.set_due_date(task, due_ordinal)
+        self.aggregates.due_date_changed(task, old_ordinal)
+        if self.scheduler is not None:
+            self.scheduler.track(task)
+    
+    def close(self):
+        """Flush the journal, metrics and profiler, then release the journal and store."""
+        if self.metrics is not None:
+            self.metrics.dump(self.tasks)
+        if self.profiler is not None:
+            self.profiler.close()
+        if self.journal is not None:
+            self.journal.close()
+        self.tasks.close()
+    
+    def _log(self, record: dict):
+        """Record a mutation: journal and publish it, and make it an undo step."""
+        self._write_record(record)
+        self._track_version()
+    
+    def _write_record(self, record: dict):
+        """Send a mutation record to the change feed and the journal, compacting the journal when due."""
+        if self.feed is not None:
+            self.feed.publish(record)
+        if self.journal is not None and self.journal.append(record):
+            self.journal.compact(self.next_id, (task.to_dict() for task in self._all_tasks()))
+    
+    def _restore_snapshot(self, next_id: int, tasks: Iterable[dict]):
+        """Load the task set from a journal snapshot."""
+        with self.tasks.transaction():
+            for data in tasks:
+                self._insert_task(Task.from_dict(data))
+        self.next_id = next_id
+    
+    def _apply_record(self, record: dict):
+        """Re-apply one journaled mutation during replay."""
+        op = record['op']
+        if op == 'batch':
+            for sub_record in record['records']:
+                self._apply_record(sub_record)
+        elif op == 'add':
+            task = Task.from_dict(record['task'])
+            self._insert_task(task)
+            self.next_id = max(self.next_id, task.id + 1)
+        elif op == 'update':
+            task = self.tasks[record['id']]
+            if 'description' in record:
+                self._set_description(task, record['description'])
+            if 'due_date' in record:
+                due_date = record['due_date']
+                self._set_due_date(task, parse_date(due_date) if due_date else None)
+        elif op == 'delete':
+            self._remove_task(record['id'])
+        elif op == 'complete':
+            self._set_completed(self.tasks[record['id']], record['completed'])
+    
     def run(self):
         """Run the main application loop."""
         print("Welcome to the Todo App!")
         print("Available commands:")
-        print("  add <description> [due_date] - Add a new task")
+        print('  add <description> [due_date] - Add a new task (quote multi-word descriptions)')
         print("  view [all|completed|pending] - View tasks")
+        print("  view overdue | due-before <date> | due-between <start> <end> | next <count>")
+        print("       - View tasks by due date")
+        print("  view ... [--limit N] [--offset N] [--after ID] [--sort id|due|created]")
+        print("       - Page through tasks; --after continues from the last ID shown")
+        print("  view all|completed --include-archived - Include archived tasks")
         print("  update <id> [new_description] [new_due_date] - Update a task")
+        print("  search <terms> - Find tasks containing all terms (term* matches a prefix)")
         print("  delete <id> - Delete a task")
+        print("  export <file> - Save all tasks as newline-delimited JSON")
+        print("  import <file> - Load tasks from newline-delimited JSON")
         print("  complete <id> - Mark task as complete")
         print("  incomplete <id> - Mark task as incomplete")
+        print("  summary [--verify] - Count tasks by status and due date")
+        print("  report [date] - Overdue tasks by week, completion by month and due dates by month")
+        print("  archive [days] - Archive completed tasks older than days (needs --archive-after)")
+        print("  snapshot - Remember the current tasks; rollback <snapshot> returns to them")
+        print("  undo | redo - Revert or reapply the last change (needs --persistent)")
+        print("  stats - Show command counts, latencies, task counts and memory use (needs --metrics)")
+        print("  profile on|off - Resume or pause profiling (needs --profile)")
         print("  quit - Exit the application")
         print()
         
         while True:
             try:
-                command = input("Enter command: ").strip().split()
+                self.check_reminders()
+                command = self.parse_command(input("Enter command: "))
                 
                 if not command:
                     continue
                 
-                cmd = command[0].lower()
-                
-                if cmd == "quit":
+                if command[0].lower() == "quit":
                     print("Goodbye!")
                     break
-                elif cmd == "add":
-                    if len(command) < 2:
-                        print("Usage: add <description> [due_date]")
-                        continue
-                    description = command[1]
-                    due_date = command[2] if len(command) > 2 else None
-                    self.add_task(description, due_date)
-                elif cmd == "view":
-                    filter_status = command[1] if len(command) > 1 else None
-                    if filter_status and filter_status not in ["all", "completed", "pending"]:
-                        print("Filter must be 'all', 'completed', or 'pending'")
-                        continue
-                    self.view_tasks(filter_status)
-                elif cmd == "update":
-                    if len(command) < 3:
-                        print("Usage: update <id> [new_description] [new_due_date]")
-                        continue
-                    try:
-                        task_id = int(command[1])
-                        new_description = command[2] if len(command) > 2 and command[2] != "None" else None
-                        new_due_date = command[3] if len(command) > 3 and command[3] != "None" else None
-                        self.update_task(task_id, new_description, new_due_date)
-                    except ValueError:
-                        print("Task ID must be a number")
-                elif cmd == "delete":
-                    if len(command) < 2:
-                        print("Usage: delete <id>")
-                        continue
-                    try:
-                        task_id = int(command[1])
-                        self.delete_task(task_id)
-                    except ValueError:
-                        print("Task ID must be a number")
-                elif cmd == "complete":
-                    if len(command) < 2:
-                        print("Usage: complete <id>")
-                        continue
-                    try:
-                        task_id = int(command[1])
-                        self.mark_task_complete(task_id, True)
-                    except ValueError:
-                        print("Task ID must be a number")
-                elif cmd == "incomplete":
-                    if len(command) < 2:
-                        print("Usage: incomplete <id>")
-                        continue
-                    try:
-                        task_id = int(command[1])
-                        self.mark_task_complete(task_id, False)
-                    except ValueError:
-                        print("Task ID must be a number")
-                else:
-                    print("Unknown command. Available commands: add, view, update, delete, complete, incomplete, quit")
+                self.execute(command)
             except KeyboardInterrupt:
                 print("\nGoodbye!")
                 break
             except EOFError:
                 print("\nGoodbye!")
                 break
+    
+    def run_batch(self, lines: Iterable[str], stop_on_error: bool = False) -> int:
+        """
+        Run commands non-interactively, one per line.
+        
+        No prompts are printed and output is written in large chunks. Blank
+        lines and lines starting with "#" are skipped; "quit" ends the batch.
+        
+        Args:
+            lines: Command lines, e.g. an open file or sys.stdin
+            stop_on_error: Stop at the first command that fails
+            
+        Returns:
+            Number of commands that failed
+        """
+        failures = 0
+        output = _BufferedOutput(sys.stdout)
+        with redirect_stdout(output):
+            for line_number, line in enumerate(lines, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                command = self.parse_command(line)
+                if command and command[0].lower() == "quit":
+                    break
+                if not command or not self.execute(command):
+                    failures += 1
+                    if stop_on_error:
+                        print(f"Stopped at line {line_number}: {line}")
+                        break
+        output.flush()
+        return failures
+    
+    def parse_command(self, line: str) -> List[str]:
+        """
+        Split a command line into arguments, honouring shell-style quotes.
+        
+        Returns:
+            List of arguments, empty if the line is blank or malformed
+        """
+        # shlex is pure Python and slow; plain lines only need a whitespace split
+        if '"' not in line and "'" not in line and "\\" not in line:
+            return line.split()
+        try:
+            return shlex.split(line)
+        except ValueError:
+            self.sink.emit(Error("usage", text="Error: Unbalanced quotes in command"))
+            return []
+    
+    def execute(self, command: List[str]) -> bool:
+        """
+        Dispatch one parsed command, counting and timing it if metrics are
+        enabled and running it under the profiler if there is one.
+        
+        Args:
+            command: Command name followed by its arguments
+            
+        Returns:
+            True if the command succeeded, False on usage or validation errors
+        """
+        metrics, profiler = self.metrics, self.profiler
+        if metrics is None and profiler is None:
+            return self._dispatch(command)
+        name = command[0].lower()
+        if name not in self.COMMANDS:
+            name = "unknown"
+        ok = False
+        started = time.perf_counter_ns()
+        try:
+            if profiler is None:
+                ok = self._dispatch(command)
+            else:
+                ok = profiler.call(name, self._dispatch, command)
+        finally:
+            if metrics is not None:
+                finished = time.perf_counter_ns()
+                metrics.record(name, finished - started, ok, finished, self.tasks)
+        return ok
+    
+    def _dispatch(self, command: List[str]) -> bool:
+        """Run one parsed command; see execute."""
+        cmd = command[0].lower()
+        
+        if cmd == "add":
+            if len(command) < 2:
+                self.sink.emit(Error("usage", text="Usage: add <description> [due_date]"))
+                return False
+            description = command[1]
+            due_date = command[2] if len(command) > 2 else None
+            return self.add_task(description, due_date) is not None
+        elif cmd == "view":
+            arguments = []
+            options = {}
+            words = iter(command[1:])
+            for word in words:
+                if not word.startswith("--"):
+                    arguments.append(word)
+                    continue
+                if word in self.VIEW_FLAGS:
+                    options[word[2:].replace("-", "_")] = True
+                    continue
+                value = next(words, None)
+                if word not in self.VIEW_OPTIONS or value is None:
+                    self.sink.emit(Error("usage", text="Usage: view [filter] [--limit N] [--offset N] "
+                                                       "[--after ID] [--sort id|due|created] "
+                                                       "[--include-archived]"))
+                    return False
+                options[word[2:]] = value
+            for name in ("limit", "offset", "after"):
+                if name in options:
+                    if not options[name].isdigit():
+                        self.sink.emit(Error("usage", text=f"--{name} must be a non-negative number"))
+                        return False
+                    options[name] = int(options[name])
+            
+            filter_status = arguments[0] if arguments else None
+            if filter_status and filter_status not in self.VIEW_FILTERS:
+                self.sink.emit(Error("usage", text="Filter must be one of: " + ", ".join(self.VIEW_FILTERS)))
+                return False
+            filter_args = arguments[1:]
+            arg_usage = self.VIEW_FILTERS.get(filter_status, "")
+            if len(filter_args) < len(arg_usage.split()):
+                self.sink.emit(Error("usage", text=f"Usage: view {filter_status} {arg_usage}"))
+                return False
+            return self.view_tasks(filter_status, *filter_args, **options) is not None
+        elif cmd == "update":
+            if len(command) < 3:
+                self.sink.emit(Error("usage", text="Usage: update <id> [new_description] [new_due_date]"))
+                return False
+            try:
+                task_id = int(command[1])
+            except ValueError:
+                self.sink.emit(Error("usage", text="Task ID must be a number"))
+                return False
+            new_description = command[2] if len(command) > 2 and command[2] != "None" else None
+            new_due_date = command[3] if len(command) > 3 and command[3] != "None" else None
+            return self.update_task(task_id, new_description, new_due_date)
+        elif cmd == "search":
+            if len(command) < 2:
+                self.sink.emit(Error("usage", text="Usage: search <terms>"))
+                return False
+            return self.search(" ".join(command[1:])) is not None
+        elif cmd in ("export", "import"):
+            if len(command) < 2:
+                self.sink.emit(Error("usage", text=f"Usage: {cmd} <file>"))
+                return False
+            if cmd == "export":
+                return self.export_tasks(command[1]) is not None
+            return self.import_tasks(command[1]) is not None
+        elif cmd in ("delete", "complete", "incomplete"):
+            if len(command) < 2:
+                self.sink.emit(Error("usage", text=f"Usage: {cmd} <id>"))
+                return False
+            try:
+                task_id = int(command[1])
+            except ValueError:
+                self.sink.emit(Error("usage", text="Task ID must be a number"))
+                return False
+            if cmd == "delete":
+                return self.delete_task(task_id)
+            return self.mark_task_complete(task_id, cmd == "complete")
+        elif cmd == "archive":
+            if len(command) > 2 or (len(command) == 2 and not command[1].replace(".", "", 1).isdigit()):
+                self.sink.emit(Error("usage", text="Usage: archive [days]"))
+                return False
+            return self.archive_completed(float(command[1]) if len(command) == 2 else None) is not None
+        elif cmd in ("snapshot", "undo", "redo"):
+            if len(command) != 1:
+                self.sink.emit(Error("usage", text=f"Usage: {cmd}"))
+                return False
+            if cmd == "snapshot":
+                return self.save_snapshot() is not None
+            return self.undo() if cmd == "undo" else self.redo()
+        elif cmd == "rollback":
+            if len(command) != 2 or not command[1].isdigit():
+                self.sink.emit(Error("usage", text="Usage: rollback <snapshot>"))
+                return False
+            return self.rollback(int(command[1]))
+        elif cmd == "summary":
+            if command[1:] not in ([], ["--verify"]):
+                self.sink.emit(Error("usage", text="Usage: summary [--verify]"))
+                return False
+            return self.summary(verify=len(command) > 1) is not None
+        elif cmd == "report":
+            if len(command) > 2:
+                self.sink.emit(Error("usage", text="Usage: report [date]"))
+                return False
+            return self.report(command[1] if len(command) == 2 else None) is not None
+        elif cmd == "stats":
+            if self.metrics is None:
+                self.sink.emit(Error("usage", text="Metrics are not enabled; start with --metrics"))
+                return False
+            self.sink.emit(Result("message", detail=self.metrics.render(self.tasks)))
+            return True
+        elif cmd == "profile":
+            if len(command) != 2 or command[1].lower() not in ("on", "off"):
+                self.sink.emit(Error("usage", text="Usage: profile on|off"))
+                return False
+            if self.profiler is None:
+                self.sink.emit(Error("usage", text="Profiling is not enabled; start with --profile DIR"))
+                return False
+            self.profiler.enabled = command[1].lower() == "on"
+            self.sink.emit(Result("message", detail=f"Profiling {command[1].lower()}"))
+            return True
+        else:
+            self.sink.emit(Error("usage", text="Unknown command. Available commands: " + ", ".join(self.COMMANDS)))
+            return False
+
+
+class _BufferedOutput:
+    """Text sink that hands output to a stream in large chunks."""
+    
+    def __init__(self, stream, limit: int = 1 << 16):
+        self._stream = stream
+        self._limit = limit
+        self._parts: List[str] = []
+        self._size = 0
+    
+    def write(self, text: str) -> int:
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self._limit:
+            self.flush()
+        return len(text)
+    
+    def flush(self):
+        if self._parts:
+            self._stream.write("".join(self._parts))
+            self._parts = []
+            self._size = 0
+        self._stream.flush()
 
 
 def main():
     """Main entry point."""
-    app = TodoApp()
-    app.run()
+    parser = argparse.ArgumentParser(description="CLI Todo application")
+    parser.add_argument("--journal", metavar="DIR",
+                        help="persist tasks in an append-only journal stored in DIR")
+    parser.add_argument("--db", metavar="FILE",
+                        help="keep tasks in the SQLite database FILE instead of in memory")
+    parser.add_argument("--columnar", action="store_true",
+                        help="keep tasks in compact in-memory columns, for very large lists "
+                             "(searches scan instead of using an index)")
+    parser.add_argument("--persistent", action="store_true",
+                        help="keep tasks in persistent maps, enabling snapshot, rollback, undo and redo")
+    parser.add_argument("--remind", action="store_true",
+                        help="print a reminder when a pending task becomes due (interactively before "
+                             "each prompt, with --serve or --daemon every minute)")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="run commands from FILE ('-' for stdin) without prompting")
+    parser.add_argument("--stop-on-error", action="store_true",
+                        help="with --batch, stop at the first failing command")
+    parser.add_argument("--serve", metavar="[HOST:]PORT",
+                        help="serve the task list as a JSON HTTP API instead of prompting")
+    parser.add_argument("--daemon", metavar="SOCKET",
+                        help="keep the task list loaded and take commands from todo_client.py "
+                             "over the Unix socket SOCKET")
+    parser.add_argument("--metrics", action="store_true",
+                        help="count and time every command, for the stats command")
+    parser.add_argument("--metrics-file", metavar="FILE",
+                        help="periodically write command metrics to FILE in Prometheus text format "
+                             "(implies --metrics)")
+    parser.add_argument("--metrics-interval", metavar="SECONDS", type=float, default=15.0,
+                        help="with --metrics-file, seconds between writes (default 15)")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="profile commands with cProfile and tracemalloc and write the "
+                             "reports to DIR on exit")
+    parser.add_argument("--profile-sample", metavar="N", type=int, default=1,
+                        help="with --profile, profile only every Nth command (default 1)")
+    parser.add_argument("--archive-after", metavar="DAYS", type=float,
+                        help="move completed tasks created more than DAYS days ago into a compressed "
+                             "in-memory archive, at startup and on each archive command")
+    args = parser.parse_args()
+    if args.profile_sample < 1:
+        parser.error("--profile-sample must be at least 1")
+    if args.journal and args.db:
+        parser.error("--journal and --db cannot be combined; the database is already persistent")
+    if args.archive_after is not None and args.db:
+        parser.error("--archive-after cannot be combined with --db; the archive is kept in memory only")
+    if args.columnar and args.db:
+        parser.error("--columnar and --db cannot be combined; choose one store")
+    if args.persistent and (args.db or args.columnar):
+        parser.error("--persistent cannot be combined with --db or --columnar; choose one store")
+    if args.persistent and args.archive_after is not None:
+        parser.error("--persistent cannot be combined with --archive-after")
+    
+    journal = Journal(args.journal) if args.journal else None
+    if args.db:
+        store = SQLiteStore(args.db)
+    elif args.columnar:
+        store = ColumnarStore()
+    elif args.persistent:
+        store = PersistentStore()
+    else:
+        store = None
+    # Timing every command has a cost, so only users who asked for metrics pay it
+    metrics = Metrics(args.metrics_file, args.metrics_interval) if args.metrics or args.metrics_file else None
+    profiler = Profiler(args.profile, args.profile_sample) if args.profile else None
+    archive = TaskArchive(args.archive_after) if args.archive_after is not None else None
+    scheduler = None
+    if args.remind:
+        reminders = TerminalSink()
+        scheduler = ReminderScheduler([lambda task: reminders.emit(Result("reminder", task=task))])
+    app = TodoApp(journal, store=store, metrics=metrics, profiler=profiler, archive=archive,
+                  scheduler=scheduler)
+    failures = 0
+    try:
+        if archive is not None:
+            app.archive_completed()
+        if args.batch == "-":
+            failures = app.run_batch(sys.stdin, args.stop_on_error)
+        elif args.batch:
+            with open(args.batch, "r", encoding="utf-8") as commands:
+                failures = app.run_batch(commands, args.stop_on_error)
+        elif args.serve:
+            serve(app, args.serve)
+        elif args.daemon:
+            failures = 0 if run_daemon(app, args.daemon) else 1
+        else:
+            app.run()
+    finally:
+        app.close()
+    if failures:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
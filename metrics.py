@@ -0,0 +1,269 @@
+"""
+Command metrics for the Todo App.
+
+Metrics counts every dispatched command, its failures and its latency. Each
+latency goes into a Histogram with HDR-style log-linear buckets: 32 linear
+sub-buckets per power of two, so any percentile is reported to within about
+3% while recording stays a couple of integer operations and one list
+increment. Gauges (task counts and resident memory) are read only when the
+metrics are shown or written, so they cost nothing per command.
+
+The metrics can be shown as a table by the ``stats`` command and written
+periodically to a file in the Prometheus text exposition format. The file
+is replaced atomically, so a scraper never reads a half-written dump.
+"""
+
+import os
+import sys
+import time
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Linear sub-buckets per power of two; 2 ** -SUB_BITS bounds the relative error
+SUB_BITS = 5
+SUB_COUNT = 1 << SUB_BITS
+
+# Bucket boundaries, in seconds, of the histograms in the Prometheus dump
+PROMETHEUS_BOUNDS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                     0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _bucket_bounds(index: int):
+    """Smallest and one-past-largest value a bucket holds."""
+    if index < SUB_COUNT:
+        return index, index + 1
+    shift = (index >> SUB_BITS) - 1
+    lower = (SUB_COUNT + (index & (SUB_COUNT - 1))) << shift
+    return lower, lower + (1 << shift)
+
+
+class Histogram:
+    """Log-linear histogram of non-negative integer values (nanoseconds here)."""
+
+    __slots__ = ("counts", "total", "max")
+
+    def __init__(self):
+        # Enough buckets for any value below 2 ** 64 (about 585 years in ns)
+        self.counts: List[int] = [0] * ((64 - SUB_BITS) << SUB_BITS)
+        self.total = 0
+        self.max = 0
+
+    @property
+    def count(self) -> int:
+        """Number of values recorded."""
+        return sum(self.counts)
+
+    def record(self, value: int):
+        """Add one value."""
+        # Values below SUB_COUNT get a bucket each; above that, each power of
+        # two is split into SUB_COUNT buckets by the bits after the leading one
+        if value < SUB_COUNT:
+            self.counts[value] += 1
+        else:
+            shift = value.bit_length() - SUB_BITS - 1
+            self.counts[((shift + 1) << SUB_BITS) + (value >> shift) - SUB_COUNT] += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction: float) -> int:
+        """
+        Value below which the given fraction of the recorded values fall.
+
+        Args:
+            fraction: Between 0 and 1, e.g. 0.99 for the 99th percentile
+
+        Returns:
+            Upper end of the bucket holding that value, capped at the
+            largest value recorded; 0 if nothing was recorded
+        """
+        count = self.count
+        if not count:
+            return 0
+        wanted = max(1, int(fraction * count + 0.5))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= wanted:
+                return min(_bucket_bounds(index)[1] - 1, self.max)
+        return self.max
+
+    def count_at_most(self, value: int) -> int:
+        """Number of recorded values whose bucket lies entirely at or below value."""
+        total = 0
+        for index, count in enumerate(self.counts):
+            if count and _bucket_bounds(index)[1] - 1 > value:
+                break
+            total += count
+        return total
+
+
+class CommandStats:
+    """Counters and latency histogram for one command."""
+
+    __slots__ = ("errors", "latency")
+
+    def __init__(self):
+        self.errors = 0
+        self.latency = Histogram()
+
+    @property
+    def count(self) -> int:
+        """Number of times the command ran."""
+        return self.latency.count
+
+
+def _resident_bytes() -> Optional[int]:
+    """Current resident set size, or the peak where only that is available."""
+    try:
+        with open("/proc/self/statm", "r") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _format_duration(nanoseconds: int) -> str:
+    if nanoseconds < 1000:
+        return f"{nanoseconds}ns"
+    if nanoseconds < 1000000:
+        return f"{nanoseconds / 1e3:.1f}us"
+    if nanoseconds < 1000000000:
+        return f"{nanoseconds / 1e6:.2f}ms"
+    return f"{nanoseconds / 1e9:.2f}s"
+
+
+class Metrics:
+    """Per-command counters, errors and latency histograms, plus task and memory gauges."""
+
+    def __init__(self, path: Optional[str] = None, interval: float = 15.0):
+        """
+        Args:
+            path: File to write the Prometheus text dump to, if any
+            interval: Minimum seconds between dumps; a dump is written after
+                the first command that finishes once the interval has passed
+        """
+        self.commands: Dict[str, CommandStats] = {}
+        self.path = path
+        self.interval_ns = int(interval * 1e9)
+        self.started = time.time()
+        self._next_dump = time.perf_counter_ns() + self.interval_ns if path else None
+
+    def record(self, command: str, elapsed_ns: int, ok: bool, finished_ns: int, tasks=None):
+        """
+        Count one dispatched command and write a dump if one is due.
+
+        Args:
+            command: Command name
+            elapsed_ns: How long it took, in nanoseconds
+            ok: False if it failed
+            finished_ns: time.perf_counter_ns() when it finished
+            tasks: Task store to read the gauges from for a due dump
+        """
+        stats = self.commands.get(command)
+        if stats is None:
+            stats = self.commands[command] = CommandStats()
+        if not ok:
+            stats.errors += 1
+        # Histogram.record inlined, since this runs for every command
+        latency = stats.latency
+        if elapsed_ns < SUB_COUNT:
+            latency.counts[elapsed_ns] += 1
+        else:
+            shift = elapsed_ns.bit_length() - SUB_BITS - 1
+            latency.counts[((shift + 1) << SUB_BITS) + (elapsed_ns >> shift) - SUB_COUNT] += 1
+        latency.total += elapsed_ns
+        if elapsed_ns > latency.max:
+            latency.max = elapsed_ns
+        if self._next_dump is not None and finished_ns >= self._next_dump:
+            self.dump(tasks)
+            self._next_dump = finished_ns + self.interval_ns
+
+    @staticmethod
+    def gauges(tasks=None) -> Dict[str, Optional[int]]:
+        """Task counts from a TaskStore (omitted without one) and resident memory in bytes."""
+        values: Dict[str, Optional[int]] = {}
+        if tasks is not None:
+            completed = tasks.count(True)
+            values["tasks"] = tasks.count()
+            values["completed"] = completed
+            values["pending"] = values["tasks"] - completed
+        values["memory"] = _resident_bytes()
+        return values
+
+    def render(self, tasks=None) -> str:
+        """Format the gauges and a per-command latency table for the console."""
+        gauges = self.gauges(tasks)
+        lines = ["", "--- Stats ---"]
+        if "tasks" in gauges:
+            lines.append(f"Tasks: {gauges['tasks']} ({gauges['completed']} completed, "
+                         f"{gauges['pending']} pending)")
+        if gauges["memory"] is not None:
+            lines.append(f"Memory: {gauges['memory'] / (1 << 20):.1f} MiB resident")
+        lines.append(f"Uptime: {time.time() - self.started:.0f}s")
+        lines.append(f"{'command':<12} {'count':>8} {'errors':>7} {'p50':>9} {'p90':>9} "
+                     f"{'p99':>9} {'max':>9}")
+        for name in sorted(self.commands):
+            stats = self.commands[name]
+            latency = stats.latency
+            lines.append(f"{name:<12} {stats.count:>8} {stats.errors:>7} "
+                         + " ".join(f"{_format_duration(value):>9}" for value in (
+                             latency.percentile(0.5), latency.percentile(0.9),
+                             latency.percentile(0.99), latency.max)))
+        lines.append("-------------")
+        return "\n".join(lines)
+
+    def prometheus(self, tasks=None) -> str:
+        """Format every metric in the Prometheus text exposition format."""
+        return "".join(self._exposition(tasks))
+
+    def _exposition(self, tasks) -> Iterator[str]:
+        names = sorted(self.commands)
+        yield "# HELP todo_commands_total Commands dispatched.\n"
+        yield "# TYPE todo_commands_total counter\n"
+        for name in names:
+            yield f'todo_commands_total{{command="{name}"}} {self.commands[name].count}\n'
+        yield "# HELP todo_command_errors_total Commands that failed.\n"
+        yield "# TYPE todo_command_errors_total counter\n"
+        for name in names:
+            yield f'todo_command_errors_total{{command="{name}"}} {self.commands[name].errors}\n'
+        yield "# HELP todo_command_duration_seconds Command latency.\n"
+        yield "# TYPE todo_command_duration_seconds histogram\n"
+        for name in names:
+            latency = self.commands[name].latency
+            for bound in PROMETHEUS_BOUNDS:
+                yield (f'todo_command_duration_seconds_bucket{{command="{name}",le="{bound}"}} '
+                       f'{latency.count_at_most(int(bound * 1e9))}\n')
+            yield f'todo_command_duration_seconds_bucket{{command="{name}",le="+Inf"}} {latency.count}\n'
+            yield f'todo_command_duration_seconds_sum{{command="{name}"}} {latency.total / 1e9:.9f}\n'
+            yield f'todo_command_duration_seconds_count{{command="{name}"}} {latency.count}\n'
+        gauges = self.gauges(tasks)
+        if "tasks" in gauges:
+            yield "# HELP todo_tasks Tasks in the list, by status.\n"
+            yield "# TYPE todo_tasks gauge\n"
+            yield f'todo_tasks{{status="completed"}} {gauges["completed"]}\n'
+            yield f'todo_tasks{{status="pending"}} {gauges["pending"]}\n'
+        if gauges["memory"] is not None:
+            yield "# HELP todo_resident_memory_bytes Resident memory of the process.\n"
+            yield "# TYPE todo_resident_memory_bytes gauge\n"
+            yield f"todo_resident_memory_bytes {gauges['memory']}\n"
+        yield "# HELP todo_start_time_seconds Start time of the process since the epoch.\n"
+        yield "# TYPE todo_start_time_seconds gauge\n"
+        yield f"todo_start_time_seconds {self.started:.3f}\n"
+
+    def dump(self, tasks=None):
+        """Atomically replace the dump file with the current metrics, if a path is set."""
+        if not self.path:
+            return
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as stream:
+            stream.write(self.prometheus(tasks))
+        os.replace(temp_path, self.path)
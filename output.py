@@ -0,0 +1,213 @@
+"""
+Structured results and output sinks for the Todo App.
+
+TodoApp operations describe their outcome with small Result and Error
+objects and hand them to a sink. Only the terminal sink turns them into
+text, so embedders that use the null or collecting sink pay no formatting
+or I/O cost.
+"""
+
+import sys
+from typing import Iterator, List, Optional, Tuple
+
+# Error codes mapped to message templates, filled from Error.detail
+ERROR_MESSAGES = {
+    "empty_description": "Task description cannot be empty or whitespace only",
+    "description_too_long": "Task description must be less than 500 characters",
+    "invalid_date": "Invalid date format. Please use YYYY-MM-DD format",
+    "not_found": "Task with ID {task_id} does not exist",
+    "duplicate_id": "Task with ID {task_id} appears more than once",
+    "no_fields": "No fields to update provided",
+    "empty_query": "Search query cannot be empty",
+    "invalid_count": "Count must be a positive number",
+    "file_error": "Cannot access {path}: {reason}",
+    "summary_mismatch": "Running counts disagree with a full scan: {fields}",
+    "nothing_to_undo": "Nothing to undo",
+    "nothing_to_redo": "Nothing to redo",
+    "unknown_snapshot": "Snapshot {snapshot} does not exist",
+    "usage": "{text}",
+}
+
+# Result kinds mapped to message templates, filled from the result's task
+RESULT_MESSAGES = {
+    "added": "Task added successfully: ID {task.id} - {task.description}",
+    "updated": "Task updated successfully: ID {task.id} - {task.description}",
+    "deleted": "Task deleted successfully: ID {task.id} - {task.description}",
+    "marked": "Task marked as {detail}: ID {task.id} - {task.description}",
+    "no_tasks": "No tasks found",
+    "no_match": "No tasks found with the specified filter",
+    "no_results": "No tasks found matching '{detail}'",
+    "exported": "Exported {detail[count]} tasks to {detail[path]} "
+                "in {detail[seconds]:.2f}s ({detail[rate]:,.0f} records/sec)",
+    "imported": "Imported {detail[count]} tasks from {detail[path]} "
+                "in {detail[seconds]:.2f}s ({detail[rate]:,.0f} records/sec); "
+                "{detail[renumbered]} renumbered, {detail[skipped]} invalid lines skipped",
+    "archived": "Archived {detail} completed tasks",
+    "reminder": "Reminder: task {task.id} is due {task.due_date} - {task.description}",
+    "snapshot": "Saved snapshot {detail}",
+    "undone": "Undid the last change ({detail} tasks affected)",
+    "redone": "Redid the change ({detail} tasks affected)",
+    "rolled_back": "Rolled back to snapshot {detail[snapshot]} ({detail[changed]} tasks affected)",
+    "summary": "Tasks: {detail[total]} total, {detail[completed]} completed, {detail[pending]} pending; "
+               "{detail[with_due_date]} with a due date, {detail[overdue]} overdue, "
+               "{detail[due_today]} due today",
+    "message": "{detail}",
+}
+
+
+class Result:
+    """Successful outcome of an operation."""
+
+    __slots__ = ("kind", "task", "tasks", "detail")
+    ok = True
+
+    def __init__(self, kind: str, task=None, tasks: Optional[list] = None, detail=None):
+        self.kind = kind
+        self.task = task
+        self.tasks = tasks
+        self.detail = detail
+
+    def __repr__(self):
+        return f"Result({self.kind!r})"
+
+
+class Error:
+    """Rejected operation, identified by a code and the values for its message."""
+
+    __slots__ = ("code", "detail")
+    ok = False
+    kind = "error"
+
+    def __init__(self, code: str, **detail):
+        self.code = code
+        self.detail = detail
+
+    @property
+    def message(self) -> str:
+        """Human-readable description of the error."""
+        return ERROR_MESSAGES[self.code].format(**self.detail)
+
+    def __repr__(self):
+        return f"Error({self.code!r})"
+
+
+class BatchResult:
+    """Summary of a bulk operation, reported once instead of per task."""
+
+    kind = "batch"
+
+    def __init__(self, operation: str, ids: Optional[List[int]] = None,
+                 errors: Optional[List[Tuple[int, Error]]] = None, detail=None):
+        self.operation = operation
+        self.ids = ids if ids is not None else []
+        self.errors = errors if errors is not None else []
+        self.detail = detail
+
+    @property
+    def ok(self) -> bool:
+        """True if the batch was applied."""
+        return not self.errors
+
+    @property
+    def count(self) -> int:
+        """Number of tasks the batch changed."""
+        return len(self.ids)
+
+    def __repr__(self):
+        if self.errors:
+            return f"BatchResult({self.operation!r}, rejected, errors={len(self.errors)})"
+        return f"BatchResult({self.operation!r}, count={self.count})"
+
+
+class NullSink:
+    """Sink that discards every result."""
+
+    def emit(self, result):
+        pass
+
+
+class CollectingSink:
+    """Sink that keeps every result for later inspection."""
+
+    def __init__(self):
+        self.results: list = []
+
+    def emit(self, result):
+        self.results.append(result)
+
+    def clear(self):
+        """Forget the collected results."""
+        self.results = []
+
+
+class TerminalSink:
+    """Sink that renders results as the familiar console text."""
+
+    def __init__(self, stream=None):
+        """
+        Args:
+            stream: Text stream to write to; defaults to whatever sys.stdout
+                is at the time of each write
+        """
+        self.stream = stream
+
+    def emit(self, result):
+        text = self.render(result)
+        if text:
+            (self.stream or sys.stdout).write(text)
+
+    def render(self, result) -> str:
+        """Format a result exactly as the console shows it."""
+        kind = result.kind
+        if kind == "tasks":
+            return self._render_tasks(result)
+        if kind == "batch":
+            return self._render_batch(result)
+        if kind == "report":
+            return self._render_report(result.detail)
+        if kind == "error":
+            if result.code == "usage":
+                return result.message + "\n"
+            return "Error: " + result.message + "\n"
+        return RESULT_MESSAGES[kind].format(task=result.task, detail=result.detail) + "\n"
+
+    @staticmethod
+    def _render_rows(tasks) -> Iterator[str]:
+        for task in tasks:
+            status = "✓" if task.completed else "○"
+            due_info = f", Due: {task.due_date}" if task.due_date else ""
+            yield f"{task.id}. [{status}] {task.description}{due_info}\n"
+
+    def _render_tasks(self, result: Result) -> str:
+        footer = "-----------------\n\n"
+        if result.detail is not None:
+            footer += f"More tasks follow; continue with --after {result.detail}\n\n"
+        return "\n--- Todo List ---\n" + "".join(self._render_rows(result.tasks)) + footer
+
+    @staticmethod
+    def _render_report(report: dict) -> str:
+        lines = ["", "--- Report ---", "Overdue tasks by week due:"]
+        lines += [f"  {week}  {count:>8}" for week, count in report["overdue_by_week"]] or ["  none"]
+        lines.append("Completion by month created (completed, total):")
+        lines += [f"  {month}  {completed:>8} {total:>8} {completed / total:>7.1%}"
+                  for month, completed, total in report["completion_by_month"]] or ["  none"]
+        lines.append("Tasks by month due (pending, completed):")
+        lines += [f"  {month}  {pending:>8} {completed:>8}"
+                  for month, pending, completed in report["due_by_month"]] or ["  none"]
+        lines.append("--------------")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_batch(batch: BatchResult) -> str:
+        if batch.errors:
+            position, error = batch.errors[0]
+            return (f"Error: Batch rejected, no changes made: {len(batch.errors)} invalid item(s); "
+                    f"first at item {position}: {error.message}\n")
+        if not batch.ids:
+            return ""
+        count = len(batch.ids)
+        if batch.operation == "add":
+            return f"Added {count} tasks: IDs {batch.ids[0]}-{batch.ids[-1]}\n"
+        if batch.operation == "mark":
+            return f"Marked {count} tasks as {batch.detail}\n"
+        return f"{batch.operation.capitalize()}d {count} tasks\n"
@@ -0,0 +1,360 @@
+"""
+Persistent (immutable, structurally shared) task storage.
+
+PMap is a persistent map from non-negative ints to values: a 32-way trie on
+the key bits, most significant first, whose nodes are compressed with a
+bitmap as in a hash array mapped trie. Setting or deleting a key copies only
+the O(log32 n) nodes on the path to it and returns a new map. Every other
+node is shared with the old map, which stays valid and unchanged. Because
+the keys are the ints themselves rather than their hashes, iteration comes
+out in key order and can start at any key.
+
+PersistentStore builds a TaskStore from PMaps. Each version of the task set
+is a StoreVersion. Taking one is O(1), restoring one is O(1), and finding
+the tasks that differ between two versions skips every subtree they share.
+TodoApp uses this for snapshot, undo, redo and rollback.
+"""
+
+from typing import Any, Iterator, List, Optional, Tuple
+
+from indexes import DueDateIndex, matches_query, parse_query, tokenize
+from storage import TaskStore
+from task import Task
+
+BITS = 5
+MASK = (1 << BITS) - 1
+
+_MISSING = object()
+
+
+def _assoc(node, shift: int, key: int, value):
+    """Path-copied node with key set to value, and whether the key is new."""
+    bitmap, children = node if node is not None else (0, ())
+    bit = 1 << ((key >> shift) & MASK)
+    position = (bitmap & (bit - 1)).bit_count()
+    if bitmap & bit:
+        if shift:
+            child, added = _assoc(children[position], shift - BITS, key, value)
+        else:
+            child, added = value, False
+        return (bitmap, children[:position] + (child,) + children[position + 1:]), added
+    child = _assoc(None, shift - BITS, key, value)[0] if shift else value
+    return (bitmap | bit, children[:position] + (child,) + children[position:]), True
+
+
+def _dissoc(node, shift: int, key: int):
+    """Path-copied node without key (None once empty); KeyError if the key is absent."""
+    if node is None:
+        raise KeyError(key)
+    bitmap, children = node
+    bit = 1 << ((key >> shift) & MASK)
+    if not bitmap & bit:
+        raise KeyError(key)
+    position = (bitmap & (bit - 1)).bit_count()
+    child = _dissoc(children[position], shift - BITS, key) if shift else None
+    if child is not None:
+        return bitmap, children[:position] + (child,) + children[position + 1:]
+    if bitmap == bit:
+        return None
+    return bitmap & ~bit, children[:position] + children[position + 1:]
+
+
+def _items(node, shift: int, prefix: int, start: Optional[int]) -> Iterator[Tuple[int, Any]]:
+    """(key, value) pairs under a node in key order, from the first key >= start."""
+    bitmap, children = node
+    first = 0 if start is None else (start >> shift) & MASK
+    position = 0
+    for index in range(32):
+        bit = 1 << index
+        if not bitmap & bit:
+            continue
+        child = children[position]
+        position += 1
+        if index < first:
+            continue
+        key = prefix | index << shift
+        if not shift:
+            yield key, child
+        else:
+            # Only the child on the start key's path needs the bound
+            yield from _items(child, shift - BITS, key, start if index == first else None)
+
+
+def _diff(old, new, shift: int, prefix: int) -> Iterator[int]:
+    """Keys whose value differs (by identity) between two nodes at the same level."""
+    if old is new:
+        return
+    old_bitmap, old_children = old if old is not None else (0, ())
+    new_bitmap, new_children = new if new is not None else (0, ())
+    for index in range(32):
+        bit = 1 << index
+        if not (old_bitmap | new_bitmap) & bit:
+            continue
+        old_child = (old_children[(old_bitmap & (bit - 1)).bit_count()] if old_bitmap & bit
+                     else _MISSING)
+        new_child = (new_children[(new_bitmap & (bit - 1)).bit_count()] if new_bitmap & bit
+                     else _MISSING)
+        key = prefix | index << shift
+        if not shift:
+            if old_child is not new_child:
+                yield key
+        else:
+            yield from _diff(None if old_child is _MISSING else old_child,
+                             None if new_child is _MISSING else new_child, shift - BITS, key)
+
+
+class PMap:
+    """Persistent map from non-negative ints to values, iterated in key order."""
+
+    __slots__ = ("_root", "_shift", "_len")
+
+    def __init__(self, _root=None, _shift: int = 0, _len: int = 0):
+        self._root = _root
+        self._shift = _shift
+        self._len = _len
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[int]:
+        return (key for key, _ in self.items())
+
+    def get(self, key: int, default=None):
+        """The value stored under key, or default."""
+        node, shift = self._root, self._shift
+        if node is None or not isinstance(key, int) or key < 0 or key >> shift >> BITS:
+            return default
+        while True:
+            bitmap, children = node
+            bit = 1 << ((key >> shift) & MASK)
+            if not bitmap & bit:
+                return default
+            node = children[(bitmap & (bit - 1)).bit_count()]
+            if not shift:
+                return node
+            shift -= BITS
+
+    def set(self, key: int, value) -> "PMap":
+        """A new map with key set to value."""
+        if key < 0:
+            raise ValueError("PMap keys must be non-negative")
+        root, shift = self._root, self._shift
+        if root is None:
+            shift = 0
+        # Grow the trie upwards until the key fits; every existing key is
+        # below the old capacity, so the old root becomes child 0
+        while key >> shift >> BITS:
+            shift += BITS
+            if root is not None:
+                root = (1, (root,))
+        root, added = _assoc(root, shift, key, value)
+        return PMap(root, shift, self._len + added)
+
+    def delete(self, key: int) -> "PMap":
+        """A new map without key; KeyError if it is absent."""
+        if self._root is None or key < 0 or key >> self._shift >> BITS:
+            raise KeyError(key)
+        root = _dissoc(self._root, self._shift, key)
+        return PMap(root, self._shift if root is not None else 0, self._len - 1)
+
+    def items(self, start: Optional[int] = None) -> Iterator[Tuple[int, Any]]:
+        """(key, value) pairs in key order, from the first key >= start."""
+        if self._root is None:
+            return iter(())
+        if start is not None and start >> self._shift >> BITS:
+            return iter(())
+        return _items(self._root, self._shift, 0, start if start else None)
+
+    def keys(self, start: Optional[int] = None) -> Iterator[int]:
+        """Keys in order, from the first key >= start."""
+        return (key for key, _ in self.items(start))
+
+    def changed_keys(self, other: "PMap") -> Iterator[int]:
+        """
+        Keys whose values differ between this map and other, in key order.
+
+        Subtrees the two maps share are skipped, so the cost is proportional
+        to the number of changes, not to the size of the maps.
+        """
+        old, new = self._root, other._root
+        shift = max(self._shift, other._shift)
+        # Bring both roots to the same height, as set() would have
+        for _ in range((shift - self._shift) // BITS):
+            old = (1, (old,)) if old is not None else None
+        for _ in range((shift - other._shift) // BITS):
+            new = (1, (new,)) if new is not None else None
+        return _diff(old, new, shift, 0)
+
+
+class StoreVersion:
+    """One immutable version of a PersistentStore's contents."""
+
+    __slots__ = ("tasks", "pending", "completed", "due", "max_id")
+
+    def __init__(self, tasks: PMap, pending: PMap, completed: PMap, due: PMap, max_id: int):
+        self.tasks = tasks
+        self.pending = pending
+        self.completed = completed
+        self.due = due
+        self.max_id = max_id
+
+
+class PersistentStore(TaskStore):
+    """
+    Tasks in persistent maps, so every version of the task set stays available.
+
+    Tasks are handed out as copies (the stored ones are shared between
+    versions and must never change). Searches scan every task, as there is
+    no persistent text index.
+    """
+
+    def __init__(self):
+        empty = PMap()
+        self.version = StoreVersion(empty, empty, empty, empty, 0)
+
+    def restore(self, version: StoreVersion):
+        """Make an earlier (or later) version current again."""
+        self.version = StoreVersion(version.tasks, version.pending, version.completed, version.due,
+                                    max(version.max_id, self.version.max_id))
+
+    @staticmethod
+    def changed_ids(old: StoreVersion, new: StoreVersion) -> Iterator[int]:
+        """Ids of the tasks added, removed or changed between two versions, in id order."""
+        return old.tasks.changed_keys(new.tasks)
+
+    @staticmethod
+    def task_in(version: StoreVersion, task_id: int) -> Optional[Task]:
+        """A copy of a task as it was in a version, or None if it did not exist."""
+        task = version.tasks.get(task_id)
+        return task.copy() if task is not None else None
+
+    def __getitem__(self, task_id: int) -> Task:
+        task = self.version.tasks.get(task_id)
+        if task is None:
+            raise KeyError(task_id)
+        return task.copy()
+
+    def __contains__(self, task_id) -> bool:
+        return task_id in self.version.tasks
+
+    def __len__(self) -> int:
+        return len(self.version.tasks)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.version.tasks)
+
+    def get(self, task_id: int, default=None):
+        task = self.version.tasks.get(task_id)
+        return task.copy() if task is not None else default
+
+    def values(self) -> Iterator[Task]:
+        return (task.copy() for _, task in self.version.tasks.items())
+
+    def _put(self, task: Task, pending: PMap, completed: PMap, due: PMap):
+        """Publish a new version holding a private copy of task."""
+        current = self.version
+        self.version = StoreVersion(current.tasks.set(task.id, task.copy()), pending, completed, due,
+                                    max(current.max_id, task.id))
+
+    def insert(self, task: Task):
+        current = self.version
+        if task.id in current.tasks:
+            raise ValueError(f"Task {task.id} is already stored")
+        pending, completed, due = current.pending, current.completed, current.due
+        if task.completed:
+            completed = completed.set(task.id, True)
+        else:
+            pending = pending.set(task.id, True)
+        if task.due_ordinal is not None:
+            due = due.set(task.due_ordinal << DueDateIndex.ID_BITS | task.id, True)
+        self._put(task, pending, completed, due)
+
+    def remove(self, task_id: int) -> Task:
+        current = self.version
+        task = current.tasks.get(task_id)
+        if task is None:
+            raise KeyError(task_id)
+        pending, completed, due = current.pending, current.completed, current.due
+        if task.completed:
+            completed = completed.delete(task_id)
+        else:
+            pending = pending.delete(task_id)
+        if task.due_ordinal is not None:
+            due = due.delete(task.due_ordinal << DueDateIndex.ID_BITS | task_id)
+        self.version = StoreVersion(current.tasks.delete(task_id), pending, completed, due, current.max_id)
+        return task.copy()
+
+    def set_completed(self, task: Task, completed: bool):
+        current = self.version
+        was_completed = current.tasks.get(task.id).completed
+        pending, done = current.pending, current.completed
+        if was_completed != completed:
+            if completed:
+                pending, done = pending.delete(task.id), done.set(task.id, True)
+            else:
+                pending, done = pending.set(task.id, True), done.delete(task.id)
+        task.completed = completed
+        self._put(task, pending, done, current.due)
+
+    def set_description(self, task: Task, description: str):
+        current = self.version
+        task.description = description
+        self._put(task, current.pending, current.completed, current.due)
+
+    def set_due_date(self, task: Task, due_ordinal: Optional[int]):
+        current = self.version
+        due = current.due
+        old_ordinal = current.tasks.get(task.id).due_ordinal
+        if old_ordinal is not None:
+            due = due.delete(old_ordinal << DueDateIndex.ID_BITS | task.id)
+        if due_ordinal is not None:
+            due = due.set(due_ordinal << DueDateIndex.ID_BITS | task.id, True)
+        task.due_ordinal = due_ordinal
+        self._put(task, current.pending, current.completed, due)
+
+    def iter_status(self, completed: Optional[bool], start: Optional[int] = None) -> Iterator[Task]:
+        version = self.version
+        if completed is None:
+            return (task.copy() for _, task in version.tasks.items(start))
+        ids = (version.completed if completed else version.pending).keys(start)
+        tasks = version.tasks
+        return (tasks.get(task_id).copy() for task_id in ids)
+
+    def iter_due(self, start: Optional[int], end: Optional[int], inclusive: bool = True,
+                 pending_only: bool = False) -> Iterator[Task]:
+        # Reads one version throughout, so concurrent changes never show up halfway
+        version = self.version
+        bits, mask = DueDateIndex.ID_BITS, DueDateIndex.ID_MASK
+        first = None if start is None else start << bits
+        if end is None:
+            limit = None
+        else:
+            limit = (end + 1) << bits if inclusive else end << bits
+        for key in version.due.keys(first):
+            if limit is not None and key >= limit:
+                return
+            task = version.tasks.get(key & mask)
+            if not (pending_only and task.completed):
+                yield task.copy()
+
+    def search(self, query: str) -> List[Task]:
+        terms, prefixes = parse_query(query)
+        if not terms and not prefixes:
+            return []
+        found = []
+        for _, task in self.version.tasks.items():
+            if matches_query(tokenize(task.description), terms, prefixes):
+                found.append(task.copy())
+        return found
+
+    def count(self, completed: Optional[bool] = None) -> int:
+        version = self.version
+        if completed is None:
+            return len(version.tasks)
+        return len(version.completed if completed else version.pending)
+
+    def max_id(self) -> int:
+        return self.version.max_id
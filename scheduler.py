@@ -0,0 +1,195 @@
+"""
+Due-date reminders for the Todo App.
+
+ReminderScheduler keeps the IDs of pending tasks with a due date in a
+hierarchical timing wheel (TimingWheel) keyed by due-day ordinal, and
+TodoApp keeps it in step with every change through its primitives, so
+checking for reminders never looks at the task list. A reminder fires once,
+on the first check on or after the day a task is due; changing the task's
+due date or reopening it schedules it again, while other changes (or an
+undo that leaves the due date as it was) do not.
+
+The wheel has four levels of 64 slots. Level 0 holds the tasks due in the
+current 64-day block, one slot per day; level L holds tasks due in later
+64**L-day blocks that share the same 64**(L+1)-day block as today, one slot
+per block. Scheduling and cancelling are O(1) dictionary operations.
+Advancing to a day fires its level-0 slot, and on block boundaries first
+spreads the slot of the block being entered over the levels below; each
+task moves down at most three times before it fires.
+
+TodoApp.run checks for reminders before every prompt; the HTTP server and
+the daemon check periodically (check_periodically).
+"""
+
+import asyncio
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from dates import today_ordinal
+
+BITS = 6
+MASK = (1 << BITS) - 1
+# 64**4 days, beyond the last ordinal datetime.date supports
+LEVELS = 4
+
+
+class TimingWheel:
+    """Task IDs keyed by due-day ordinal, fired in order as the current day advances."""
+
+    def __init__(self, current: int):
+        """
+        Args:
+            current: Day ordinal the wheel starts at; tasks due on or before
+                it fire at the next advance
+        """
+        self.current = current
+        self._levels: List[List[Dict[int, int]]] = [[{} for _ in range(MASK + 1)] for _ in range(LEVELS)]
+        # Due on or before the current day, waiting for the next advance
+        self._expired: Dict[int, int] = {}
+        # Task ID -> the bucket (slot) holding it, for O(1) cancel
+        self._where: Dict[int, Dict[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, task_id) -> bool:
+        return task_id in self._where
+
+    def schedule(self, task_id: int, ordinal: int):
+        """Schedule a task for a day, replacing any earlier schedule of it."""
+        where = self._where
+        bucket = where.get(task_id)
+        if bucket is not None:
+            del bucket[task_id]
+        bucket = self._bucket(ordinal)
+        bucket[task_id] = ordinal
+        where[task_id] = bucket
+
+    def cancel(self, task_id: int) -> bool:
+        """Unschedule a task; False if it was not scheduled."""
+        bucket = self._where.pop(task_id, None)
+        if bucket is None:
+            return False
+        del bucket[task_id]
+        return True
+
+    def _bucket(self, ordinal: int) -> Dict[int, int]:
+        current = self.current
+        if ordinal <= current:
+            return self._expired
+        # The highest bit where the two days differ picks the level
+        level = ((ordinal ^ current).bit_length() - 1) // BITS
+        return self._levels[level][(ordinal >> (level * BITS)) & MASK]
+
+    def _next_event(self) -> Optional[int]:
+        """The next day that fires a level-0 slot or enters a non-empty block, if any."""
+        current = self.current
+        # Lower levels hold earlier days, so the first non-empty slot ahead
+        # of the current day, searching upwards, is the next event
+        for level in range(LEVELS):
+            shift = level * BITS
+            slots = self._levels[level]
+            for index in range(((current >> shift) & MASK) + 1, MASK + 1):
+                if slots[index]:
+                    return (current >> (shift + BITS) << (shift + BITS)) | (index << shift)
+        return None
+
+    def advance(self, today: int) -> List[Tuple[int, int]]:
+        """
+        Move the current day forward and take out every task now due.
+
+        Args:
+            today: New current day ordinal; earlier days are ignored
+
+        Returns:
+            (task ID, due ordinal) pairs of the fired tasks, earliest first
+        """
+        fired = []
+        levels, where = self._levels, self._where
+        while True:
+            day = self._next_event()
+            if day is None or day > today:
+                self.current = max(self.current, today)
+                break
+            self.current = day
+            # Entering a new block at some level: spread its slot downwards,
+            # highest level first, so the levels below are filled in turn.
+            # Empty days and blocks in between are skipped
+            for level in range(LEVELS - 1, 0, -1):
+                shift = level * BITS
+                if day & ((1 << shift) - 1):
+                    continue
+                bucket = levels[level][(day >> shift) & MASK]
+                if bucket:
+                    entries = list(bucket.items())
+                    bucket.clear()
+                    for task_id, ordinal in entries:
+                        target = self._bucket(ordinal)
+                        target[task_id] = ordinal
+                        where[task_id] = target
+            bucket = levels[0][day & MASK]
+            if bucket:
+                fired.extend(bucket.items())
+                for task_id in bucket:
+                    del where[task_id]
+                bucket.clear()
+        expired = self._expired
+        if expired:
+            fired.extend(expired.items())
+            for task_id in expired:
+                del where[task_id]
+            expired.clear()
+            fired.sort(key=itemgetter(1))
+        return fired
+
+
+class ReminderScheduler:
+    """Fires callbacks for tasks as they become due."""
+
+    def __init__(self, callbacks: Iterable[Callable] = (), clock: Callable[[], int] = today_ordinal):
+        """
+        Args:
+            callbacks: Called with each Task as it becomes due
+            clock: Returns the current day ordinal; replace it to simulate time
+        """
+        self.callbacks: List[Callable] = list(callbacks)
+        self.clock = clock
+        self.wheel = TimingWheel(clock())
+        # Task ID -> due ordinal it was reminded for, until it is completed,
+        # deleted or given another due date
+        self._reminded: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.wheel)
+
+    def track(self, task):
+        """Schedule a task's reminder for its due date, or drop it if it is completed or undated."""
+        if task.completed or task.due_ordinal is None:
+            self.cancel(task.id)
+        elif self._reminded.get(task.id) != task.due_ordinal:
+            self._reminded.pop(task.id, None)
+            self.wheel.schedule(task.id, task.due_ordinal)
+
+    def cancel(self, task_id: int):
+        """Drop a task's reminder, e.g. because the task was deleted."""
+        self.wheel.cancel(task_id)
+        self._reminded.pop(task_id, None)
+
+    def due(self, today: Optional[int] = None) -> List[int]:
+        """
+        IDs of the tasks due since the last check, earliest first; they are
+        not returned again unless rescheduled.
+
+        Args:
+            today: Day ordinal to check up to (defaults to the clock)
+        """
+        fired = self.wheel.advance(self.clock() if today is None else today)
+        self._reminded.update(fired)
+        return [task_id for task_id, _ in fired]
+
+
+async def check_periodically(app, interval: float = 60.0):
+    """Check a TodoApp's reminders every interval seconds until cancelled."""
+    while True:
+        app.check_reminders()
+        await asyncio.sleep(interval)
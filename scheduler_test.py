@@ -0,0 +1,195 @@
+"""
+Simulated-clock test for the reminder scheduler.
+
+A TodoApp with a ReminderScheduler on a simulated clock gets N tasks due
+over the next few years, then a tenth of them are completed, deleted or
+moved to another due date. The clock then advances day by day (and, in a
+second run, in jumps of varying length) with check_reminders after each
+step. Every reminder is checked against the final due dates: each
+surviving pending task must be reminded exactly once, on the step that
+reaches its due date. A randomized run of the bare TimingWheel against a
+dictionary model covers cancelling, rescheduling and block boundaries, and
+a short scripted run checks that changes leaving the due date alone do not
+remind a task again.
+
+Usage: python scheduler_test.py [--tasks N] [--days D]
+"""
+import argparse
+import random
+import sys
+import time
+from bisect import bisect_left
+
+from dates import format_date, parse_date
+from main import TodoApp
+from output import NullSink
+from persistent import PersistentStore
+from scheduler import ReminderScheduler, TimingWheel
+
+START = parse_date("2025-01-01")
+
+
+def check_wheel(rounds, failures):
+    """Drive a bare TimingWheel with random operations and compare it with a dict."""
+    rng = random.Random(7)
+    wheel = TimingWheel(START)
+    model = {}
+    for _ in range(rounds):
+        if wheel.current > START + 2000000:
+            # Start over before running past the last day a date can have
+            wheel, model = TimingWheel(START), {}
+        roll = rng.random()
+        task_id = rng.randrange(5000)
+        if roll < 0.6:
+            # Mostly near days, sometimes far enough to land on the top levels
+            reach = rng.choice((70, 5000, 300000))
+            ordinal = wheel.current + rng.randrange(-10, reach)
+            wheel.schedule(task_id, ordinal)
+            model[task_id] = ordinal
+        elif roll < 0.8:
+            if wheel.cancel(task_id) != (model.pop(task_id, None) is not None):
+                failures.append(f"cancel of {task_id} disagrees with the model")
+        else:
+            today = wheel.current + rng.choice((1, 1, 3, 64, 700, 5000, 300000))
+            expected = sorted((ordinal, task_id) for task_id, ordinal in model.items() if ordinal <= today)
+            fired = sorted((ordinal, task_id) for task_id, ordinal in wheel.advance(today))
+            if fired != expected:
+                failures.append(f"advance to {format_date(today)} fired {len(fired)} tasks, "
+                                f"expected {len(expected)}")
+                return
+            for _, task_id in fired:
+                del model[task_id]
+        if len(wheel) != len(model):
+            failures.append("wheel size disagrees with the model")
+            return
+
+
+def check_repeats(failures):
+    """Remind a few tasks, then change them in ways that must or must not remind them again."""
+    clock = [START]
+    reminded = []
+    scheduler = ReminderScheduler([lambda task: reminded.append(task.id)], clock=lambda: clock[0])
+    app = TodoApp(sink=NullSink(), store=PersistentStore(), scheduler=scheduler)
+    app.add_tasks([(f"Task {i}", format_date(START + 1)) for i in range(4)])
+    clock[0] = START + 1
+    app.check_reminders()
+    # Task 1 keeps its date; 2 is reopened; 3 gets a new date; 4 is untouched
+    app.update_task(1, "Renamed")
+    app.mark_task_complete(1, False)
+    app.undo()
+    app.redo()
+    app.mark_task_complete(2, True)
+    app.mark_task_complete(2, False)
+    app.update_task(3, None, format_date(START + 2))
+    clock[0] = START + 2
+    app.check_reminders()
+    if reminded != [1, 2, 3, 4, 2, 3]:
+        failures.append(f"reminders {reminded}, expected [1, 2, 3, 4, 2, 3]")
+
+
+def run(count, days, steps, failures):
+    """
+    Schedule count tasks, change some, and advance the clock through steps.
+
+    Returns:
+        Dictionary of timings in seconds
+    """
+    clock = [START]
+    reminded = {}
+    scheduler = ReminderScheduler([lambda task: reminded.setdefault(task.id, []).append(clock[0])],
+                                  clock=lambda: clock[0])
+    app = TodoApp(sink=NullSink(), scheduler=scheduler)
+    rng = random.Random(count)
+    due = [START + 1 + rng.randrange(days) for _ in range(count)]
+    timings = {}
+
+    started = time.perf_counter()
+    chunk = 100000
+    for first in range(0, count, chunk):
+        app.add_tasks([(f"Task number {i}", format_date(due[i])) for i in range(first, min(count, first + chunk))])
+    timings["schedule"] = time.perf_counter() - started
+    if len(scheduler) != count:
+        failures.append(f"{len(scheduler)} tasks scheduled, expected {count}")
+
+    # Task i has ID i + 1; expected maps surviving pending IDs to due ordinals
+    expected = {i + 1: ordinal for i, ordinal in enumerate(due)}
+    changed = rng.sample(range(1, count + 1), count // 10)
+    started = time.perf_counter()
+    for number, task_id in enumerate(changed):
+        kind = number % 4
+        if kind == 0:
+            app.mark_task_complete(task_id, True)
+            del expected[task_id]
+        elif kind == 1:
+            app.delete_task(task_id)
+            del expected[task_id]
+        elif kind == 2:
+            ordinal = START + 1 + rng.randrange(days)
+            app.update_task(task_id, None, format_date(ordinal))
+            expected[task_id] = ordinal
+        else:
+            # Completed and reopened: scheduled again for the same day
+            app.mark_task_complete(task_id, True)
+            app.mark_task_complete(task_id, False)
+    timings["change"] = time.perf_counter() - started
+    if len(scheduler) != len(expected):
+        failures.append(f"{len(scheduler)} tasks scheduled after changes, expected {len(expected)}")
+
+    started = time.perf_counter()
+    for today in steps:
+        clock[0] = today
+        app.check_reminders()
+    timings["advance"] = time.perf_counter() - started
+    timings["steps"] = len(steps)
+
+    if set(reminded) != set(expected):
+        failures.append(f"{len(reminded)} tasks reminded, expected {len(expected)}")
+    for task_id, when in reminded.items():
+        if len(when) != 1:
+            failures.append(f"task {task_id} reminded {len(when)} times")
+            break
+        ordinal = expected.get(task_id)
+        if ordinal is None:
+            failures.append(f"task {task_id} reminded but completed or deleted")
+            break
+        # Reminded on the first step at or after the due date
+        if when[0] != steps[bisect_left(steps, ordinal)]:
+            failures.append(f"task {task_id} due {format_date(ordinal)} reminded on {format_date(when[0])}")
+            break
+    if len(scheduler):
+        failures.append(f"{len(scheduler)} tasks left scheduled after the last step")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reminder scheduler simulated-clock test")
+    parser.add_argument("--tasks", type=int, default=1000000, help="number of tasks to schedule")
+    parser.add_argument("--days", type=int, default=1000, help="days the due dates are spread over")
+    args = parser.parse_args()
+
+    failures = []
+    check_wheel(200000, failures)
+    print(f"{'wheel model':<12} {failures[0] if failures else 'ok'}")
+    errors = []
+    check_repeats(errors)
+    failures.extend(errors)
+    print(f"{'repeats':<12} {errors[0] if errors else 'ok'}")
+
+    rng = random.Random(1)
+    jumps, today = [], START
+    while today < START + args.days:
+        today += rng.choice((1, 2, 7, 30, 90))
+        jumps.append(today)
+    print(f"\n{'clock':<8} {'steps':>6} {'add/s':>11} {'change/s':>10} {'ms/step':>8}  result")
+    for name, steps in (("daily", [START + day for day in range(1, args.days + 1)]), ("jumps", jumps)):
+        errors = []
+        timings = run(args.tasks, args.days, steps, errors)
+        failures.extend(errors)
+        print(f"{name:<8} {timings['steps']:>6} {args.tasks / timings['schedule']:>11,.0f} "
+              f"{args.tasks // 10 / timings['change']:>10,.0f} "
+              f"{timings['advance'] / timings['steps'] * 1000:>8.2f}  {errors[0] if errors else 'ok'}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Asyncio JSON-over-HTTP front end for the Todo App.
+
+A single event loop serves every connection against one shared TodoApp.
+Connections are kept alive between requests, and each request runs to
+completion without awaiting, so handlers never interleave and the app needs
+no locking. Endpoints:
+
+    GET    /tasks?filter=&limit=&offset=&after=&sort=   view tasks
+           (due filters take date=, start=/end= or count=;
+           archived=1 includes archived tasks)
+    GET    /tasks/<id>                                   one task, even if archived
+    GET    /search?q=<terms>                             search descriptions
+    GET    /summary?date=&verify=1                       task counts
+    GET    /report?date=                                 report aggregates
+    POST   /tasks              {"description", "due_date"}   add a task
+    PATCH  /tasks/<id>         {"description", "due_date"}   update a task
+    DELETE /tasks/<id>                                   delete a task
+    POST   /tasks/<id>/complete     {"completed": true}     mark complete
+    POST   /tasks/<id>/incomplete                        mark incomplete
+"""
+
+import asyncio
+import json
+from http import HTTPStatus
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from output import CollectingSink
+from scheduler import check_periodically
+
+MAX_BODY = 1 << 20
+
+
+class HTTPError(Exception):
+    """Request that cannot be served, carrying the HTTP status to send."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class TodoServer:
+    """HTTP/1.1 keep-alive server exposing a TodoApp as JSON endpoints."""
+
+    def __init__(self, app, host: str = "127.0.0.1", port: int = 8080):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.sink = CollectingSink()
+        app.sink = self.sink
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        """Start listening; returns once the socket is bound."""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                  backlog=4096)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        """Start listening and serve until cancelled."""
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """Stop accepting connections."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                keep_alive = True
+                try:
+                    method, target, headers, keep_alive = self._parse_head(head)
+                    length = int(headers.get("content-length", "0") or 0)
+                    if length < 0 or length > MAX_BODY:
+                        raise HTTPError(413, "Request body too large")
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = self.dispatch(method, target, body)
+                except HTTPError as exc:
+                    status, payload = exc.status, {"ok": False, "error": "http", "message": exc.message}
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as exc:  # keep serving other requests
+                    status, payload = 500, {"ok": False, "error": "internal", "message": str(exc)}
+                writer.write(self._response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _parse_head(head: bytes) -> Tuple[str, str, dict, bool]:
+        """Split a request head into method, target, headers and keep-alive flag."""
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.0":
+            keep_alive = connection == "keep-alive"
+        else:
+            keep_alive = connection != "close"
+        return method.upper(), target, headers, keep_alive
+
+    @staticmethod
+    def _response(status: int, payload: dict, keep_alive: bool) -> bytes:
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        reason = HTTPStatus(status).phrase
+        head = (f"HTTP/1.1 {status} {reason}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        return head.encode("latin-1") + body
+
+    def dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, dict]:
+        """
+        Route one request to the app.
+
+        Returns:
+            HTTP status and the JSON payload to send back
+        """
+        url = urlsplit(target)
+        parts = [part for part in url.path.split("/") if part]
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        app = self.app
+        self.sink.clear()
+
+        if parts == ["tasks"]:
+            if method == "GET":
+                return self._view(query)
+            if method == "POST":
+                data = self._json(body)
+                task = app.add_task(self._field(data, "description") or "", self._field(data, "due_date"))
+                return self._outcome(201, task=task)
+        elif parts == ["summary"] and method == "GET":
+            counts = app.summary(query.get("date"), query.get("verify") in ("1", "true"))
+            status, payload = self._outcome(200)
+            if counts is not None:
+                payload["summary"] = counts
+            return status, payload
+        elif parts == ["report"] and method == "GET":
+            aggregates = app.report(query.get("date"))
+            status, payload = self._outcome(200)
+            if aggregates is not None:
+                payload["report"] = aggregates
+            return status, payload
+        elif parts == ["search"] and method == "GET":
+            tasks = app.search(query.get("q", ""))
+            return self._outcome(200, tasks=tasks)
+        elif len(parts) >= 2 and parts[0] == "tasks":
+            task_id = self._task_id(parts[1])
+            if len(parts) == 2:
+                if method == "GET":
+                    task = app.get_task(task_id)
+                    if task is None:
+                        return 404, {"ok": False, "error": "not_found",
+                                     "message": f"Task with ID {task_id} does not exist"}
+                    return 200, {"ok": True, "task": task.to_dict()}
+                if method == "PATCH":
+                    data = self._json(body)
+                    app.update_task(task_id, self._field(data, "description"), self._field(data, "due_date"))
+                    return self._outcome(200, task=app.tasks.get(task_id))
+                if method == "DELETE":
+                    app.delete_task(task_id)
+                    return self._outcome(200)
+            elif len(parts) == 3 and method == "POST" and parts[2] in ("complete", "incomplete"):
+                completed = parts[2] == "complete"
+                if completed and body:
+                    completed = bool(self._json(body).get("completed", True))
+                app.mark_task_complete(task_id, completed)
+                return self._outcome(200, task=app.tasks.get(task_id))
+            else:
+                raise HTTPError(404, "Unknown endpoint")
+        else:
+            raise HTTPError(404, "Unknown endpoint")
+        raise HTTPError(405, "Method not allowed")
+
+    def _view(self, query: dict) -> Tuple[int, dict]:
+        filter_status = query.get("filter")
+        if filter_status and filter_status not in self.app.VIEW_FILTERS:
+            raise HTTPError(400, "Unknown filter")
+        filter_args = [query[name] for name in ("date", "start", "end", "count") if name in query]
+        arg_usage = self.app.VIEW_FILTERS.get(filter_status, "")
+        if len(filter_args) < len(arg_usage.split()):
+            raise HTTPError(400, f"Filter {filter_status} needs {arg_usage}")
+        options = {}
+        for name in ("limit", "offset", "after"):
+            if name in query:
+                if not query[name].isdigit():
+                    raise HTTPError(400, f"{name} must be a non-negative number")
+                options[name] = int(query[name])
+        if "sort" in query:
+            options["sort"] = query["sort"]
+        if query.get("archived") in ("1", "true"):
+            options["include_archived"] = True
+        tasks = self.app.view_tasks(filter_status, *filter_args, **options)
+        status, payload = self._outcome(200, tasks=tasks)
+        if payload["ok"]:
+            shown = [result for result in self.sink.results if result.kind == "tasks"]
+            payload["next_after"] = shown[-1].detail if shown else None
+        return status, payload
+
+    def _outcome(self, status: int, task=None, tasks=None) -> Tuple[int, dict]:
+        """Turn the collected result of an app call into a response."""
+        for result in self.sink.results:
+            if not result.ok:
+                error_status = 404 if result.code == "not_found" else 400
+                return error_status, {"ok": False, "error": result.code, "message": result.message}
+        payload = {"ok": True}
+        if task is not None:
+            payload["task"] = task.to_dict()
+        if tasks is not None:
+            payload["tasks"] = [item.to_dict() for item in tasks]
+        return status, payload
+
+    @staticmethod
+    def _json(body: bytes) -> dict:
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "Request body must be JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "Request body must be a JSON object")
+        return data
+
+    @staticmethod
+    def _field(data: dict, name: str) -> Optional[str]:
+        value = data.get(name)
+        if value is not None and not isinstance(value, str):
+            raise HTTPError(400, f"{name} must be a string")
+        return value
+
+    @staticmethod
+    def _task_id(text: str) -> int:
+        if not text.isdigit():
+            raise HTTPError(400, "Task ID must be a number")
+        return int(text)
+
+
+def serve(app, address: str):
+    """
+    Serve a TodoApp over HTTP until interrupted.
+
+    Args:
+        app: TodoApp to expose
+        address: "PORT" or "HOST:PORT"
+    """
+    host, _, port = address.rpartition(":")
+    server = TodoServer(app, host or "127.0.0.1", int(port))
+
+    async def run():
+        await server.start()
+        print(f"Serving Todo App on http://{server.host}:{server.port}")
+        if app.scheduler is not None:
+            # Kept referenced: the event loop only holds tasks weakly
+            reminders = asyncio.create_task(check_periodically(app))
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("\nGoodbye!")
@@ -0,0 +1,397 @@
+"""
+Process-sharded Todo App.
+
+ShardedTodoApp partitions tasks by id across worker processes, each owning
+an ordinary TodoApp. The coordinator allocates ids and routes single-task
+commands to the owning shard (``task_id % shards``). Views, searches and
+due-date queries fan out to every shard at once and the sorted partial
+results are merged, so filtering and sorting large task lists use as many
+cores as there are shards.
+
+Tasks returned by the coordinator are copies sent back by the workers.
+"""
+
+import heapq
+import multiprocessing
+import time
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from analytics import TaskColumns
+from dates import parse_date, today_ordinal
+from indexes import TaskAggregates
+from main import TodoApp
+from output import BatchResult, CollectingSink, Error, Result
+from task import Task
+
+
+class _Shard:
+    """The worker side: one TodoApp plus the requests the coordinator sends it."""
+
+    def __init__(self):
+        self.sink = CollectingSink()
+        self.app = TodoApp(sink=self.sink)
+
+    def call(self, method: str, *args):
+        """Run a TodoApp operation and return its value with the results it emitted."""
+        self.sink.clear()
+        return getattr(self.app, method)(*args), self.sink.results
+
+    def add(self, task_id: int, description: str, due_date: Optional[str]):
+        self.app.next_id = task_id
+        return self.call("add_task", description, due_date)
+
+    def insert(self, rows: List[Tuple[int, str, Optional[str], int]]):
+        inserted = []
+        try:
+            with self.app.tasks.transaction():
+                for task_id, description, due_date, created_ts in rows:
+                    self.app._insert_task(Task(task_id, description, False, due_date, created_ts))
+                    inserted.append(task_id)
+        except Exception:
+            self.discard(inserted)
+            raise
+
+    def discard(self, task_ids: List[int]):
+        """Take back the rows of an insert whose batch failed."""
+        with self.app.tasks.transaction():
+            for task_id in task_ids:
+                self.app._remove_task(task_id)
+
+    def get(self, task_id: int) -> Optional[Task]:
+        return self.app.tasks.get(task_id)
+
+    def tasks(self) -> List[Task]:
+        """Every task of this shard in ID order, for exports."""
+        return list(self.app._all_tasks())
+
+    def page(self, filter_status: Optional[str], filter_args: Tuple[str, ...], sort: str,
+             after_key, id_cursor: Optional[int], count: Optional[int]) -> List[Task]:
+        """This shard's first count matching tasks in sort order, after a cursor key."""
+        app = self.app
+        candidates = app._iter_filter(filter_status, filter_args, id_cursor)
+        key = app._sort_key(sort)
+        if after_key is not None:
+            candidates = (task for task in candidates if key(task) > after_key)
+        natural = "due" if filter_status in app.DUE_FILTERS else "id"
+        if sort == natural:
+            return list(islice(candidates, count))
+        if count is None:
+            return sorted(candidates, key=key)
+        return heapq.nsmallest(count, candidates, key=key)
+
+    def due(self, start: Optional[int], end: Optional[int], inclusive: bool, pending_only: bool,
+            count: Optional[int]) -> List[Task]:
+        return list(islice(self.app.tasks.iter_due(start, end, inclusive, pending_only), count))
+
+    def search(self, query: str) -> List[Task]:
+        return self.app.tasks.search(query)
+
+    def summary(self, start: int, verify: bool) -> Tuple[Dict[str, int], List[str]]:
+        """This shard's running counts, and the names of any that disagree with a full scan."""
+        aggregates = self.app.aggregates
+        mismatched = []
+        if verify:
+            mismatched = aggregates.mismatches(TaskAggregates.scan(self.app.tasks.values()), start)
+        return aggregates.summary(start), mismatched
+
+    def columns(self) -> TaskColumns:
+        """This shard's tasks exported for a report."""
+        return TaskColumns.from_tasks(self.app.tasks.values())
+
+
+def _run_shard(connection):
+    """Worker process loop: answer requests until the coordinator says stop."""
+    shard = _Shard()
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        method, args = request
+        try:
+            reply = (True, getattr(shard, method)(*args))
+        except Exception as exc:
+            reply = (False, exc)
+        connection.send(reply)
+    connection.close()
+
+
+class ShardedTodoApp(TodoApp):
+    """
+    Coordinator presenting a TodoApp interface over several shard processes.
+
+    Supports the single-task commands, add_tasks, view_tasks, search, summary,
+    report, export and the due-date queries. The other batch operations and
+    import report a usage error; the journal and the change feed are not
+    available in sharded mode.
+    """
+
+    def __init__(self, shards: int = 2, sink=None):
+        """
+        Args:
+            shards: Number of worker processes to partition tasks across
+            sink: Receives the Result/Error of every operation
+        """
+        super().__init__(sink=sink)
+        self._size = 0
+        self._connections = []
+        self._processes = []
+        for _ in range(shards):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_run_shard, args=(child,), daemon=True)
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+
+    @property
+    def shards(self) -> int:
+        """Number of shard processes."""
+        return len(self._connections)
+
+    def _shard_of(self, task_id: int) -> int:
+        return task_id % len(self._connections)
+
+    def _request(self, index: int, method: str, *args):
+        """Send one request to a shard and wait for its reply."""
+        connection = self._connections[index]
+        connection.send((method, args))
+        return self._reply(connection)
+
+    def _fan_out(self, method: str, *args) -> list:
+        """Send the same request to every shard at once and gather the replies in shard order."""
+        for connection in self._connections:
+            connection.send((method, args))
+        replies = self._receive_all()
+        for ok, value in replies:
+            if not ok:
+                raise value
+        return [value for _, value in replies]
+
+    def _receive_all(self) -> List[Tuple[bool, object]]:
+        """Read one (ok, value) reply from every shard, so none is left queued behind a failure."""
+        return [connection.recv() for connection in self._connections]
+
+    @staticmethod
+    def _reply(connection):
+        ok, value = connection.recv()
+        if not ok:
+            raise value
+        return value
+
+    def _forward(self, reply):
+        """Re-emit the results a shard produced and return the operation's value."""
+        value, results = reply
+        for result in results:
+            self.sink.emit(result)
+        return value
+
+    def add_task(self, description: str, due_date: Optional[str] = None) -> Optional[Task]:
+        task_id = self.next_id
+        task = self._forward(self._request(self._shard_of(task_id), "add", task_id, description, due_date))
+        if task is not None:
+            self.next_id += 1
+            self._size += 1
+        return task
+
+    def add_tasks(self, items: Iterable[Union[str, Tuple[str, Optional[str]]]]) -> BatchResult:
+        parsed, errors = self._parse_new_tasks(items)
+        if errors:
+            return self._reject_batch('add', errors)
+
+        first_id = self.next_id
+        created_ts = int(time.time())
+        rows = [[] for _ in self._connections]
+        for offset, (description, due_date) in enumerate(parsed):
+            task_id = first_id + offset
+            rows[self._shard_of(task_id)].append((task_id, description, due_date, created_ts))
+        for index, shard_rows in enumerate(rows):
+            self._connections[index].send(("insert", (shard_rows,)))
+        replies = self._receive_all()
+        failures = [value for ok, value in replies if not ok]
+        if failures:
+            # All or nothing: a failed shard has taken back its own rows, the
+            # others are asked to drop theirs
+            for index, (ok, _) in enumerate(replies):
+                if ok and rows[index]:
+                    self._request(index, "discard", [row[0] for row in rows[index]])
+            raise failures[0]
+        self.next_id = first_id + len(parsed)
+        self._size += len(parsed)
+        return self._finish_batch(BatchResult('add', list(range(first_id, self.next_id))))
+
+    def update_task(self, task_id: int, new_description: Optional[str] = None,
+                    new_due_date: Optional[str] = None) -> bool:
+        return self._forward(self._request(self._shard_of(task_id), "call", "update_task",
+                                           task_id, new_description, new_due_date))
+
+    def delete_task(self, task_id: int) -> bool:
+        deleted = self._forward(self._request(self._shard_of(task_id), "call", "delete_task", task_id))
+        if deleted:
+            self._size -= 1
+        return deleted
+
+    def mark_task_complete(self, task_id: int, completed: bool) -> bool:
+        return self._forward(self._request(self._shard_of(task_id), "call", "mark_task_complete",
+                                           task_id, completed))
+
+    def view_tasks(self, filter_status: Optional[str] = None, *filter_args: str,
+                   limit: Optional[int] = None, offset: int = 0, after: Optional[int] = None,
+                   sort: Optional[str] = None, include_archived: bool = False) -> Optional[List[Task]]:
+        """
+        View tasks one page at a time, with the same semantics as TodoApp.view_tasks.
+
+        Every shard returns its own first offset + limit + 1 candidates in
+        the page's order; merging those yields the global page. Shards have
+        no archive, so include_archived changes nothing, as for a TodoApp
+        without one.
+        """
+        if not self._size:
+            self.sink.emit(Result("no_tasks"))
+            return []
+
+        natural = "due" if filter_status in self.DUE_FILTERS else "id"
+        sort = sort or natural
+        if sort not in self.VIEW_SORTS:
+            self.sink.emit(Error("usage", text="Sort must be one of: " + ", ".join(self.VIEW_SORTS)))
+            return None
+        cursor_task = None
+        if after is not None:
+            cursor_task = self._request(self._shard_of(after), "get", after)
+            if cursor_task is None:
+                self.sink.emit(Error("not_found", task_id=after))
+                return None
+        error = self._check_filter(filter_status, filter_args)
+        if error is not None:
+            self.sink.emit(error)
+            return None
+
+        key = self._sort_key(sort)
+        id_cursor = after if sort == natural == "id" else None
+        after_key = key(cursor_task) if cursor_task is not None and id_cursor is None else None
+        wanted = None if limit is None else offset + limit + 1
+        if filter_status == "next":
+            # "next" picks the first N by due date before the cursor and sort
+            # apply, so shards send their natural order and the cut happens here
+            pages = self._fan_out("page", filter_status, filter_args, natural, None, None, None)
+            candidates = islice(heapq.merge(*pages, key=self._sort_key(natural)), int(filter_args[0]))
+            if after_key is not None:
+                candidates = (task for task in candidates if key(task) > after_key)
+            if sort != natural:
+                candidates = sorted(candidates, key=key)
+        else:
+            pages = self._fan_out("page", filter_status, filter_args, sort, after_key, id_cursor, wanted)
+            candidates = heapq.merge(*pages, key=key)
+        page = list(islice(candidates, offset, wanted))
+
+        has_more = limit is not None and len(page) > limit
+        if has_more:
+            del page[limit:]
+        if not page:
+            self.sink.emit(Result("no_match"))
+            return []
+        self.sink.emit(Result("tasks", tasks=page, detail=page[-1].id if has_more else None))
+        return page
+
+    @staticmethod
+    def _check_filter(filter_status: Optional[str], filter_args: Tuple[str, ...]) -> Optional[Error]:
+        """Validate a view filter's arguments here rather than in every shard."""
+        try:
+            if filter_status == "due-before":
+                parse_date(filter_args[0])
+            elif filter_status == "due-between":
+                parse_date(filter_args[0])
+                parse_date(filter_args[1])
+        except ValueError:
+            return Error("invalid_date")
+        if filter_status == "next":
+            count = int(filter_args[0]) if filter_args and filter_args[0].isdigit() else 0
+            if count < 1:
+                return Error("invalid_count")
+        return None
+
+    def search(self, query: str) -> Optional[List[Task]]:
+        if not query or query.strip() == "":
+            self.sink.emit(Error("empty_query"))
+            return None
+        found = list(heapq.merge(*self._fan_out("search", query), key=self._sort_key("id")))
+        if not found:
+            self.sink.emit(Result("no_results", detail=query))
+            return []
+        self.sink.emit(Result("tasks", tasks=found))
+        return found
+
+    def summary(self, today: Optional[str] = None, verify: bool = False) -> Optional[Dict[str, int]]:
+        try:
+            start = today_ordinal() if today is None else parse_date(today)
+        except ValueError:
+            self.sink.emit(Error("invalid_date"))
+            return None
+        counts: Dict[str, int] = {}
+        mismatched: List[str] = []
+        for shard_counts, shard_mismatched in self._fan_out("summary", start, verify):
+            for name, count in shard_counts.items():
+                counts[name] = counts.get(name, 0) + count
+            mismatched += [name for name in shard_mismatched if name not in mismatched]
+        if mismatched:
+            self.sink.emit(Error("summary_mismatch", fields=", ".join(mismatched)))
+            return None
+        self.sink.emit(Result("summary", detail=counts))
+        return counts
+
+    def _report_columns(self) -> TaskColumns:
+        # Every shard exports its tasks at once; reports do not depend on row order
+        columns = TaskColumns()
+        for shard_columns in self._fan_out("columns"):
+            columns.extend(shard_columns)
+        return columns
+
+    def _iter_due(self, start: Optional[int], end: Optional[int], inclusive: bool = True,
+                  pending_only: bool = False) -> Iterator[Task]:
+        return heapq.merge(*self._fan_out("due", start, end, inclusive, pending_only, None),
+                           key=self._sort_key("due"))
+
+    def next_due_tasks(self, count: int, today: Optional[str] = None) -> List[Task]:
+        start = today_ordinal() if today is None else parse_date(today)
+        pages = self._fan_out("due", start, None, True, True, count)
+        return list(islice(heapq.merge(*pages, key=self._sort_key("due")), count))
+
+    def get_task(self, task_id: int) -> Optional[Task]:
+        return self._request(self._shard_of(task_id), "get", task_id)
+
+    def _all_tasks(self) -> Iterator[Task]:
+        return heapq.merge(*self._fan_out("tasks"), key=self._sort_key("id"))
+
+    def _unsupported(self, name: str) -> Error:
+        error = Error("usage", text=f"{name} is not available in sharded mode")
+        self.sink.emit(error)
+        return error
+
+    def update_tasks(self, updates: Iterable[Tuple[int, Optional[str], Optional[str]]]) -> BatchResult:
+        return BatchResult('update', errors=[(0, self._unsupported("update_tasks"))])
+
+    def delete_tasks(self, task_ids: Iterable[int]) -> BatchResult:
+        return BatchResult('delete', errors=[(0, self._unsupported("delete_tasks"))])
+
+    def mark_tasks(self, task_ids: Iterable[int], completed: bool) -> BatchResult:
+        return BatchResult('mark', errors=[(0, self._unsupported("mark_tasks"))])
+
+    def import_tasks(self, path: str) -> Optional[int]:
+        self._unsupported("import")
+        return None
+
+    def close(self):
+        """Stop the shard processes."""
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections = []
+        self._processes = []
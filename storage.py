@@ -0,0 +1,483 @@
+"""
+Task storage backends for the Todo App.
+
+TodoApp keeps its tasks in a store: a read-only id -> Task mapping plus the
+mutations and ordered queries the app needs. MemoryStore holds tasks in a
+dict with in-memory secondary indexes. SQLiteStore keeps them in a SQLite
+database, where the status, due-date and text queries run as indexed SQL,
+so tasks persist and only the rows a query returns are ever loaded.
+"""
+
+import heapq
+import queue
+import sqlite3
+import threading
+from collections.abc import Mapping
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional
+
+from indexes import DueDateIndex, InvertedIndex, SortedList, matches_query, parse_query, tokenize
+from task import Task
+
+
+class TaskStore(Mapping):
+    """
+    Interface of a task store.
+
+    As a mapping it is read-only and iterates ids in ascending order; tasks
+    only change through the methods below, which keep every index current.
+    """
+
+    def insert(self, task: Task):
+        """Store a new task."""
+        raise NotImplementedError
+
+    def insert_many(self, tasks: List[Task]):
+        """Store many new tasks; stores with cheaper bulk index updates override this."""
+        for task in tasks:
+            self.insert(task)
+
+    def remove(self, task_id: int) -> Task:
+        """Delete a task and return it."""
+        raise NotImplementedError
+
+    def set_completed(self, task: Task, completed: bool):
+        """Change a task's completion status."""
+        raise NotImplementedError
+
+    def set_description(self, task: Task, description: str):
+        """Change a task's description."""
+        raise NotImplementedError
+
+    def set_due_date(self, task: Task, due_ordinal: Optional[int]):
+        """Change a task's due date."""
+        raise NotImplementedError
+
+    def iter_status(self, completed: Optional[bool], start: Optional[int] = None) -> Iterator[Task]:
+        """
+        Stream tasks by completion status in id order.
+
+        Args:
+            completed: True or False to select by status, None for every task
+            start: Smallest id to return (None for unbounded)
+        """
+        raise NotImplementedError
+
+    def iter_due(self, start: Optional[int], end: Optional[int], inclusive: bool = True,
+                 pending_only: bool = False) -> Iterator[Task]:
+        """
+        Stream tasks due within a range of day ordinals, earliest first.
+
+        Args:
+            start: First day ordinal, inclusive (None for unbounded)
+            end: Last day ordinal (None for unbounded)
+            inclusive: Whether tasks due on ``end`` itself are included
+            pending_only: Skip completed tasks
+        """
+        raise NotImplementedError
+
+    def search(self, query: str) -> List[Task]:
+        """Tasks whose description matches every term of a query, in id order."""
+        raise NotImplementedError
+
+    def count(self, completed: Optional[bool] = None) -> int:
+        """Number of tasks, optionally only those with the given status."""
+        raise NotImplementedError
+
+    def max_id(self) -> int:
+        """Highest id ever stored, or 0."""
+        raise NotImplementedError
+
+    def transaction(self):
+        """Context manager grouping several mutations into one atomic unit."""
+        return nullcontext()
+
+    def close(self):
+        """Release any resources held by the store."""
+
+
+class MemoryStore(TaskStore):
+    """Tasks in a dict, with sorted id lists per status, a due-date index and a text index."""
+
+    def __init__(self):
+        self._tasks: Dict[int, Task] = {}
+        # Ids of completed and pending tasks, each kept in id order
+        self._completed_ids = SortedList()
+        self._pending_ids = SortedList()
+        # Tasks with a due date, ordered by (due date, id)
+        self._due_index = DueDateIndex()
+        # Full-text index over task descriptions
+        self._text_index = InvertedIndex()
+        self._max_id = 0
+
+    def frozen(self, rows: Mapping) -> "MemoryStore":
+        """
+        Read-only copy of this store for snapshot reads.
+
+        Args:
+            rows: Immutable id -> Task mapping holding the copied rows
+
+        Returns:
+            Store whose indexes share storage with this one copy-on-write
+        """
+        copy = MemoryStore.__new__(MemoryStore)
+        copy._tasks = rows
+        copy._completed_ids = self._completed_ids.snapshot()
+        copy._pending_ids = self._pending_ids.snapshot()
+        copy._due_index = self._due_index.snapshot()
+        copy._text_index = self._text_index.snapshot()
+        copy._max_id = self._max_id
+        return copy
+
+    def __getitem__(self, task_id: int) -> Task:
+        return self._tasks[task_id]
+
+    def __contains__(self, task_id) -> bool:
+        return task_id in self._tasks
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __iter__(self) -> Iterator[int]:
+        return heapq.merge(self._pending_ids, self._completed_ids)
+
+    def get(self, task_id: int, default=None):
+        return self._tasks.get(task_id, default)
+
+    def values(self) -> Iterator[Task]:
+        return map(self._tasks.__getitem__, iter(self))
+
+    def insert(self, task: Task):
+        self._tasks[task.id] = task
+        (self._completed_ids if task.completed else self._pending_ids).add(task.id)
+        if task.due_ordinal is not None:
+            self._due_index.add(task.due_ordinal, task.id)
+        self._text_index.add(task.id, task.description)
+        if task.id > self._max_id:
+            self._max_id = task.id
+
+    def insert_many(self, tasks: List[Task]):
+        self._tasks.update((task.id, task) for task in tasks)
+        self._completed_ids.update(task.id for task in tasks if task.completed)
+        self._pending_ids.update(task.id for task in tasks if not task.completed)
+        self._due_index.add_many((task.due_ordinal, task.id) for task in tasks if task.due_ordinal is not None)
+        self._text_index.add_many((task.id, task.description) for task in tasks)
+        if tasks:
+            self._max_id = max(self._max_id, max(task.id for task in tasks))
+
+    def remove(self, task_id: int) -> Task:
+        task = self._tasks.pop(task_id)
+        (self._completed_ids if task.completed else self._pending_ids).discard(task_id)
+        if task.due_ordinal is not None:
+            self._due_index.discard(task.due_ordinal, task_id)
+        self._text_index.discard(task_id, task.description)
+        return task
+
+    def set_completed(self, task: Task, completed: bool):
+        if task.completed != completed:
+            (self._completed_ids if task.completed else self._pending_ids).discard(task.id)
+            (self._completed_ids if completed else self._pending_ids).add(task.id)
+        task.completed = completed
+
+    def set_description(self, task: Task, description: str):
+        self._text_index.discard(task.id, task.description)
+        self._text_index.add(task.id, description)
+        task.description = description
+
+    def set_due_date(self, task: Task, due_ordinal: Optional[int]):
+        if task.due_ordinal is not None:
+            self._due_index.discard(task.due_ordinal, task.id)
+        if due_ordinal is not None:
+            self._due_index.add(due_ordinal, task.id)
+        task.due_ordinal = due_ordinal
+
+    def iter_status(self, completed: Optional[bool], start: Optional[int] = None) -> Iterator[Task]:
+        if completed is None:
+            ids = heapq.merge(self._pending_ids.irange(start), self._completed_ids.irange(start))
+        else:
+            ids = (self._completed_ids if completed else self._pending_ids).irange(start)
+        return map(self._tasks.__getitem__, ids)
+
+    def iter_due(self, start: Optional[int], end: Optional[int], inclusive: bool = True,
+                 pending_only: bool = False) -> Iterator[Task]:
+        tasks = self._tasks
+        for task_id in self._due_index.ids(start, end, inclusive):
+            task = tasks[task_id]
+            if not (pending_only and task.completed):
+                yield task
+
+    def search(self, query: str) -> List[Task]:
+        tasks = self._tasks
+        return [tasks[task_id] for task_id in self._text_index.search(query)]
+
+    def count(self, completed: Optional[bool] = None) -> int:
+        if completed is None:
+            return len(self._tasks)
+        return len(self._completed_ids if completed else self._pending_ids)
+
+    def max_id(self) -> int:
+        return self._max_id
+
+
+class ConnectionPool:
+    """
+    SQLite connections shared between threads, one thread per connection at a time.
+
+    Up to ``size`` idle connections are kept open; when all are busy an
+    extra one is opened and closed again on release.
+    """
+
+    def __init__(self, path: str, size: int = 4):
+        self.path = path
+        self.size = size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+
+    def connect(self) -> sqlite3.Connection:
+        """Open a connection in autocommit mode with WAL journaling."""
+        connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False,
+                                     cached_statements=256)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection for the duration of a with block."""
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = self.connect()
+        try:
+            yield connection
+        finally:
+            if self._idle.qsize() < self.size:
+                self._idle.put(connection)
+            else:
+                connection.close()
+
+    def close(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_COLUMNS = "id, description, completed, due_ordinal, created_ts"
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS tasks ("
+    " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+    " description TEXT NOT NULL,"
+    " completed INTEGER NOT NULL DEFAULT 0,"
+    " due_ordinal INTEGER,"
+    " created_ts INTEGER)",
+    "CREATE INDEX IF NOT EXISTS tasks_completed ON tasks (completed)",
+    "CREATE INDEX IF NOT EXISTS tasks_due_date ON tasks (due_ordinal)",
+)
+
+# Full-text index kept in step with the table by triggers; the tokenizer is
+# configured to split words the way indexes.tokenize does
+_TEXT_SCHEMA = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_text USING fts5("
+    " description, content='tasks', content_rowid='id',"
+    " tokenize=\"unicode61 remove_diacritics 0 tokenchars '_'\")",
+    "CREATE TRIGGER IF NOT EXISTS tasks_text_insert AFTER INSERT ON tasks BEGIN"
+    " INSERT INTO tasks_text (rowid, description) VALUES (new.id, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_text_delete AFTER DELETE ON tasks BEGIN"
+    " INSERT INTO tasks_text (tasks_text, rowid, description)"
+    " VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_text_update AFTER UPDATE OF description ON tasks BEGIN"
+    " INSERT INTO tasks_text (tasks_text, rowid, description)"
+    " VALUES ('delete', old.id, old.description);"
+    " INSERT INTO tasks_text (rowid, description) VALUES (new.id, new.description); END",
+)
+
+
+def _row_task(row: tuple) -> Task:
+    task = Task.__new__(Task)
+    task.id, task.description, completed, task.due_ordinal, task.created_ts = row
+    task.completed = bool(completed)
+    return task
+
+
+class SQLiteStore(TaskStore):
+    """
+    Tasks in a SQLite database file.
+
+    Writes go through one connection guarded by a lock; reads borrow
+    connections from a pool and, thanks to WAL mode, never wait for the
+    writer. Every statement is a fixed SQL string, so each connection's
+    statement cache prepares it only once. Inside ``transaction()`` reads use
+    the writer connection so they see the uncommitted changes.
+    """
+
+    # Rows fetched per round trip while streaming; about one page of a view
+    FETCH_SIZE = 32
+
+    def __init__(self, path: str, pool_size: int = 4):
+        """
+        Args:
+            path: Database file, created if missing
+            pool_size: Number of idle reader connections to keep open
+        """
+        self.path = path
+        self._pool = ConnectionPool(path, pool_size)
+        self._writer = self._pool.connect()
+        self._write_lock = threading.RLock()
+        self._depth = 0
+        with self._write_lock:
+            for statement in _SCHEMA:
+                self._writer.execute(statement)
+            try:
+                for statement in _TEXT_SCHEMA:
+                    self._writer.execute(statement)
+                self._fts = True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5; search falls back to a scan
+                self._fts = False
+
+    @contextmanager
+    def _reader(self) -> Iterator[sqlite3.Connection]:
+        if self._depth:
+            yield self._writer
+        else:
+            with self._pool.connection() as connection:
+                yield connection
+
+    def _one(self, sql: str, params: tuple = ()) -> Optional[tuple]:
+        with self._reader() as connection:
+            return connection.execute(sql, params).fetchone()
+
+    def _stream(self, sql: str, params: tuple = ()) -> Iterator[Task]:
+        """Yield tasks from a query in batches, so callers can stop early cheaply."""
+        with self._reader() as connection:
+            cursor = connection.execute(sql, params)
+            try:
+                while True:
+                    rows = cursor.fetchmany(self.FETCH_SIZE)
+                    if not rows:
+                        return
+                    for row in rows:
+                        yield _row_task(row)
+            finally:
+                cursor.close()
+
+    def _write(self, sql: str, params: tuple) -> sqlite3.Cursor:
+        with self._write_lock:
+            return self._writer.execute(sql, params)
+
+    @contextmanager
+    def transaction(self):
+        """Run the body in one transaction, committed on success and rolled back on error."""
+        with self._write_lock:
+            if self._depth == 0:
+                self._writer.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._writer.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                self._writer.execute("COMMIT")
+
+    def __getitem__(self, task_id: int) -> Task:
+        row = self._one(f"SELECT {_COLUMNS} FROM tasks WHERE id = ?", (task_id,))
+        if row is None:
+            raise KeyError(task_id)
+        return _row_task(row)
+
+    def __contains__(self, task_id) -> bool:
+        return self._one("SELECT 1 FROM tasks WHERE id = ?", (task_id,)) is not None
+
+    def __len__(self) -> int:
+        return self._one("SELECT count(*) FROM tasks")[0]
+
+    def __bool__(self) -> bool:
+        return self._one("SELECT 1 FROM tasks LIMIT 1") is not None
+
+    def __iter__(self) -> Iterator[int]:
+        return (task.id for task in self.values())
+
+    def values(self) -> Iterator[Task]:
+        return self._stream(f"SELECT {_COLUMNS} FROM tasks ORDER BY id")
+
+    def insert(self, task: Task):
+        self._write(f"INSERT INTO tasks ({_COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+                    (task.id, task.description, int(task.completed), task.due_ordinal, task.created_ts))
+
+    def remove(self, task_id: int) -> Task:
+        with self.transaction():
+            task = self[task_id]
+            self._write("DELETE FROM tasks WHERE id = ?", (task_id,))
+        return task
+
+    def set_completed(self, task: Task, completed: bool):
+        self._write("UPDATE tasks SET completed = ? WHERE id = ?", (int(completed), task.id))
+        task.completed = completed
+
+    def set_description(self, task: Task, description: str):
+        self._write("UPDATE tasks SET description = ? WHERE id = ?", (description, task.id))
+        task.description = description
+
+    def set_due_date(self, task: Task, due_ordinal: Optional[int]):
+        self._write("UPDATE tasks SET due_ordinal = ? WHERE id = ?", (due_ordinal, task.id))
+        task.due_ordinal = due_ordinal
+
+    def iter_status(self, completed: Optional[bool], start: Optional[int] = None) -> Iterator[Task]:
+        start = start or 0
+        if completed is None:
+            return self._stream(f"SELECT {_COLUMNS} FROM tasks WHERE id >= ? ORDER BY id", (start,))
+        return self._stream(f"SELECT {_COLUMNS} FROM tasks WHERE completed = ? AND id >= ? ORDER BY id",
+                            (int(completed), start))
+
+    def iter_due(self, start: Optional[int], end: Optional[int], inclusive: bool = True,
+                 pending_only: bool = False) -> Iterator[Task]:
+        conditions = ["due_ordinal IS NOT NULL"]
+        params = []
+        if start is not None:
+            conditions.append("due_ordinal >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("due_ordinal <= ?" if inclusive else "due_ordinal < ?")
+            params.append(end)
+        if pending_only:
+            # The unary + keeps the planner on the due-date index, which
+            # already yields rows in order, instead of the status index
+            conditions.append("+completed = 0")
+        return self._stream(f"SELECT {_COLUMNS} FROM tasks WHERE {' AND '.join(conditions)}"
+                            " ORDER BY due_ordinal, id", tuple(params))
+
+    def search(self, query: str) -> List[Task]:
+        terms, prefixes = parse_query(query)
+        if not terms and not prefixes:
+            return []
+        if not self._fts:
+            found = []
+            for task in self.values():
+                if matches_query(tokenize(task.description), terms, prefixes):
+                    found.append(task)
+            return found
+        match = " ".join([f'"{term}"' for term in terms] + [f'"{prefix}"*' for prefix in prefixes])
+        columns = ", ".join(f"tasks.{column}" for column in _COLUMNS.split(", "))
+        return list(self._stream(f"SELECT {columns} FROM tasks_text JOIN tasks ON tasks.id = tasks_text.rowid"
+                                 " WHERE tasks_text MATCH ? ORDER BY tasks.id", (match,)))
+
+    def count(self, completed: Optional[bool] = None) -> int:
+        if completed is None:
+            return len(self)
+        return self._one("SELECT count(*) FROM tasks WHERE completed = ?", (int(completed),))[0]
+
+    def max_id(self) -> int:
+        row = self._one("SELECT seq FROM sqlite_sequence WHERE name = 'tasks'")
+        return row[0] if row else 0
+
+    def close(self):
+        with self._write_lock:
+            self._writer.close()
+        self._pool.close()
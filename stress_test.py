@@ -0,0 +1,133 @@
+"""
+Multi-threaded stress test for ConcurrentTodoApp.
+
+Writer threads add, update, complete and delete tasks while reader threads
+page through views and run searches. Every read is checked against the
+snapshot invariants, the final state is checked against the indexes, and
+throughput is reported for increasing thread counts.
+
+Usage: python stress_test.py [--ops N] [--threads 1,2,4,8]
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+
+from concurrency import ConcurrentTodoApp
+from output import NullSink
+
+
+def _writer(app, ops, seed, added, failures):
+    rng = random.Random(seed)
+    mine = []
+    for i in range(ops):
+        roll = rng.random()
+        if roll < 0.5 or not mine:
+            task = app.add_task(f"Task {seed} number {i}", f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}")
+            if task is None:
+                failures.append(f"add failed in writer {seed}")
+            else:
+                mine.append(task.id)
+        elif roll < 0.7:
+            app.update_task(rng.choice(mine), f"Updated {seed} number {i}")
+        elif roll < 0.9:
+            app.mark_task_complete(rng.choice(mine), rng.random() < 0.5)
+        else:
+            app.delete_task(mine.pop(rng.randrange(len(mine))))
+    added.extend(mine)
+
+
+def _reader(app, ops, seed, failures):
+    rng = random.Random(seed)
+    last_version = 0
+    for _ in range(ops):
+        snapshot = app.snapshot()
+        if snapshot.version < last_version:
+            failures.append("snapshot version went backwards")
+        last_version = snapshot.version
+        if len(snapshot.tasks) != snapshot.tasks.count(False) + snapshot.tasks.count(True):
+            failures.append("status indexes disagree with the rows")
+        roll = rng.random()
+        if roll < 0.4:
+            page = snapshot.view_tasks("completed", limit=20, after=None)
+            if any(not task.completed for task in page):
+                failures.append("pending task in completed view")
+            if [task.id for task in page] != sorted(task.id for task in page):
+                failures.append("view page out of order")
+        elif roll < 0.7:
+            page = snapshot.view_tasks("pending", limit=20, sort="due")
+            keys = [(task.due_ordinal, task.id) for task in page]
+            if keys != sorted(keys) or any(task.completed for task in page):
+                failures.append("bad due-ordered pending page")
+        else:
+            for task in snapshot.search(f"Updated {rng.randrange(8)}"):
+                if "Updated" not in task.description:
+                    failures.append("search returned a non-matching task")
+
+
+def _check_final(app, added, failures):
+    if len(app.tasks) != len(added) or set(app.tasks) != set(added):
+        failures.append("surviving tasks differ from what the writers kept")
+    if len(set(added)) != len(added):
+        failures.append("an id was allocated twice")
+    pending = {task.id for task in app.tasks.iter_status(False)}
+    completed = {task.id for task in app.tasks.iter_status(True)}
+    for task_id, task in app.tasks.items():
+        if (task_id in completed) != task.completed or (task_id in pending) == task.completed:
+            failures.append(f"task {task_id} is in the wrong status index")
+    due_ids = {task.id for task in app.tasks.iter_due(None, None)}
+    if due_ids != {task_id for task_id, task in app.tasks.items() if task.due_ordinal is not None}:
+        failures.append("due-date index disagrees with the tasks")
+    if app.summary(verify=True) is None:
+        failures.append("running counts disagree with a full scan")
+    snapshot = app.snapshot()
+    if len(snapshot.tasks) != len(app.tasks) or any(
+            snapshot.tasks[task_id].to_dict() != task.to_dict() for task_id, task in app.tasks.items()):
+        failures.append("final snapshot differs from the live tasks")
+
+
+def run(threads, ops):
+    """
+    Run writers and readers on one app and check the outcome.
+
+    Args:
+        threads: Number of writer threads, and as many reader threads
+        ops: Operations per thread
+
+    Returns:
+        Tuple of total operations per second and the list of failures
+    """
+    app = ConcurrentTodoApp(sink=NullSink())
+    added, failures = [], []
+    workers = [threading.Thread(target=_writer, args=(app, ops, seed, added, failures))
+               for seed in range(threads)]
+    workers += [threading.Thread(target=_reader, args=(app, ops // 10, seed, failures))
+                for seed in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    _check_final(app, added, failures)
+    return threads * (ops + ops // 10) / elapsed, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ConcurrentTodoApp stress test")
+    parser.add_argument("--ops", type=int, default=10000, help="operations per writer thread")
+    parser.add_argument("--threads", default="1,2,4,8", help="comma-separated thread counts")
+    args = parser.parse_args()
+
+    print(f"{'threads':<8} {'ops/s':>12}  result")
+    failed = False
+    for threads in [int(count) for count in args.threads.split(",")]:
+        rate, failures = run(threads, args.ops)
+        failed = failed or bool(failures)
+        print(f"{threads:<8} {rate:>12,.0f}  {failures[0] if failures else 'ok'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
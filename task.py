@@ -0,0 +1,78 @@
+"""
+Task record for the Todo App.
+"""
+
+import time
+from typing import Optional
+
+from dates import format_date, format_timestamp, parse_date, parse_timestamp
+
+
+class Task:
+    """
+    Represents a single task in the todo list.
+    
+    The due date is stored as a day ordinal (due_ordinal) and the creation
+    time as epoch seconds (created_ts); due_date and created_at produce the
+    string forms on access.
+    """
+    
+    def __init__(self, task_id: int, description: str, completed: bool = False,
+                 due_date: Optional[str] = None, created_ts: Optional[int] = None):
+        self.id = task_id
+        self.description = description
+        self.completed = completed
+        self.due_ordinal = parse_date(due_date) if due_date else None
+        self.created_ts = int(time.time()) if created_ts is None else created_ts
+    
+    @property
+    def due_date(self) -> Optional[str]:
+        """Due date in YYYY-MM-DD format, or None."""
+        return format_date(self.due_ordinal) if self.due_ordinal is not None else None
+    
+    @due_date.setter
+    def due_date(self, value: Optional[str]):
+        self.due_ordinal = parse_date(value) if value else None
+    
+    @property
+    def created_at(self) -> str:
+        """Creation time as "YYYY-MM-DD HH:MM:SS" local time."""
+        return format_timestamp(self.created_ts)
+    
+    @created_at.setter
+    def created_at(self, value: str):
+        self.created_ts = parse_timestamp(value)
+    
+    def copy(self) -> "Task":
+        """Detached copy, so later edits to either task do not show through."""
+        copy = Task.__new__(Task)
+        copy.__dict__.update(self.__dict__)
+        return copy
+    
+    def to_dict(self):
+        """Convert task to dictionary for serialization."""
+        return {
+            'id': self.id,
+            'description': self.description,
+            'completed': self.completed,
+            'due_date': self.due_date,
+            'created_at': self.created_at
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Create a Task instance from a dictionary."""
+        # Fill the fields directly: this is the hot path of journal replay and
+        # imports, and __init__ would stamp a creation time only to discard it
+        task = cls.__new__(cls)
+        task.id = data['id']
+        task.description = data['description']
+        task.completed = data.get('completed', False)
+        due_date = data.get('due_date')
+        task.due_ordinal = parse_date(due_date) if due_date else None
+        created_at = data.get('created_at')
+        created_ts = created_at if isinstance(created_at, int) else parse_timestamp(created_at)
+        # Records without a creation time (e.g. hand-written imports) are
+        # stamped like new tasks, so every task has a numeric created_ts
+        task.created_ts = int(time.time()) if created_ts is None else created_ts
+        return task